@@ -0,0 +1,218 @@
+"""
+arp.py - Resolução dinâmica de endereços (VIP → MAC) na Camada de Enlace
+
+Substitui a antiga TABELA_MAC estática que era copiada em client.py,
+server.py e router.py. Cada nó mantém um cache próprio com expiração e
+aprende os MACs dos vizinhos através de quadros ARP:
+
+  - REQUEST : "Quem tem o VIP X? Responda para mim."
+  - REPLY   : "O VIP X está no MAC Y."
+  - ANUNCIO : ARP gratuito — enviado quando o nó sobe, sem pedido prévio.
+
+Formato do quadro ARP (campo "data" do Quadro, no lugar do Pacote):
+
+  {"arp": {"op": "REQUEST", "vip_origem": "HOST_A",
+           "mac_origem": "AA:AA:AA:AA:AA:01", "vip_alvo": "ROTEADOR"}}
+
+Em regime permanente toda consulta é respondida pelo cache, sem ida e
+volta extra. Quando o cache não conhece o VIP, o quadro sai com o MAC de
+broadcast e um REQUEST é disparado para aprender o endereço.
+
+Dependências: fisica.py, codificacao.py, fec.py (mesma pasta)
+"""
+
+import time
+import zlib
+from fisica import transmitir
+from codificacao import codec_envio, decodificar_quadro
+import fec
+
+# ──────────────────────────────────────────────
+# CONFIGURAÇÕES
+# ──────────────────────────────────────────────
+ARP_TTL_SEGUNDOS      = 300.0   # Validade de uma entrada no cache
+ARP_INTERVALO_REQUEST = 1.0     # Intervalo mínimo entre REQUESTs para o mesmo VIP
+
+MAC_BROADCAST    = "FF:FF:FF:FF:FF:FF"
+VIP_ROTEADOR     = "ROTEADOR"
+
+# MACs "gravados de fábrica" dos nós do laboratório. Nós novos não precisam
+# constar aqui: recebem um MAC derivado do próprio VIP (ver mac_local()).
+MACS_FABRICA = {
+    "HOST_A"  : "AA:AA:AA:AA:AA:01",
+    "HOST_B"  : "BB:BB:BB:BB:BB:02",
+    "SERVIDOR": "CC:CC:CC:CC:CC:03",
+    "ROTEADOR": "DD:DD:DD:DD:DD:04",
+}
+
+# ──────────────────────────────────────────────
+# CORES ANSI
+# ──────────────────────────────────────────────
+AZUL     = "\033[94m"
+AMARELO  = "\033[93m"
+RESET    = "\033[0m"
+
+
+def log(camada: str, msg: str, cor: str = ""):
+    print(f"{cor}[{camada}] {msg}{RESET}")
+
+
+def mac_local(vip: str) -> str:
+    """
+    Retorna o MAC do próprio nó. VIPs sem MAC de fábrica recebem um endereço
+    localmente administrado (prefixo 02:) derivado do CRC32 do VIP.
+    """
+    if vip in MACS_FABRICA:
+        return MACS_FABRICA[vip]
+    h = zlib.crc32(vip.encode("utf-8")).to_bytes(4, "big")
+    return "02:00:" + ":".join(f"{b:02X}" for b in h)
+
+
+def eh_arp(quadro_dict: dict) -> bool:
+    """Indica se o quadro desserializado carrega uma mensagem ARP."""
+    data = quadro_dict.get("data")
+    return isinstance(data, dict) and "arp" in data
+
+
+# ══════════════════════════════════════════════════════════════════
+# CACHE ARP
+# ══════════════════════════════════════════════════════════════════
+class CacheARP:
+    """Cache VIP → MAC com expiração por entrada."""
+
+    def __init__(self, ttl: float = ARP_TTL_SEGUNDOS):
+        self.ttl = ttl
+        self._entradas: dict[str, tuple[str, float]] = {}
+
+    def aprender(self, vip: str, mac: str):
+        self._entradas[vip] = (mac, time.monotonic() + self.ttl)
+
+    def resolver(self, vip: str):
+        """Retorna o MAC do VIP, ou None se desconhecido ou expirado."""
+        entrada = self._entradas.get(vip)
+        if entrada is None:
+            return None
+        mac, expira_em = entrada
+        if time.monotonic() >= expira_em:
+            del self._entradas[vip]
+            return None
+        return mac
+
+    def entradas(self) -> dict[str, str]:
+        """Cópia das entradas ainda válidas (para exibição)."""
+        agora = time.monotonic()
+        return {vip: mac for vip, (mac, exp) in self._entradas.items() if exp > agora}
+
+
+# ══════════════════════════════════════════════════════════════════
+# NÓ ARP
+# ══════════════════════════════════════════════════════════════════
+class NoARP:
+    """
+    Agente ARP de um nó: responde REQUESTs para o próprio VIP, aprende com
+    REPLYs/ANUNCIOs e resolve VIPs a partir do cache. Os quadros ARP saem por
+    `transmitir(sock, bytes, endereco)`, o mesmo caminho dos dados do nó
+    (padrão: fisica.transmitir).
+    """
+
+    def __init__(self, sock, meu_vip: str, cache: CacheARP = None, transmitir=transmitir):
+        self.sock     = sock
+        self.meu_vip  = meu_vip
+        self.meu_mac  = mac_local(meu_vip)
+        self.cache    = cache if cache is not None else CacheARP()
+        self._transmitir = transmitir
+        self._ultimo_request: dict[str, float] = {}
+
+    def _enviar(self, op: str, dst_mac: str, endereco, vip_alvo: str = None):
+        mensagem = {
+            "op"        : op,
+            "vip_origem": self.meu_vip,
+            "mac_origem": self.meu_mac,
+        }
+        if vip_alvo is not None:
+            mensagem["vip_alvo"] = vip_alvo
+
+        quadro_bytes = fec.enquadrar(
+            codec_envio().codificar(self.meu_mac, dst_mac, {"arp": mensagem}))
+        self._transmitir(self.sock, quadro_bytes, endereco)
+
+    def anunciar(self, endereco):
+        """ARP gratuito: divulga VIP/MAC deste nó ao subir."""
+        log("ARP", f"Anúncio gratuito {self.meu_vip} → {self.meu_mac}", AZUL)
+        self._enviar("ANUNCIO", MAC_BROADCAST, endereco)
+
+    def solicitar(self, vip: str, endereco):
+        """Envia REQUEST para o VIP, respeitando ARP_INTERVALO_REQUEST."""
+        agora = time.monotonic()
+        if agora - self._ultimo_request.get(vip, float("-inf")) < ARP_INTERVALO_REQUEST:
+            return
+        self._ultimo_request[vip] = agora
+        log("ARP", f"Quem tem {vip}? Responda para {self.meu_vip}", AMARELO)
+        self._enviar("REQUEST", MAC_BROADCAST, endereco, vip_alvo=vip)
+
+    def resolver(self, vip: str, endereco) -> str:
+        """
+        MAC do VIP a partir do cache. Em caso de falha dispara um REQUEST para
+        `endereco` e devolve MAC_BROADCAST para não atrasar o quadro atual.
+        """
+        mac = self.cache.resolver(vip)
+        if mac is not None:
+            return mac
+        self.solicitar(vip, endereco)
+        return MAC_BROADCAST
+
+    def descobrir(self, vip: str, endereco, timeout: float = 2.0) -> str:
+        """
+        Resolução bloqueante, usada apenas na partida do nó: envia REQUEST e
+        consome quadros ARP do socket até aprender o VIP ou estourar o prazo.
+        Retorna o MAC aprendido ou MAC_BROADCAST.
+        """
+        mac = self.cache.resolver(vip)
+        if mac is not None:
+            return mac
+
+        self.solicitar(vip, endereco)
+        prazo = time.monotonic() + timeout
+        timeout_original = self.sock.gettimeout()
+        try:
+            while (restante := prazo - time.monotonic()) > 0:
+                self.sock.settimeout(restante)
+                try:
+                    dados, origem = self.sock.recvfrom(65535)
+                except OSError:
+                    break
+                quadro_dict, integro = decodificar_quadro(dados)
+                if quadro_dict is not None and integro:
+                    self.processar(quadro_dict, origem)
+                mac = self.cache.resolver(vip)
+                if mac is not None:
+                    return mac
+        finally:
+            self.sock.settimeout(timeout_original)
+
+        log("ARP", f"{vip} não respondeu em {timeout}s → usando broadcast", AMARELO)
+        return MAC_BROADCAST
+
+    def processar(self, quadro_dict: dict, endereco_origem) -> bool:
+        """
+        Trata um quadro ARP já validado pelo CRC.
+        Retorna False se o quadro não for ARP (segue para a Camada de Rede).
+        """
+        if not eh_arp(quadro_dict):
+            return False
+
+        mensagem = quadro_dict["data"]["arp"]
+        op       = mensagem.get("op")
+        vip      = mensagem.get("vip_origem")
+        mac      = mensagem.get("mac_origem")
+
+        if vip and mac:
+            self.cache.aprender(vip, mac)
+            self._ultimo_request.pop(vip, None)
+            log("ARP", f"{op} | aprendido {vip} → {mac}", AZUL)
+
+        if op == "REQUEST" and mensagem.get("vip_alvo") == self.meu_vip and endereco_origem:
+            log("ARP", f"Respondendo: {self.meu_vip} está em {self.meu_mac}", AZUL)
+            self._enviar("REPLY", mac or MAC_BROADCAST, endereco_origem)
+
+        return True
@@ -0,0 +1,56 @@
+"""
+bench_codecs.py - Microbenchmark dos codecs de quadro (codificacao.py)
+
+Monta quadros de chat reais (como o client.py envia, e os ACKs do
+server.py) e mede, para cada codec instalado, o tempo de codificar e de
+decodificar+verificar o FCS, além do tamanho em bytes.
+
+Uso:
+  python bench_codecs.py [--n 20000]
+"""
+
+import argparse
+import timeit
+from datetime import datetime
+
+from protocol import Segmento, Pacote
+from arp import mac_local
+from codificacao import codecs_disponiveis, obter_codec
+
+
+def quadros_de_exemplo():
+    """(nome, src_mac, dst_mac, pacote_dict) de um DATA de chat e de um ACK."""
+    chat = Segmento(seq_num=1, is_ack=False, payload={
+        "type"     : "CHAT",
+        "sender"   : "Alice",
+        "message"  : "Oi pessoal, alguém já conseguiu rodar a fase 4 com o roteador?",
+        "timestamp": datetime(2025, 11, 3, 14, 5, 9, 123456).isoformat(),
+    })
+    ack = Segmento(seq_num=1, is_ack=True, payload=None)
+    return [
+        ("chat", mac_local("HOST_A"), mac_local("ROTEADOR"),
+         Pacote("HOST_A", "SERVIDOR", 8, chat.to_dict()).to_dict()),
+        ("ack", mac_local("SERVIDOR"), mac_local("ROTEADOR"),
+         Pacote("SERVIDOR", "HOST_A", 8, ack.to_dict()).to_dict()),
+    ]
+
+
+def medir(n: int):
+    print(f"{'codec':10s} {'quadro':7s} {'bytes':>6s} {'codificar µs':>13s} {'decodificar µs':>15s}")
+    print("─" * 56)
+    for nome in codecs_disponiveis():
+        codec = obter_codec(nome)
+        for tipo, src_mac, dst_mac, pacote in quadros_de_exemplo():
+            dados = codec.codificar(src_mac, dst_mac, pacote)
+            quadro, integro = codec.decodificar(dados)
+            assert integro and quadro["data"] == pacote, f"{nome} não preserva o quadro"
+
+            t_cod = timeit.timeit(lambda: codec.codificar(src_mac, dst_mac, pacote), number=n)
+            t_dec = timeit.timeit(lambda: codec.decodificar(dados), number=n)
+            print(f"{nome:10s} {tipo:7s} {len(dados):6d} {t_cod / n * 1e6:13.2f} {t_dec / n * 1e6:15.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Microbenchmark dos codecs de quadro")
+    parser.add_argument("--n", type=int, default=20000, help="repetições por medida")
+    medir(parser.parse_args().n)
@@ -0,0 +1,191 @@
+"""
+captura.py - Captura de quadros (tap) para depuração do roteador e do servidor
+
+Registra cada quadro bruto recebido, com timestamp e o veredito dado pelo
+nó (CRC falhou, TTL expirado, encaminhado...), em um buffer circular na
+memória. Uma thread de fundo descarrega o buffer periodicamente num arquivo
+de trace, de modo que o laço de recepção nunca toca o disco.
+
+Custo no caminho quente: uma tupla e uma atribuição em lista pré-alocada por
+quadro (os bytes recebidos não são copiados). Se o disco não acompanhar, os
+registros mais antigos são sobrescritos e contados em `perdidos`.
+
+Formato do arquivo: pcap clássico (libpcap 2.4) com linktype USER0 (147).
+Cada registro contém 1 byte de veredito seguido do quadro bruto, então o
+trace abre no Wireshark/tcpdump e também é lido por ler_trace().
+
+Uso:
+  python router.py --porta 5000 --rotas rotas.conf --captura roteador.pcap
+  python server.py --porta 5003 --roteador 5000 --captura servidor.pcap
+"""
+
+import os
+import time
+import struct
+import atexit
+import threading
+
+# ──────────────────────────────────────────────
+# VEREDITOS
+# ──────────────────────────────────────────────
+VEREDITO_CRC_OK      = 0   # Quadro íntegro, ainda sem decisão de camada superior
+VEREDITO_CRC_FALHA   = 1   # CRC inválido ou JSON destruído
+VEREDITO_TTL         = 2   # Descartado por TTL expirado
+VEREDITO_SEM_ROTA    = 3   # Descartado: destino fora da tabela
+VEREDITO_ENCAMINHADO = 4   # Roteador: reenviado ao próximo salto
+VEREDITO_ENTREGUE    = 5   # Servidor: entregue ao transporte/aplicação
+VEREDITO_ARP         = 6   # Consumido pelo agente ARP
+VEREDITO_MALFORMADO  = 7   # CRC ok, mas cabeçalhos ausentes/inválidos
+VEREDITO_FILA        = 8   # Roteador: descartado pela fila de saída (cheia ou RED)
+VEREDITO_LIMITE      = 9   # Roteador: VIP de origem acima do limite de taxa
+VEREDITO_MTU         = 10  # Roteador: quadro maior que a MTU do enlace de saída
+
+NOMES_VEREDITO = {
+    VEREDITO_CRC_OK     : "CRC_OK",
+    VEREDITO_CRC_FALHA  : "CRC_FALHA",
+    VEREDITO_TTL        : "TTL",
+    VEREDITO_SEM_ROTA   : "SEM_ROTA",
+    VEREDITO_ENCAMINHADO: "ENCAMINHADO",
+    VEREDITO_ENTREGUE   : "ENTREGUE",
+    VEREDITO_ARP        : "ARP",
+    VEREDITO_MALFORMADO : "MALFORMADO",
+    VEREDITO_FILA       : "FILA",
+    VEREDITO_LIMITE     : "LIMITE",
+    VEREDITO_MTU        : "MTU",
+}
+
+# ──────────────────────────────────────────────
+# FORMATO PCAP
+# ──────────────────────────────────────────────
+PCAP_MAGIC      = 0xA1B2C3D4
+LINKTYPE_USER0  = 147
+SNAPLEN         = 65536
+CABECALHO_PCAP  = struct.Struct("<IHHiIII")
+CABECALHO_REG   = struct.Struct("<IIII")
+
+CAPACIDADE_PADRAO = 65536    # registros no buffer circular
+INTERVALO_PADRAO  = 0.5      # segundos entre descargas
+
+# ──────────────────────────────────────────────
+# CORES ANSI
+# ──────────────────────────────────────────────
+VERMELHO = "\033[91m"
+VERDE    = "\033[92m"
+RESET    = "\033[0m"
+
+
+def log(camada: str, msg: str, cor: str = ""):
+    print(f"{cor}[{camada}] {msg}{RESET}")
+
+
+# ══════════════════════════════════════════════════════════════════
+# CAPTURA
+# ══════════════════════════════════════════════════════════════════
+class Captura:
+    """Buffer circular de quadros + thread que o descarrega em pcap."""
+
+    def __init__(self, caminho: str, capacidade: int = CAPACIDADE_PADRAO,
+                 intervalo: float = INTERVALO_PADRAO):
+        self.caminho    = caminho
+        self.capacidade = capacidade
+        self.intervalo  = intervalo
+        self.perdidos   = 0
+
+        self._buffer  = [None] * capacidade
+        self._escrita = 0          # total de registros produzidos
+        self._lidos   = 0          # total de registros já descarregados
+        self._parar   = threading.Event()
+        self._thread  = None
+
+    def registrar(self, dados: bytes, veredito: int):
+        """Caminho quente: chamado pelo laço de recepção a cada quadro."""
+        i = self._escrita
+        self._buffer[i % self.capacidade] = (time.time(), veredito, dados)
+        self._escrita = i + 1
+
+    def iniciar(self):
+        novo = not os.path.exists(self.caminho) or os.path.getsize(self.caminho) == 0
+        self._arquivo = open(self.caminho, "ab")
+        if novo:
+            self._arquivo.write(CABECALHO_PCAP.pack(PCAP_MAGIC, 2, 4, 0, 0, SNAPLEN, LINKTYPE_USER0))
+
+        self._thread = threading.Thread(target=self._laco, name="captura", daemon=True)
+        self._thread.start()
+        atexit.register(self.parar)
+        log("CAPTURA", f"Gravando quadros em {self.caminho}", VERDE)
+        return self
+
+    def parar(self):
+        if self._thread is None:
+            return
+        self._parar.set()
+        self._thread.join()
+        self._thread = None
+        self._descarregar()
+        self._arquivo.close()
+        if self.perdidos:
+            log("CAPTURA", f"{self.perdidos} registro(s) sobrescritos antes da gravação", VERMELHO)
+
+    def _laco(self):
+        while not self._parar.wait(self.intervalo):
+            self._descarregar()
+
+    def _descarregar(self):
+        fim = self._escrita
+        inicio = self._lidos
+        if fim - inicio > self.capacidade:
+            self.perdidos += fim - inicio - self.capacidade
+            inicio = fim - self.capacidade
+
+        partes = []
+        for i in range(inicio, fim):
+            ts, veredito, dados = self._buffer[i % self.capacidade]
+            segundos = int(ts)
+            tamanho  = len(dados) + 1
+            partes.append(CABECALHO_REG.pack(segundos, int((ts - segundos) * 1e6),
+                                             tamanho, tamanho))
+            partes.append(bytes((veredito,)))
+            partes.append(dados)
+
+        self._lidos = fim
+        if partes:
+            self._arquivo.write(b"".join(partes))
+            self._arquivo.flush()
+
+
+# ══════════════════════════════════════════════════════════════════
+# LEITURA
+# ══════════════════════════════════════════════════════════════════
+def ler_trace(caminho: str):
+    """Gera (timestamp, veredito, quadro_bytes) de um trace gravado por Captura."""
+    with open(caminho, "rb") as arquivo:
+        cabecalho = arquivo.read(CABECALHO_PCAP.size)
+        if len(cabecalho) < CABECALHO_PCAP.size:
+            return
+        magic, *_, linktype = CABECALHO_PCAP.unpack(cabecalho)
+        if magic != PCAP_MAGIC or linktype != LINKTYPE_USER0:
+            raise ValueError(f"{caminho} não é um trace Mini-NET")
+
+        while len(reg := arquivo.read(CABECALHO_REG.size)) == CABECALHO_REG.size:
+            segundos, micros, tamanho, _ = CABECALHO_REG.unpack(reg)
+            conteudo = arquivo.read(tamanho)
+            if len(conteudo) < tamanho:
+                break
+            yield segundos + micros / 1e6, conteudo[0], conteudo[1:]
+
+
+if __name__ == "__main__":
+    import sys
+    from collections import Counter
+
+    if len(sys.argv) != 2:
+        print("Uso: python captura.py ARQUIVO.pcap")
+        sys.exit(2)
+
+    contagem = Counter()
+    for ts, veredito, quadro in ler_trace(sys.argv[1]):
+        contagem[veredito] += 1
+        print(f"{ts:.6f}  {NOMES_VEREDITO.get(veredito, veredito):12s} {len(quadro):6d} B")
+    print()
+    for veredito, n in sorted(contagem.items()):
+        print(f"  {NOMES_VEREDITO.get(veredito, veredito):12s} {n}")
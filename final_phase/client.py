@@ -2,12 +2,43 @@
 client.py - Cliente da Fase 4: Camada de Enlace
 
 Implementa a pilha completa (L7 -> L2) e envia mensagens via Roteador.
+
+Uso:
+  python client.py                                     (interativo)
+  python client.py --porta 5001 --vip HOST_A --roteador 127.0.0.1:5000
+                   --destino SERVIDOR --nome Alice --stdin < mensagens.txt
+  tail -f app.log | python client.py --porta 5001 --vip HOST_A --roteador 5000 --stdin
+
+No modo streaming (--stdin ou --arquivo) cada linha vira uma mensagem e o
+cliente termina imprimindo o resumo de entregues, retransmitidas e falhas
+(código de saída 1 se alguma mensagem falhou).
 """
 
+import sys
+import time
+import queue
 import socket
+import threading
 import json
+import argparse
 from datetime import datetime
-from protocol import Segmento, Pacote, Quadro, enviar_pela_rede_ruidosa
+from protocol import Segmento, Pacote
+from molde import obter_molde
+from codificacao import (decodificar_quadro, codec_envio, definir_codec_envio,
+                         codecs_disponiveis, CODEC_JSON)
+import perfil
+import fec
+import fisica
+from fisica import abrir_socket, transmitir
+from arp import NoARP, mac_local, MAC_BROADCAST, VIP_ROTEADOR
+from transferencia import enviar_arquivo
+from paridade import SegmentoGrupo, payload_paridade, em_grupos
+from portas import (SegmentoPortas, portas_do_segmento, PORTA_LEGADO, PORTA_CHAT,
+                    PORTA_ARQUIVO)
+from icmp import ErroICMP, eh_icmp, PACOTE_GRANDE
+from pmtu import CachePMTU
+from temporizador import RodaTemporizadores
+from historico import SegmentoHistorico, eh_segmento_de_historico, LOTE_BYTES, COPIAS_PEDIDO
 
 # ──────────────────────────────────────────────
 # CONFIGURAÇÕES
@@ -15,14 +46,7 @@ from protocol import Segmento, Pacote, Quadro, enviar_pela_rede_ruidosa
 TIMEOUT_SEGUNDOS = 3.0
 BUFFER_SIZE      = 65535
 TTL_INICIAL      = 8
-
-# Tabela de MACs fictícios (ARP simulado — estático)
-TABELA_MAC = {
-    "HOST_A"  : "AA:AA:AA:AA:AA:01",
-    "HOST_B"  : "BB:BB:BB:BB:BB:02",
-    "SERVIDOR": "CC:CC:CC:CC:CC:03",
-    "ROTEADOR": "DD:DD:DD:DD:DD:04",
-}
+TENTATIVAS_APOS_QUORUM = 3   # VIP de grupo: reenvios a quem falta depois de --confirmacoes ACKs
 
 # ──────────────────────────────────────────────
 # CORES ANSI
@@ -43,36 +67,56 @@ def log(camada: str, msg: str, cor: str = ""):
 # ══════════════════════════════════════════════════════════════════
 # HELPERS DE EMPACOTAMENTO / DESEMPACOTAMENTO
 # ══════════════════════════════════════════════════════════════════
-def construir_quadro(segmento: Segmento, src_vip: str, dst_vip: str) -> bytes:
+def construir_quadro(segmento: Segmento, src_vip: str, dst_vip: str,
+                     dst_mac: str = MAC_BROADCAST) -> bytes:
     """
     Empilha todas as camadas e serializa com CRC:
-      Segmento → Pacote → Quadro.serializar()
-    O MAC de destino sempre aponta para o Roteador (próximo salto).
+      Segmento → Pacote → Quadro
+    O MAC de destino é o do Roteador (próximo salto), resolvido via ARP.
+
+    Com o codec json, os cabeçalhos de Pacote e Quadro vêm de um molde
+    pré-montado por par (ver molde.py): só o segmento é codificado a cada
+    mensagem e o CRC32 continua do estado já calculado para o prefixo fixo.
+    Outros codecs (ver codificacao.py) codificam o quadro inteiro.
+    Com o modo FEC ligado, o resultado é protegido por fec.py.
     """
-    # Camada 4 → 3: envolve Segmento em Pacote
-    pacote = Pacote(
-        src_vip       = src_vip,
-        dst_vip       = dst_vip,
-        ttl           = TTL_INICIAL,
-        segmento_dict = segmento.to_dict()
-    )
+    t = perfil.agora() if perfil.ATIVO else 0
+
+    codec = codec_envio()
+    if codec is not CODEC_JSON:
+        pacote = Pacote(src_vip=src_vip, dst_vip=dst_vip, ttl=TTL_INICIAL,
+                        segmento_dict=segmento.to_dict())
+        quadro_bytes = codec.codificar(mac_local(src_vip), dst_mac, pacote.to_dict())
+        if perfil.ATIVO:
+            perfil.registrar(f"construir.{codec.nome}", t)
+        return fec.enquadrar(quadro_bytes)
+
+    # Camadas 3 e 2: cabeçalhos fixos para (MACs, VIPs, TTL)
+    molde = obter_molde(mac_local(src_vip), dst_mac, src_vip, dst_vip, TTL_INICIAL)
 
-    # Camada 3 → 2: envolve Pacote em Quadro com MACs
-    src_mac = TABELA_MAC.get(src_vip, "00:00:00:00:00:00")
-    dst_mac = TABELA_MAC.get("ROTEADOR")   # próximo salto é sempre o roteador
+    if perfil.ATIVO:
+        perfil.registrar("construir.molde", t)
+        t = perfil.agora()
 
-    quadro = Quadro(src_mac=src_mac, dst_mac=dst_mac, pacote_dict=pacote.to_dict())
+    # Camada 4: encaixa o segmento e calcula o FCS
+    quadro_bytes = molde.montar(segmento.to_dict())
 
-    # serializar() calcula e embute o CRC32 automaticamente
-    return quadro.serializar()
+    if perfil.ATIVO:
+        perfil.registrar("construir.serializar", t)
+    return fec.enquadrar(quadro_bytes)
 
 
-def receber_quadro(dados_brutos: bytes, meu_vip: str):
+def receber_quadro(dados_brutos: bytes, meu_vip: str,
+                   no_arp: NoARP = None, endereco_origem=None):
     """
     Desserializa bytes e verifica CRC (Camada de Enlace).
+    Quadros ARP são consumidos aqui pelo `no_arp` e não sobem de camada.
     Retorna (pacote_dict, segmento_dict) ou (None, None) se inválido.
     """
-    quadro_dict, integro = Quadro.deserializar(dados_brutos)
+    if perfil.ATIVO:
+        quadro_dict, integro = perfil.decodificar_medido(dados_brutos)
+    else:
+        quadro_dict, integro = decodificar_quadro(dados_brutos)
 
     if quadro_dict is None:
         log("ENLACE", "Quadro destruído (JSON inválido) → descartado", VERMELHO)
@@ -88,6 +132,9 @@ def receber_quadro(dados_brutos: bytes, meu_vip: str):
         f"CRC OK ✓ | {quadro_dict['src_mac']} → {quadro_dict['dst_mac']}",
         AZUL)
 
+    if no_arp is not None and no_arp.processar(quadro_dict, endereco_origem):
+        return None, None
+
     try:
         pacote_dict   = quadro_dict["data"]
         segmento_dict = pacote_dict["data"]
@@ -98,97 +145,103 @@ def receber_quadro(dados_brutos: bytes, meu_vip: str):
 
 
 # ══════════════════════════════════════════════════════════════════
-# CLIENTE
+# TRANSPORTE (Stop-and-Wait)
 # ══════════════════════════════════════════════════════════════════
-def run_client(
-    minha_porta: int,
-    meu_vip: str,
-    ip_roteador: str,
-    porta_roteador: int,
-    dst_vip: str,
-    nome: str
-):
+class Transporte:
     """
-    Cliente com pilha completa (L7 → L2).
-    Encapsula cada mensagem em Quadro com CRC antes de enviar.
+    Estado da Camada de Transporte do cliente: socket, agente ARP, portas
+    do fluxo e número de sequência alternante (0/1) do Stop-and-Wait.
+    Portas (0, 0) = modo legado, sem portas no quadro. A recepção é do
+    Fluxo (abaixo), que também é o transporte de fluxo único.
+    Enquanto `sinc` não é None, as mensagens levam essa época e o receptor
+    adota o SEQ delas (ver portas.py): vale para a primeira mensagem e para
+    a seguinte a uma desistência.
     """
-    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    sock.bind(("127.0.0.1", minha_porta))
-    sock.settimeout(TIMEOUT_SEGUNDOS)
-
-    endereco_roteador = (ip_roteador, porta_roteador)
-
-    log("CLIENTE", f"VIP={meu_vip} | MAC={TABELA_MAC.get(meu_vip)} | Porta={minha_porta}", VERDE)
-    log("CLIENTE", f"Destino={dst_vip} via Roteador {ip_roteador}:{porta_roteador}", VERDE)
-    log("CLIENTE", f"Logado como '{nome}'. Digite sua mensagem.\n", VERDE)
-
-    seq_num = 0
-
-    while True:
-        try:
-            texto = input(f"{nome}> ").strip()
-        except (EOFError, KeyboardInterrupt):
-            log("CLIENTE", "Encerrando...", AMARELO)
-            break
-
-        if not texto:
-            continue
 
-        # ── L7: Aplicação ──
-        payload = {
-            "type"     : "CHAT",
-            "sender"   : nome,
-            "message"  : texto,
-            "timestamp": datetime.now().isoformat()
-        }
+    def __init__(self, sock, meu_vip: str, endereco_roteador, no_arp: NoARP,
+                 portas: tuple[int, int] = (0, 0)):
+        self.sock              = sock
+        self.meu_vip           = meu_vip
+        self.endereco_roteador = endereco_roteador
+        self.no_arp            = no_arp
+        self.src_port, self.dst_port = portas
+        self.seq_num           = 0
+        # Destino VIP de grupo: mínimo de ACKs de VIPs distintos por mensagem
+        # (o quórum) e os membros que receberam a última cópia, vindos dos ACKs
+        self.confirmacoes      = 1
+        self.membros: dict[str, tuple] = {}
+        # MTU do caminho por VIP de destino, aprendida dos erros do roteador
+        self.pmtu              = CachePMTU()
+        # Modo paridade: o número do grupo parte do relógio para que um
+        # cliente reiniciado não repita grupos que o servidor já entregou
+        self.grupo             = int(time.time() * 1000) % (1 << 31)
+        # Época de ressincronização, também do relógio: um cliente reiniciado
+        # começa com SEQ 0 sem saber o que o servidor espera
+        self.sinc              = self.grupo
+
+    def enviar(self, payload: dict, dst_vip: str, max_tentativas: int = None):
+        """
+        Envia um payload de aplicação e bloqueia até o ACK correspondente.
+        Retorna o número de tentativas usadas, ou None se `max_tentativas`
+        se esgotou sem ACK, se o quadro não cabe na PMTU conhecida de
+        `dst_vip` ou se o roteador avisou que o pacote não tem como chegar
+        (ver icmp.py e pmtu.py). Sem ACK não dá para saber se o servidor
+        recebeu a mensagem (e alternou o SEQ esperado) ou não, então depois
+        de esgotar `max_tentativas` a próxima mensagem sai com uma época de
+        ressincronização nova em vez de ser descartada como duplicata.
+        Para um VIP de grupo, a espera vai até o ACK de todos os membros para
+        os quais o roteador a replicou (a lista vem nos próprios ACKs); quem
+        já confirmou responde às retransmissões como duplicata. Alcançado o
+        quórum de `self.confirmacoes` membros distintos, os que faltam têm
+        mais TENTATIVAS_APOS_QUORUM reenvios: depois disso a mensagem conta
+        como entregue, os faltantes são informados e a próxima mensagem sai
+        com época nova, para que eles não a descartem como duplicata.
+        """
+        seq_num     = self.seq_num
+        confirmados = set()
 
         # ── L4 → L2: empilha camadas e calcula CRC ──
-        seg       = Segmento(seq_num=seq_num, is_ack=False, payload=payload)
-        quadro_bytes = construir_quadro(seg, src_vip=meu_vip, dst_vip=dst_vip)
+        mac_roteador = self.no_arp.resolver(VIP_ROTEADOR, self.endereco_roteador)
+        seg          = SegmentoPortas(seq_num, False, payload, self.src_port, self.dst_port,
+                                      self.sinc)
+        quadro_bytes = construir_quadro(seg, src_vip=self.meu_vip, dst_vip=dst_vip,
+                                        dst_mac=mac_roteador)
 
         log("ENLACE",
-            f"Quadro criado com CRC32 | MAC {TABELA_MAC.get(meu_vip)} → {TABELA_MAC.get('ROTEADOR')}",
+            f"Quadro criado com CRC32 | MAC {self.no_arp.meu_mac} → {mac_roteador}",
             AZUL)
-        log("REDE",   f"Pacote | {meu_vip} → {dst_vip} | TTL={TTL_INICIAL}", MAGENTA)
+        if not self._cabe_na_pmtu(quadro_bytes, dst_vip):
+            return None
+        log("REDE",   f"Pacote | {self.meu_vip} → {dst_vip} | TTL={TTL_INICIAL}", MAGENTA)
         log("TRANSPORTE", f"Segmento | SEQ={seq_num}", CIANO)
 
-        tentativas = 0
+        tentativas, apos_quorum = 0, 0
 
         # ── Stop-and-Wait ──
-        while True:
+        while max_tentativas is None or tentativas < max_tentativas:
+            if self._quorum(confirmados):
+                if apos_quorum >= TENTATIVAS_APOS_QUORUM:
+                    break
+                apos_quorum += 1
             tentativas += 1
             log("TRANSPORTE",
                 f"Enviando SEQ={seq_num} via Roteador | Tentativa #{tentativas}",
                 CIANO)
 
-            enviar_pela_rede_ruidosa(sock, quadro_bytes, endereco_roteador)
+            t = perfil.agora() if perfil.ATIVO else 0
+            transmitir(self.sock, quadro_bytes, self.endereco_roteador)
+            if perfil.ATIVO:
+                perfil.registrar("canal.enviar", t)
 
             try:
-                ack_bruto, _ = sock.recvfrom(BUFFER_SIZE)
-
-                # ── L2: verifica CRC do ACK recebido ──
-                ack_pkt_dict, ack_seg_dict = receber_quadro(ack_bruto, meu_vip)
-
-                if ack_pkt_dict is None:
-                    log("TRANSPORTE", "ACK com CRC inválido → retransmitindo...", VERMELHO)
-                    continue
-
-                # ── L3: confere destino ──
-                if ack_pkt_dict.get("dst_vip") != meu_vip:
-                    log("REDE", "ACK não endereçado a mim → ignorando", AMARELO)
-                    continue
-
-                # ── L4: confere número de sequência ──
-                if ack_seg_dict.get("is_ack") and ack_seg_dict.get("seq_num") == seq_num:
+                if self._esperar_ack(seq_num, dst_vip, confirmados):
                     log("TRANSPORTE",
                         f"✓ ACK {seq_num} recebido e íntegro! Mensagem entregue.",
                         VERDE)
-                    seq_num = 1 - seq_num
-                    break
-                else:
-                    log("TRANSPORTE",
-                        f"ACK inesperado (seq={ack_seg_dict.get('seq_num')}) → retransmitindo...",
-                        AMARELO)
+                    self.seq_num = 1 - seq_num
+                    self.sinc    = None
+                    return tentativas
+                log("TRANSPORTE", "ACK com CRC inválido → retransmitindo...", VERMELHO)
 
             except socket.timeout:
                 log("TRANSPORTE",
@@ -198,26 +251,719 @@ def run_client(
             except (json.JSONDecodeError, UnicodeDecodeError):
                 log("TRANSPORTE", "ACK ilegível → retransmitindo...", VERMELHO)
 
+            except ErroICMP as erro:
+                log("REDE", f"✗ Roteador: {erro} → SEQ={seq_num} descartada", VERMELHO)
+                self._aprender_pmtu(erro, dst_vip)
+                return None
+
+        if self._quorum(confirmados):
+            self._avisar_faltantes(f"SEQ={seq_num}", dst_vip, confirmados)
+            self.seq_num = 1 - seq_num
+            self._ressincronizar()
+            return tentativas
+
+        log("TRANSPORTE",
+            f"✗ SEQ={seq_num} sem ACK após {tentativas} tentativa(s) → mensagem descartada; "
+            f"a próxima ressincroniza o SEQ", VERMELHO)
+        self._ressincronizar()
+        return None
+
+    def _ressincronizar(self):
+        """A próxima mensagem sai com uma época de ressincronização nova."""
+        self.sinc = ((self.sinc if self.sinc is not None else self.grupo) + 1) % (1 << 31)
+
+    def _quorum(self, confirmados: set) -> bool:
+        """Já há ACKs de `self.confirmacoes` membros distintos (VIP de grupo)."""
+        return bool(confirmados) and len(confirmados) >= self.confirmacoes
+
+    def _avisar_faltantes(self, rotulo: str, dst_vip: str, confirmados: set):
+        faltam = sorted(set(self.membros.get(dst_vip, ())) - confirmados)
+        log("TRANSPORTE",
+            f"✓ {rotulo} entregue a {', '.join(sorted(confirmados))}; sem ACK de "
+            f"{', '.join(faltam) or 'membros desconhecidos'} após o quórum → seguindo", AMARELO)
+
+    def enviar_grupo(self, payloads: list, dst_vip: str, max_tentativas: int = None):
+        """
+        Modo paridade (ver paridade.py): envia os K payloads e um segmento
+        de paridade em sequência e espera um único ACK do grupo. O servidor
+        reconstrói sozinho um segmento perdido; no timeout o grupo inteiro é
+        reenviado. Retorna as tentativas usadas, ou None se esgotaram.
+        """
+        grupo, k = self.grupo, len(payloads)
+
+        mac_roteador = self.no_arp.resolver(VIP_ROTEADOR, self.endereco_roteador)
+        portas    = (self.src_port, self.dst_port)
+        segmentos = [SegmentoGrupo(grupo, i, k, False, p, *portas)
+                     for i, p in enumerate(payloads)]
+        segmentos.append(SegmentoGrupo(grupo, k, k, False, payload_paridade(payloads), *portas))
+        quadros = [construir_quadro(seg, src_vip=self.meu_vip, dst_vip=dst_vip,
+                                    dst_mac=mac_roteador)
+                   for seg in segmentos]
+
+        log("TRANSPORTE", f"Grupo {grupo} | {k} segmento(s) + 1 de paridade", CIANO)
+        if not self._cabe_na_pmtu(max(quadros, key=len), dst_vip):
+            self.grupo = (grupo + 1) % (1 << 31)
+            return None
+
+        tentativas, apos_quorum = 0, 0
+        confirmados = set()
+        while max_tentativas is None or tentativas < max_tentativas:
+            if self._quorum(confirmados):
+                if apos_quorum >= TENTATIVAS_APOS_QUORUM:
+                    break
+                apos_quorum += 1
+            tentativas += 1
+            log("TRANSPORTE",
+                f"Enviando grupo {grupo} via Roteador | Tentativa #{tentativas}", CIANO)
+
+            for quadro_bytes in quadros:
+                t = perfil.agora() if perfil.ATIVO else 0
+                transmitir(self.sock, quadro_bytes, self.endereco_roteador)
+                if perfil.ATIVO:
+                    perfil.registrar("canal.enviar", t)
+
+            try:
+                confirmado = self._esperar_ack_grupo(grupo, dst_vip, confirmados)
+            except ErroICMP as erro:
+                log("REDE", f"✗ Roteador: {erro} → grupo {grupo} descartado", VERMELHO)
+                self._aprender_pmtu(erro, dst_vip)
+                self.grupo = (grupo + 1) % (1 << 31)
+                return None
+            if confirmado:
+                log("TRANSPORTE", f"✓ ACK do grupo {grupo} recebido! {k} mensagem(ns) entregue(s).",
+                    VERDE)
+                self.grupo = (grupo + 1) % (1 << 31)
+                return tentativas
+
+            log("TRANSPORTE",
+                f"Timeout após {TIMEOUT_SEGUNDOS}s → retransmitindo grupo {grupo}...",
+                AMARELO)
+
+        self.grupo = (grupo + 1) % (1 << 31)
+        if self._quorum(confirmados):
+            self._avisar_faltantes(f"Grupo {grupo}", dst_vip, confirmados)
+            return tentativas
+
+        log("TRANSPORTE",
+            f"✗ Grupo {grupo} sem ACK após {tentativas} tentativa(s) → descartado",
+            VERMELHO)
+        return None
+
+    def pedir_historico(self, pedido: dict, dst_vip: str, max_tentativas: int = None):
+        """
+        Pede a `dst_vip` o histórico de mensagens (ver historico.py):
+        `pedido` = {"ultimos": N} ou {"desde": instante}. O servidor responde
+        com todas as partes de uma vez; a cada rodada que termina sem todas,
+        o pedido é reenviado só com as partes que faltam. Uma rodada termina
+        quando passa TIMEOUT_SEGUNDOS sem chegar parte nova.
+        Retorna as mensagens em ordem, ou None se `max_tentativas` rodadas
+        seguidas terminaram sem parte nova ou o roteador avisou que o pedido
+        não tem como chegar.
+        """
+        id_pedido = int(time.time() * 1000) % (1 << 31)
+        lote      = min(LOTE_BYTES, self.pmtu.obter(dst_vip) // 2)
+        recebidas: dict[int, list] = {}
+        partes    = None
+
+        mac_roteador = self.no_arp.resolver(VIP_ROTEADOR, self.endereco_roteador)
+        rodadas, tentativas = 0, 0      # tentativas: rodadas seguidas sem parte nova
+        while max_tentativas is None or tentativas < max_tentativas:
+            rodadas    += 1
+            tentativas += 1
+            extras = {"lote": lote, "rodada": rodadas}
+            if partes is not None:
+                extras["faltando"] = sorted(set(range(partes)) - recebidas.keys())
+            seg = SegmentoHistorico(id_pedido, 0, pedido, None,
+                                    self.src_port, self.dst_port, **extras)
+            quadro_bytes = construir_quadro(seg, src_vip=self.meu_vip, dst_vip=dst_vip,
+                                            dst_mac=mac_roteador)
+            log("TRANSPORTE", f"Pedido de histórico {id_pedido} | Rodada #{rodadas}"
+                              + (f" | faltam {len(extras['faltando'])} de {partes} parte(s)"
+                                 if partes is not None else ""), CIANO)
+
+            for _ in range(COPIAS_PEDIDO):
+                t = perfil.agora() if perfil.ATIVO else 0
+                transmitir(self.sock, quadro_bytes, self.endereco_roteador)
+                if perfil.ATIVO:
+                    perfil.registrar("canal.enviar", t)
+
+            antes = len(recebidas)
+            try:
+                partes = self._receber_partes(id_pedido, dst_vip, recebidas, partes)
+            except ErroICMP as erro:
+                log("REDE", f"✗ Roteador: {erro} → pedido de histórico descartado", VERMELHO)
+                self._aprender_pmtu(erro, dst_vip)
+                return None
+            if partes is not None and len(recebidas) == partes:
+                mensagens = [m for i in range(partes) for m in recebidas[i]]
+                log("TRANSPORTE", f"✓ Histórico completo: {len(mensagens)} mensagem(ns) em "
+                                  f"{partes} parte(s), {rodadas} rodada(s)", VERDE)
+                return mensagens
+            if len(recebidas) > antes:
+                tentativas = 0
+
+        log("TRANSPORTE", f"✗ Histórico incompleto após {rodadas} rodada(s)", VERMELHO)
+        return None
+
+    def _receber_partes(self, id_pedido: int, dst_vip: str, recebidas: dict, partes):
+        """
+        Junta em `recebidas` (índice → mensagens) as partes do pedido que
+        chegarem até passar TIMEOUT_SEGUNDOS sem nenhuma nova, ou até estarem
+        todas. Retorna o total de partes (None se nenhuma chegou ainda).
+        """
+        prazo = time.monotonic() + TIMEOUT_SEGUNDOS
+        while partes is None or len(recebidas) < partes:
+            restante = prazo - time.monotonic()
+            if restante <= 0:
+                break
+            try:
+                pkt_dict, seg_dict = self._receber(restante)
+            except socket.timeout:
+                break
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                continue
+
+            if pkt_dict is None or pkt_dict.get("dst_vip") != self.meu_vip:
+                continue
+            if eh_icmp(seg_dict):
+                erro = ErroICMP(seg_dict["icmp"])
+                if erro.refere_se_a(dst_vip, historico=id_pedido, src_port=self.src_port,
+                                    dst_port=self.dst_port):
+                    raise erro
+                continue
+            if not (eh_segmento_de_historico(seg_dict) and seg_dict["historico"] == id_pedido):
+                continue
+            try:
+                indice, total = seg_dict["seq_num"], seg_dict["partes"]
+                recebidas[indice] = seg_dict["payload"]["mensagens"]
+            except (KeyError, TypeError):
+                continue
+            partes = total
+            prazo  = time.monotonic() + TIMEOUT_SEGUNDOS
+        return partes
+
+    def tamanho_quadro(self, payload: dict, dst_vip: str) -> int:
+        """Bytes do quadro que `enviar` montaria para este payload."""
+        seg = SegmentoPortas(self.seq_num, False, payload, self.src_port, self.dst_port,
+                             self.sinc)
+        return len(construir_quadro(seg, src_vip=self.meu_vip, dst_vip=dst_vip,
+                                    dst_mac=MAC_BROADCAST))
+
+    def _cabe_na_pmtu(self, quadro_bytes: bytes, dst_vip: str) -> bool:
+        pmtu = self.pmtu.obter(dst_vip)
+        if len(quadro_bytes) <= pmtu:
+            return True
+        log("TRANSPORTE",
+            f"✗ Quadro de {len(quadro_bytes)} B excede a PMTU de {dst_vip} ({pmtu} B) "
+            f"→ mensagem descartada", VERMELHO)
+        return False
+
+    def _aprender_pmtu(self, erro: ErroICMP, dst_vip: str):
+        if erro.tipo == PACOTE_GRANDE and isinstance(erro.mtu, int):
+            if self.pmtu.registrar(dst_vip, erro.mtu):
+                log("REDE", f"PMTU de {dst_vip} reduzida para {self.pmtu.obter(dst_vip)} B",
+                    AMARELO)
+
+    def _esperar_ack(self, seq_num: int, dst_vip: str, confirmados: set) -> bool:
+        """
+        Aguarda até TIMEOUT_SEGUNDOS até que `confirmados` (VIPs que já
+        confirmaram `seq_num`) alcance as confirmações exigidas (ver
+        _confirmacoes_exigidas). ACKs de outro SEQ
+        (duplicatas atrasadas, ou confirmações de membros de um grupo que
+        chegam depois) são ignorados sem retransmitir.
+        Retorna False se chegou um quadro com CRC inválido; levanta
+        socket.timeout no fim do prazo e ErroICMP se o roteador avisou que
+        o pacote não tem como chegar a `dst_vip`.
+        """
+        prazo = time.monotonic() + TIMEOUT_SEGUNDOS
+        while True:
+            restante = prazo - time.monotonic()
+            if restante <= 0:
+                raise socket.timeout
+            # ── L2: verifica CRC do ACK recebido ──
+            ack_pkt_dict, ack_seg_dict = self._receber(restante)
+            if ack_pkt_dict is None:
+                return False
+
+            # ── L3: confere destino ──
+            if ack_pkt_dict.get("dst_vip") != self.meu_vip:
+                log("REDE", "ACK não endereçado a mim → ignorando", AMARELO)
+                continue
+
+            if eh_icmp(ack_seg_dict):
+                erro = ErroICMP(ack_seg_dict["icmp"])
+                if erro.refere_se_a(dst_vip, seq_num=seq_num, src_port=self.src_port,
+                                    dst_port=self.dst_port):
+                    raise erro
+                continue
+
+            # ── L4: confere número de sequência ──
+            if ack_seg_dict.get("is_ack") and ack_seg_dict.get("seq_num") == seq_num:
+                confirmados.add(ack_pkt_dict.get("src_vip"))
+                if len(confirmados) >= self._confirmacoes_exigidas(dst_vip, ack_seg_dict):
+                    return True
+                continue
+            log("TRANSPORTE",
+                f"ACK inesperado (seq={ack_seg_dict.get('seq_num')}) → ignorado",
+                AMARELO)
+
+    def _confirmacoes_exigidas(self, dst_vip: str, ack_seg_dict: dict) -> int:
+        """
+        ACKs distintos para dar uma mensagem a `dst_vip` por completa: o
+        maior entre self.confirmacoes e os membros informados pelo ACK (ou
+        pelo último ACK desse destino, se este não trouxe o campo).
+        """
+        membros = ack_seg_dict.get("membros")
+        if isinstance(membros, list) and membros:
+            self.membros[dst_vip] = tuple(membros)
+        return max(self.confirmacoes, len(self.membros.get(dst_vip, ())) or 1)
+
+    def _esperar_ack_grupo(self, grupo: int, dst_vip: str, confirmados: set) -> bool:
+        """
+        Aguarda até TIMEOUT_SEGUNDOS pelo ACK do grupo (de cada membro, se
+        `dst_vip` for um VIP de grupo; `confirmados` acumula quem já
+        confirmou entre tentativas), ignorando o resto.
+        Levanta ErroICMP se o roteador devolveu algum segmento do grupo.
+        """
+        prazo = time.monotonic() + TIMEOUT_SEGUNDOS
+        while True:
+            restante = prazo - time.monotonic()
+            if restante <= 0:
+                return False
+            try:
+                ack_pkt_dict, ack_seg_dict = self._receber(restante)
+            except socket.timeout:
+                return False
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                continue
+
+            if ack_pkt_dict is None or ack_pkt_dict.get("dst_vip") != self.meu_vip:
+                continue
+            if eh_icmp(ack_seg_dict):
+                erro = ErroICMP(ack_seg_dict["icmp"])
+                if erro.refere_se_a(dst_vip, grupo=grupo, src_port=self.src_port,
+                                    dst_port=self.dst_port):
+                    raise erro
+                continue
+            if (ack_seg_dict.get("is_ack")
+                    and ack_seg_dict.get("grupo") == grupo):
+                confirmados.add(ack_pkt_dict.get("src_vip"))
+                if len(confirmados) >= self._confirmacoes_exigidas(dst_vip, ack_seg_dict):
+                    return True
+
+    def _receber(self, timeout: float):
+        """
+        Próximo quadro destinado a este transporte, como receber_quadro:
+        (pacote_dict, segmento_dict) ou (None, None) se inválido.
+        Levanta socket.timeout se nada chegar em `timeout` segundos.
+        Implementado por Fluxo: os quadros chegam pelo Multiplexador e o
+        prazo é um temporizador da roda dele.
+        """
+        raise NotImplementedError
+
+
+# ══════════════════════════════════════════════════════════════════
+# MULTIPLEXAÇÃO (vários fluxos por socket)
+# ══════════════════════════════════════════════════════════════════
+class _PrazoVencido:
+    """Marca que o temporizador de uma espera do Fluxo põe na fila ao vencer."""
+
+    __slots__ = ()
+
+
+class Fluxo(Transporte):
+    """
+    Transporte de um fluxo (par de portas) dentro de um Multiplexador: o
+    envio é o mesmo, mas os ACKs chegam pela fila que o Multiplexador
+    alimenta em vez de pelo socket. O prazo de cada espera é um temporizador
+    na roda compartilhada do Multiplexador (ver temporizador.py), que põe a
+    marca da espera na fila ao vencer: a espera não tem timeout próprio.
+    """
+
+    def __init__(self, mux: "Multiplexador", porta_local: int, porta_remota: int):
+        super().__init__(mux.sock, mux.meu_vip, mux.endereco_roteador, mux.no_arp,
+                         (porta_local, porta_remota))
+        self.fila: queue.Queue = queue.Queue()
+        self.pmtu = mux.pmtu     # a PMTU é do caminho, não do fluxo
+        self.temporizadores = mux.temporizadores
+
+    def _receber(self, timeout: float):
+        # A marca existe antes do temporizador: ele pode vencer (na thread da
+        # roda) antes mesmo de agendar() retornar
+        marca = _PrazoVencido()
+        prazo = self.temporizadores.agendar(timeout, self.fila.put, marca)
+        while True:
+            item = self.fila.get()
+            if not isinstance(item, _PrazoVencido):
+                prazo.cancelar()
+                return item
+            if item is marca:
+                raise socket.timeout
+            # Marca de uma espera anterior que venceu junto com a chegada do quadro
+
+
+class Multiplexador:
+    """
+    Vários fluxos sobre um único socket. Uma thread lê o socket e entrega
+    cada quadro à fila do Fluxo cuja porta local é o dst_port do segmento;
+    cada fluxo tem o próprio SEQ e a própria janela, então um fluxo parado
+    esperando ACK não bloqueia os demais. Os prazos de retransmissão de
+    todos os fluxos ficam numa única roda de temporizadores, avançada por
+    uma thread só, qualquer que seja o número de fluxos.
+    Com um fluxo só (abrir_transporte), um quadro inválido também vai para
+    ele como (None, None): só pode ser a resposta que ele espera, e o
+    Stop-and-Wait retransmite na hora.
+    """
+
+    def __init__(self, sock, meu_vip: str, endereco_roteador, no_arp: NoARP):
+        self.sock              = sock
+        self.meu_vip           = meu_vip
+        self.endereco_roteador = endereco_roteador
+        self.no_arp            = no_arp
+        self.pmtu              = CachePMTU()
+        self.temporizadores    = RodaTemporizadores().iniciar()
+        self._fluxos: dict[int, Fluxo] = {}
+        threading.Thread(target=self._ler, daemon=True).start()
+
+    def abrir_fluxo(self, porta_local: int, porta_remota: int) -> Fluxo:
+        if porta_local in self._fluxos:
+            raise ValueError(f"porta {porta_local} já em uso")
+        fluxo = Fluxo(self, porta_local, porta_remota)
+        self._fluxos[porta_local] = fluxo
+        return fluxo
+
+    def _ler(self):
+        self.sock.settimeout(None)
+        while True:
+            try:
+                dados_brutos, endereco_origem = self.sock.recvfrom(BUFFER_SIZE)
+            except OSError:
+                return   # socket fechado
+            try:
+                pacote_dict, seg_dict = receber_quadro(dados_brutos, self.meu_vip,
+                                                       self.no_arp, endereco_origem)
+                if pacote_dict is None:
+                    self._entregar_invalido()
+                    continue
+                if eh_icmp(seg_dict):
+                    # Erro do roteador: vai para o fluxo que enviou o original
+                    dst_port, _ = portas_do_segmento(seg_dict["icmp"].get("original", {}))
+                else:
+                    _, dst_port = portas_do_segmento(seg_dict)
+            except (json.JSONDecodeError, UnicodeDecodeError, AttributeError, TypeError):
+                self._entregar_invalido()
+                continue
+
+            fluxo = self._fluxos.get(dst_port)
+            if fluxo is None:
+                log("TRANSPORTE", f"Quadro para porta {dst_port} sem fluxo aberto → descartado",
+                    AMARELO)
+                continue
+            fluxo.fila.put((pacote_dict, seg_dict))
+
+    def _entregar_invalido(self):
+        if len(self._fluxos) == 1:
+            next(iter(self._fluxos.values())).fila.put((None, None))
+
+
+# ══════════════════════════════════════════════════════════════════
+# FONTES DE MENSAGENS (L7)
+# ══════════════════════════════════════════════════════════════════
+def mensagens_interativas(nome: str):
+    """Gera as mensagens digitadas no terminal até EOF/Ctrl+C."""
+    while True:
+        try:
+            texto = input(f"{nome}> ").strip()
+        except (EOFError, KeyboardInterrupt):
+            log("CLIENTE", "Encerrando...", AMARELO)
+            return
+        if texto:
+            yield texto
+
+
+def mensagens_de_fluxo(fluxo):
+    """Gera uma mensagem por linha não vazia de um arquivo aberto ou stdin."""
+    for linha in fluxo:
+        texto = linha.strip()
+        if texto:
+            yield texto
+
+
+# ══════════════════════════════════════════════════════════════════
+# CLIENTE
+# ══════════════════════════════════════════════════════════════════
+def abrir_multiplexador(minha_porta: int, meu_vip: str,
+                        ip_roteador: str, porta_roteador: int) -> Multiplexador:
+    """Cria o socket, faz o ARP inicial com o roteador e devolve o Multiplexador."""
+    sock = abrir_socket()
+    sock.bind(("127.0.0.1", minha_porta))
+
+    endereco_roteador = (ip_roteador, porta_roteador)
+
+    # ── L2: ARP — anuncia-se ao roteador e descobre o MAC dele ──
+    no_arp = NoARP(sock, meu_vip)
+    no_arp.anunciar(endereco_roteador)
+    no_arp.descobrir(VIP_ROTEADOR, endereco_roteador)
+
+    log("CLIENTE", f"VIP={meu_vip} | MAC={no_arp.meu_mac} | Porta={minha_porta}", VERDE)
+    return Multiplexador(sock, meu_vip, endereco_roteador, no_arp)
+
+
+def abrir_transporte(minha_porta: int, meu_vip: str,
+                     ip_roteador: str, porta_roteador: int) -> Transporte:
+    """Transporte de fluxo único (portas legadas) sobre um Multiplexador próprio."""
+    return abrir_multiplexador(minha_porta, meu_vip, ip_roteador,
+                               porta_roteador).abrir_fluxo(PORTA_LEGADO, PORTA_LEGADO)
+
+
+def run_client(
+    minha_porta: int,
+    meu_vip: str,
+    ip_roteador: str,
+    porta_roteador: int,
+    dst_vip: str,
+    nome: str,
+    mensagens=None,
+    max_tentativas: int = None,
+    paridade: int = 0,
+    transporte: Transporte = None,
+    confirmacoes: int = 1,
+    historico: dict = None,
+) -> dict:
+    """
+    Cliente com pilha completa (L7 → L2).
+    Encapsula cada mensagem em Quadro com CRC antes de enviar.
+
+    `mensagens` é qualquer iterável de textos (padrão: o terminal). Cada
+    mensagem é entregue ao transporte assim que o ACK da anterior chega.
+    Com `paridade` = K > 0, as mensagens seguem em grupos de K com um
+    quadro de paridade (ver paridade.py).
+    Com `transporte` (um Fluxo de Multiplexador, por exemplo), usa-o em vez
+    de abrir um socket próprio.
+    Com `dst_vip` de grupo, cada mensagem espera o ACK de todos os membros
+    alcançáveis (o roteador informa quais); com `confirmacoes` membros
+    distintos confirmados, os demais têm só TENTATIVAS_APOS_QUORUM reenvios.
+    Com `historico` ({"ultimos": N} ou {"desde": instante}), antes de enviar
+    pede ao destino as mensagens já entregues e as exibe (ver historico.py).
+    Retorna o resumo {"entregues", "retransmitidas", "falhas"}.
+    """
+    proprio = transporte is None
+    if proprio:
+        transporte = abrir_transporte(minha_porta, meu_vip, ip_roteador, porta_roteador)
+    transporte.confirmacoes = confirmacoes
+
+    log("CLIENTE", f"Destino={dst_vip} via Roteador {ip_roteador}:{porta_roteador}", VERDE)
+
+    if historico:
+        anteriores = transporte.pedir_historico(historico, dst_vip, max_tentativas or 10)
+        for registro in anteriores or []:
+            log("HISTÓRICO", f"[{registro.get('timestamp', '')[:19]}] "
+                             f"{registro.get('remetente')}: {registro.get('mensagem')}", VERDE)
         print()
 
+    if mensagens is None:
+        log("CLIENTE", f"Logado como '{nome}'. Digite sua mensagem.\n", VERDE)
+        mensagens = mensagens_interativas(nome)
+
+    # entregues: com ACK | retransmitidas: entregues após mais de uma tentativa
+    resumo = {"entregues": 0, "retransmitidas": 0, "falhas": 0}
+
+    # ── L7: Aplicação ──
+    payloads = ({
+        "type"     : "CHAT",
+        "sender"   : nome,
+        "message"  : texto,
+        "timestamp": datetime.now().isoformat()
+    } for texto in mensagens)
+
+    lotes = em_grupos(payloads, paridade) if paridade > 0 else ([p] for p in payloads)
+
+    for lote in lotes:
+        if paridade > 0:
+            tentativas = transporte.enviar_grupo(lote, dst_vip, max_tentativas)
+        else:
+            tentativas = transporte.enviar(lote[0], dst_vip, max_tentativas)
+        if tentativas is None:
+            resumo["falhas"] += len(lote)
+        else:
+            resumo["entregues"] += len(lote)
+            if tentativas > 1:
+                resumo["retransmitidas"] += len(lote)
+
+        print()
+
+    if proprio:
+        transporte.sock.close()
+    return resumo
+
+
+def separar_endereco(texto: str) -> tuple[str, int]:
+    """Converte 'IP:PORTA' (ou só 'PORTA') em tupla."""
+    ip, _, porta = texto.rpartition(":")
+    return (ip or "127.0.0.1", int(porta))
+
 
 if __name__ == "__main__":
-    print("=" * 60)
-    print("  Mini-NET — CLIENTE")
-    print("=" * 60)
+    parser = argparse.ArgumentParser(
+        description="Cliente Mini-NET. Sem flags, pergunta tudo no terminal.")
+    parser.add_argument("--porta", type=int, help="minha porta UDP real")
+    parser.add_argument("--vip", help="meu VIP (ex: HOST_A)")
+    parser.add_argument("--roteador", help="endereço do roteador, IP:PORTA")
+    parser.add_argument("--destino", help="VIP destino (padrão: SERVIDOR)")
+    parser.add_argument("--nome", help="nome exibido nas mensagens")
+    fonte = parser.add_mutually_exclusive_group()
+    fonte.add_argument("--stdin", action="store_true",
+                       help="modo streaming: uma mensagem por linha do stdin")
+    fonte.add_argument("--arquivo", help="modo streaming: uma mensagem por linha do arquivo")
+    parser.add_argument("--enviar-arquivo", metavar="CAMINHO",
+                        help="transfere o arquivo (qualquer conteúdo) e encerra; com "
+                             "--stdin/--arquivo, em paralelo ao chat em outra porta")
+    parser.add_argument("--codec", metavar="NOME",
+                        help="codec de envio dos quadros (padrão: json ou $MININET_CODEC; "
+                             f"instalados: {', '.join(codecs_disponiveis())}; "
+                             "um indisponível cai para json com aviso)")
+    parser.add_argument("--fec", action="store_true",
+                        help="protege os quadros enviados com FEC (ou $MININET_FEC=1)")
+    parser.add_argument("--memoria", action="store_true",
+                        help="enlace por memória compartilhada, não UDP (ou $MININET_ENLACE=memoria)")
+    parser.add_argument("--sem-ruido", action="store_true",
+                        help="envia sem perda/corrupção/latência simuladas (ou $MININET_RUIDO=0)")
+    parser.add_argument("--paridade", type=int, default=0, metavar="K",
+                        help="streaming/arquivo: 1 quadro de paridade a cada K mensagens (0 = desligado)")
+    parser.add_argument("--confirmacoes", type=int, default=1, metavar="N",
+                        help="destino VIP de grupo: quórum de membros distintos; com ele, os "
+                             f"membros que faltam têm mais {TENTATIVAS_APOS_QUORUM} reenvios e "
+                             "depois a mensagem segue (padrão 1)")
+    parser.add_argument("--historico", type=int, metavar="N",
+                        help="ao entrar, exibe as últimas N mensagens entregues ao destino")
+    parser.add_argument("--desde", metavar="DATA_HORA",
+                        help="ao entrar, exibe as mensagens entregues desde DATA_HORA (ISO 8601)")
+    parser.add_argument("--max-tentativas", type=int, default=None,
+                        help="desiste de uma mensagem após N envios (padrão no streaming: 10)")
+    args = parser.parse_args()
+
+    if args.codec:
+        definir_codec_envio(args.codec)
+    if args.fec:
+        fec.ativar()
+    if args.memoria:
+        fisica.ativar_memoria()
+    if args.sem_ruido:
+        fisica.desligar_ruido()
+
+    streaming = args.stdin or args.arquivo is not None or args.enviar_arquivo is not None
+
+    if streaming:
+        # Sem prompts: o stdin pode ser a própria fonte das mensagens
+        faltando = [f"--{f}" for f in ("porta", "vip", "roteador")
+                    if getattr(args, f) is None]
+        if faltando:
+            parser.error(f"modo streaming exige {', '.join(faltando)}")
+    else:
+        print("=" * 60)
+        print("  Mini-NET — CLIENTE")
+        print("=" * 60)
 
     try:
-        minha_porta = int(input("Minha porta real: "))
-        meu_vip     = input("Meu VIP (ex: HOST_A): ").strip()
-        
-        ip_roteador    = input("IP do roteador  [127.0.0.1]: ").strip() or "127.0.0.1"
-        porta_roteador = int(input("Porta do roteador: "))
-        
-        dst_vip     = input("VIP destino [SERVIDOR]: ").strip() or "SERVIDOR"
-        nome        = input("Seu nome: ").strip()
-        
-        run_client(minha_porta, meu_vip, ip_roteador, porta_roteador, dst_vip, nome)
+        minha_porta = args.porta or int(input("Minha porta real: "))
+        meu_vip     = args.vip or input("Meu VIP (ex: HOST_A): ").strip()
+
+        if args.roteador:
+            ip_roteador, porta_roteador = separar_endereco(args.roteador)
+        else:
+            ip_roteador    = input("IP do roteador  [127.0.0.1]: ").strip() or "127.0.0.1"
+            porta_roteador = int(input("Porta do roteador: "))
+
+        if streaming:
+            dst_vip = args.destino or "SERVIDOR"
+            nome    = args.nome or meu_vip
+        else:
+            dst_vip = args.destino or input("VIP destino [SERVIDOR]: ").strip() or "SERVIDOR"
+            nome    = args.nome or input("Seu nome: ").strip()
     except KeyboardInterrupt:
         print("\nEncerrado.")
+        sys.exit(130)
     except ValueError:
         print("\nValores inválidos.")
+        sys.exit(2)
+
+    historico = None
+    if args.historico:
+        historico = {"ultimos": args.historico}
+    elif args.desde:
+        try:
+            historico = {"desde": datetime.fromisoformat(args.desde).timestamp()}
+        except ValueError:
+            parser.error(f"--desde: data/hora inválida: {args.desde}")
+
+    mensagens      = None
+    max_tentativas = args.max_tentativas
+    arquivo        = None
+
+    if args.enviar_arquivo and (args.stdin or args.arquivo is not None):
+        # Chat e arquivo em fluxos (portas) separados sobre o mesmo socket
+        mux        = abrir_multiplexador(minha_porta, meu_vip, ip_roteador, porta_roteador)
+        fluxo_arq  = mux.abrir_fluxo(PORTA_ARQUIVO, PORTA_ARQUIVO)
+        fluxo_chat = mux.abrir_fluxo(PORTA_CHAT, PORTA_CHAT)
+        resultado  = {}
+        envio = threading.Thread(
+            target=lambda: resultado.update(ok=enviar_arquivo(
+                fluxo_arq, args.enviar_arquivo, dst_vip,
+                max_tentativas=max_tentativas or 10, paridade=args.paridade)),
+            daemon=True)
+        envio.start()
+
+        arquivo = open(args.arquivo, encoding="utf-8") if args.arquivo else sys.stdin
+        try:
+            resumo = run_client(minha_porta, meu_vip, ip_roteador, porta_roteador,
+                                dst_vip, nome, mensagens_de_fluxo(arquivo),
+                                max_tentativas or 10, args.paridade, fluxo_chat,
+                                args.confirmacoes, historico)
+            envio.join()
+        except KeyboardInterrupt:
+            print("\nEncerrado.")
+            sys.exit(130)
+        finally:
+            if arquivo is not sys.stdin:
+                arquivo.close()
+
+        log("CLIENTE",
+            f"Resumo: {resumo['entregues']} entregue(s), {resumo['retransmitidas']} com "
+            f"retransmissão, {resumo['falhas']} falha(s); arquivo "
+            f"{'enviado' if resultado.get('ok') else 'NÃO enviado'}",
+            VERDE if not resumo["falhas"] and resultado.get("ok") else VERMELHO)
+        sys.exit(0 if not resumo["falhas"] and resultado.get("ok") else 1)
+
+    if args.enviar_arquivo:
+        transporte = abrir_transporte(minha_porta, meu_vip, ip_roteador, porta_roteador)
+        try:
+            ok = enviar_arquivo(transporte, args.enviar_arquivo, dst_vip,
+                                max_tentativas=max_tentativas or 10,
+                                paridade=args.paridade)
+        except (KeyboardInterrupt, OSError) as e:
+            log("CLIENTE", f"Transferência interrompida: {e or 'Ctrl+C'}", VERMELHO)
+            ok = False
+        sys.exit(0 if ok else 1)
+
+    if streaming:
+        arquivo        = open(args.arquivo, encoding="utf-8") if args.arquivo else sys.stdin
+        mensagens      = mensagens_de_fluxo(arquivo)
+        max_tentativas = max_tentativas or 10
+
+    try:
+        resumo = run_client(minha_porta, meu_vip, ip_roteador, porta_roteador,
+                            dst_vip, nome, mensagens, max_tentativas,
+                            args.paridade if streaming else 0, None, args.confirmacoes,
+                            historico)
+    except KeyboardInterrupt:
+        print("\nEncerrado.")
+        sys.exit(130)
+    finally:
+        if arquivo is not None and arquivo is not sys.stdin:
+            arquivo.close()
+
+    log("CLIENTE",
+        f"Resumo: {resumo['entregues']} entregue(s), "
+        f"{resumo['retransmitidas']} com retransmissão, {resumo['falhas']} falha(s)",
+        VERDE if resumo["falhas"] == 0 else VERMELHO)
+    sys.exit(1 if resumo["falhas"] else 0)
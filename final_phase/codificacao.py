@@ -0,0 +1,326 @@
+"""
+codificacao.py - Registro de codecs para a serialização dos Quadros
+
+Quadro.serializar()/deserializar() (protocol.py) fixam o formato em JSON.
+Este módulo separa o formato das camadas: cada codec sabe transformar o
+dicionário do quadro em bytes (com FCS) e de volta, e o receptor identifica
+o codec de cada quadro pelo primeiro byte:
+
+  '{'   json     → formato original de protocol.py (padrão, sempre disponível)
+  0x01  binario  → cabeçalhos em struct, payload da aplicação em JSON
+  0x02  orjson   → JSON via orjson, se instalado
+  0x03  msgpack  → MessagePack, se instalado
+
+Nos codecs com tag, o FCS é um CRC32 de 4 bytes no fim do quadro, calculado
+sobre os bytes anteriores — o receptor valida o CRC antes de decodificar,
+sem re-serializar nada.
+
+Escolha do codec de envio (receptores aceitam todos os registrados):
+  MININET_CODEC=binario python client.py ...   ou   python client.py --codec binario
+Se o codec pedido não estiver instalado, o envio volta para json com aviso.
+
+Comparação de desempenho: python bench_codecs.py
+
+Quadros protegidos por FEC (fec.py) são reparados antes de chegar ao codec.
+"""
+
+import os
+import json
+import zlib
+import struct
+from protocol import Quadro
+import fec
+
+# ──────────────────────────────────────────────
+# CORES ANSI
+# ──────────────────────────────────────────────
+AMARELO  = "\033[93m"
+RESET    = "\033[0m"
+
+
+def log(camada: str, msg: str, cor: str = ""):
+    print(f"{cor}[{camada}] {msg}{RESET}")
+
+
+_FCS = struct.Struct("<I")
+
+
+def _anexar_fcs(corpo: bytes) -> bytes:
+    return corpo + _FCS.pack(zlib.crc32(corpo))
+
+
+def _separar_fcs(dados: bytes):
+    """Retorna (corpo, fcs) se o CRC confere, senão (None, None)."""
+    if len(dados) < 5:
+        return None, None
+    corpo = dados[:-4]
+    (fcs,) = _FCS.unpack_from(dados, len(dados) - 4)
+    if zlib.crc32(corpo) != fcs:
+        return None, None
+    return corpo, fcs
+
+
+# ══════════════════════════════════════════════════════════════════
+# INTERFACE
+# ══════════════════════════════════════════════════════════════════
+class Codec:
+    """
+    Interface de um codec de quadro.
+      codificar(src_mac, dst_mac, data) → bytes prontos para o canal
+      decodificar(bytes) → (quadro_dict, integro), como Quadro.deserializar
+    `tag` é o primeiro byte dos quadros do codec (None = JSON original).
+    """
+    nome = ""
+    tag  = None
+
+    def codificar(self, src_mac: str, dst_mac: str, data: dict) -> bytes:
+        raise NotImplementedError
+
+    def codificar_para_varios(self, src_mac: str, dst_macs: list[str], data: dict) -> list[bytes]:
+        """
+        Um quadro por MAC de destino para o mesmo pacote (multicast no
+        roteador). Codecs que conseguem reaproveitar a codificação do pacote
+        e trocar só o cabeçalho de enlace sobrescrevem este método.
+        """
+        return [self.codificar(src_mac, dst_mac, data) for dst_mac in dst_macs]
+
+    def decodificar(self, dados: bytes):
+        raise NotImplementedError
+
+
+class CodecJSON(Codec):
+    """Formato original de protocol.py (JSON com FCS embutido)."""
+    nome = "json"
+
+    def codificar(self, src_mac, dst_mac, data):
+        return Quadro(src_mac=src_mac, dst_mac=dst_mac, pacote_dict=data).serializar()
+
+    def codificar_para_varios(self, src_mac, dst_macs, data):
+        # Forma canônica (chaves ordenadas: data, dst_mac, fcs, src_mac), como
+        # em molde.py: o pacote é codificado uma vez e o CRC32 continua do
+        # estado do prefixo para cada MAC de destino
+        prefixo = b'{"data": ' + json.dumps(data, sort_keys=True).encode("utf-8") + b', "dst_mac": '
+        crc_prefixo = zlib.crc32(prefixo)
+        cauda = f', "src_mac": {json.dumps(src_mac)}}}'.encode("utf-8")
+        quadros = []
+        for dst_mac in dst_macs:
+            meio = f'{json.dumps(dst_mac)}, "fcs": '.encode("utf-8")
+            crc  = zlib.crc32(cauda, zlib.crc32(meio + b"0", crc_prefixo))
+            quadros.append(b"".join((prefixo, meio, str(crc).encode("ascii"), cauda)))
+        return quadros
+
+    def decodificar(self, dados):
+        return Quadro.deserializar(dados)
+
+
+class CodecBinario(Codec):
+    """
+    Cabeçalhos L2/L3/L4 em struct; o payload da aplicação (e campos extras
+    do segmento) segue em JSON. Quadros que não têm a forma
+    Pacote(Segmento) — ARP, por exemplo — vão inteiros em JSON (tipo 0).
+
+    Tipo 1: tag | tipo | src_mac(6) | dst_mac(6) | ttl(h) | len_src_vip |
+            len_dst_vip | seq_num(I) | flags | src_vip | dst_vip |
+            len_payload(I) | payload | len_extras(H) | extras | FCS(4)
+    """
+    nome = "binario"
+    tag  = 0x01
+
+    _CAB = struct.Struct("<BB6s6shBBIB")
+    _LEN = struct.Struct("<I")
+    _EXT = struct.Struct("<H")
+    _CAMPOS_SEGMENTO = ("seq_num", "is_ack", "payload")
+
+    @staticmethod
+    def _mac(mac: str) -> bytes:
+        b = bytes.fromhex(mac.replace(":", ""))
+        if len(b) != 6:
+            raise ValueError(mac)
+        return b
+
+    @staticmethod
+    def _mac_str(b: bytes) -> str:
+        return b.hex(":").upper()
+
+    def codificar(self, src_mac, dst_mac, data):
+        try:
+            seg = data["data"]
+            extras = {k: v for k, v in seg.items() if k not in self._CAMPOS_SEGMENTO}
+            src_vip = data["src_vip"].encode("utf-8")
+            dst_vip = data["dst_vip"].encode("utf-8")
+            cab = self._CAB.pack(self.tag, 1, self._mac(src_mac), self._mac(dst_mac),
+                                 data["ttl"], len(src_vip), len(dst_vip),
+                                 seg["seq_num"], 1 if seg["is_ack"] else 0)
+        except (KeyError, TypeError, AttributeError, ValueError, struct.error):
+            corpo = json.dumps({"src_mac": src_mac, "dst_mac": dst_mac, "data": data})
+            return _anexar_fcs(bytes((self.tag, 0)) + corpo.encode("utf-8"))
+
+        payload = json.dumps(seg["payload"]).encode("utf-8")
+        ext     = json.dumps(extras).encode("utf-8") if extras else b""
+        return _anexar_fcs(b"".join((cab, src_vip, dst_vip,
+                                     self._LEN.pack(len(payload)), payload,
+                                     self._EXT.pack(len(ext)), ext)))
+
+    def codificar_para_varios(self, src_mac, dst_macs, data):
+        # Tipo 1: o dst_mac ocupa os bytes 8..13; só ele e o FCS mudam
+        primeiro = self.codificar(src_mac, dst_macs[0], data)
+        if primeiro[1] != 1:
+            return [primeiro] + [self.codificar(src_mac, m, data) for m in dst_macs[1:]]
+        quadros = [primeiro]
+        corpo = bytearray(primeiro[:-4])
+        for dst_mac in dst_macs[1:]:
+            corpo[8:14] = self._mac(dst_mac)
+            quadros.append(_anexar_fcs(bytes(corpo)))
+        return quadros
+
+    def decodificar(self, dados):
+        corpo, fcs = _separar_fcs(dados)
+        if corpo is None:
+            return None, False
+        try:
+            if corpo[1] == 0:
+                quadro = json.loads(corpo[2:].decode("utf-8"))
+                quadro["fcs"] = fcs
+                return quadro, True
+
+            (_, _, src_mac, dst_mac, ttl, n_src, n_dst,
+             seq_num, flags) = self._CAB.unpack_from(corpo)
+            pos = self._CAB.size
+            src_vip = corpo[pos:pos + n_src].decode("utf-8"); pos += n_src
+            dst_vip = corpo[pos:pos + n_dst].decode("utf-8"); pos += n_dst
+            (n_payload,) = self._LEN.unpack_from(corpo, pos); pos += self._LEN.size
+            payload = json.loads(corpo[pos:pos + n_payload]); pos += n_payload
+            (n_ext,) = self._EXT.unpack_from(corpo, pos); pos += self._EXT.size
+
+            segmento = {"seq_num": seq_num, "is_ack": bool(flags & 1), "payload": payload}
+            if n_ext:
+                segmento.update(json.loads(corpo[pos:pos + n_ext]))
+        except (struct.error, UnicodeDecodeError, ValueError, IndexError):
+            return None, False
+
+        return {
+            "src_mac": self._mac_str(src_mac),
+            "dst_mac": self._mac_str(dst_mac),
+            "data"   : {"src_vip": src_vip, "dst_vip": dst_vip, "ttl": ttl, "data": segmento},
+            "fcs"    : fcs,
+        }, True
+
+
+class _CodecDicionario(Codec):
+    """Base para codecs de terceiros que serializam o dicionário inteiro."""
+    _dumps = None
+    _loads = None
+    _erros = (ValueError, TypeError, UnicodeDecodeError)
+
+    def codificar(self, src_mac, dst_mac, data):
+        corpo = type(self)._dumps({"src_mac": src_mac, "dst_mac": dst_mac, "data": data})
+        return _anexar_fcs(bytes((self.tag,)) + corpo)
+
+    def decodificar(self, dados):
+        corpo, fcs = _separar_fcs(dados)
+        if corpo is None:
+            return None, False
+        try:
+            quadro = type(self)._loads(corpo[1:])
+        except self._erros:
+            return None, False
+        if not isinstance(quadro, dict):
+            return None, False
+        quadro["fcs"] = fcs
+        return quadro, True
+
+
+# ══════════════════════════════════════════════════════════════════
+# REGISTRO
+# ══════════════════════════════════════════════════════════════════
+_por_nome: dict[str, Codec] = {}
+_por_tag: dict[int, Codec] = {}
+
+CODEC_JSON = CodecJSON()
+_codec_envio: Codec = CODEC_JSON
+
+
+def registrar_codec(codec: Codec):
+    if codec.tag is not None:
+        if codec.tag in _por_tag or codec.tag == ord("{"):
+            raise ValueError(f"tag 0x{codec.tag:02X} já usada")
+        _por_tag[codec.tag] = codec
+    _por_nome[codec.nome] = codec
+
+
+def codecs_disponiveis() -> list[str]:
+    return list(_por_nome)
+
+
+def obter_codec(nome: str) -> Codec:
+    return _por_nome[nome]
+
+
+def codec_do_quadro(dados: bytes) -> Codec:
+    """Identifica o codec pelo primeiro byte; JSON original começa com '{'."""
+    if dados and dados[0] in _por_tag:
+        return _por_tag[dados[0]]
+    return CODEC_JSON
+
+
+def decodificar_quadro(dados: bytes):
+    """
+    Substituto de Quadro.deserializar que aceita qualquer codec registrado
+    e quadros com FEC.
+    """
+    dados = fec.abrir(dados)
+    if dados is None:
+        return None, False
+    return codec_do_quadro(dados).decodificar(dados)
+
+
+def definir_codec_envio(nome: str) -> Codec:
+    """Escolhe o codec de envio; se indisponível, mantém json e avisa."""
+    global _codec_envio
+    codec = _por_nome.get(nome)
+    if codec is None:
+        log("ENLACE", f"Codec '{nome}' indisponível → usando json "
+                      f"(disponíveis: {', '.join(_por_nome)})", AMARELO)
+        codec = CODEC_JSON
+    _codec_envio = codec
+    return codec
+
+
+def codec_envio() -> Codec:
+    return _codec_envio
+
+
+registrar_codec(CODEC_JSON)
+registrar_codec(CodecBinario())
+
+try:
+    import orjson
+
+    class CodecOrjson(_CodecDicionario):
+        nome   = "orjson"
+        tag    = 0x02
+        _dumps = staticmethod(orjson.dumps)
+        _loads = staticmethod(orjson.loads)
+        _erros = (orjson.JSONDecodeError, TypeError)
+
+    registrar_codec(CodecOrjson())
+except ImportError:
+    pass
+
+try:
+    import msgpack
+
+    class CodecMsgpack(_CodecDicionario):
+        nome   = "msgpack"
+        tag    = 0x03
+        _dumps = staticmethod(msgpack.packb)
+        _loads = staticmethod(msgpack.unpackb)
+        _erros = (ValueError, TypeError, UnicodeDecodeError, msgpack.ExtraData,
+                  msgpack.FormatError, msgpack.StackError)
+
+    registrar_codec(CodecMsgpack())
+except ImportError:
+    pass
+
+if os.environ.get("MININET_CODEC"):
+    definir_codec_envio(os.environ["MININET_CODEC"])
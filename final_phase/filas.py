@@ -0,0 +1,278 @@
+"""
+filas.py - Filas de saída por próximo salto no roteador
+
+Sem filas, o roteador encaminha de forma síncrona: enquanto o canal de um
+enlace "transmite" (a latência simulada de 0,1–0,5 s), nada mais é lido do
+socket e a sobrecarga aparece só como descarte invisível no buffer do
+kernel. Aqui cada próximo salto (IP, porta) ganha uma fila limitada e uma
+thread transmissora própria; o laço de recepção só decide e enfileira.
+
+Políticas de descarte (gestão ativa de fila):
+  cauda  tail-drop: descarta o quadro que chega com a fila cheia
+  red    Random Early Detection: com a média móvel (EWMA) da profundidade
+         entre RED_MIN e RED_MAX da capacidade, descarta com probabilidade
+         crescente até RED_MAX_P; acima de RED_MAX descarta sempre; a
+         fila cheia continua descartando na cauda
+
+Classes de tráfego: ACKs e quadros de controle (classe PRIORITARIA) têm
+uma fila própria em cada enlace, para que uma rajada de dados não atrase
+os ACKs até o timeout do emissor e provoque retransmissões espúrias. A
+thread transmissora escolhe a próxima fila por:
+  estrito    sempre a prioritária primeiro
+  ponderado  até PESO_PADRAO quadros prioritários por quadro de dados,
+             para que os dados não fiquem sem vez sob muitos ACKs
+A fila prioritária só descarta na cauda (RED vale apenas para dados).
+A classe EXCEDENTE (tráfego acima do limite de taxa, ver limitador.py) só
+é servida quando as outras duas estão vazias.
+
+Métricas por enlace: profundidade atual/máxima/média, enfileirados,
+transmitidos e descartes por motivo (ver relatorio(); no roteador, comando
+FILAS na porta de controle). Com o perfil ligado, a espera na fila é
+medida por classe (roteador.fila.espera.*).
+
+Uso:
+  python router.py --porta 5000 --rotas rotas.conf --fila 64 --aqm red
+  python router.py ... --escalonador ponderado --peso 4
+  python router.py ... --fila 0        (encaminhamento síncrono, sem filas)
+"""
+
+import random
+import threading
+from collections import deque
+import perfil
+
+# ──────────────────────────────────────────────
+# CONFIGURAÇÕES
+# ──────────────────────────────────────────────
+CAPACIDADE_PADRAO = 64
+POLITICAS         = ("cauda", "red")
+ESCALONADORES     = ("estrito", "ponderado")
+PESO_PADRAO       = 4     # prioritários por quadro de dados (ponderado)
+
+RED_MIN   = 0.25     # fração da capacidade onde o descarte antecipado começa
+RED_MAX   = 0.75     # fração a partir da qual tudo é descartado
+RED_MAX_P = 0.1      # probabilidade de descarte em RED_MAX
+PESO_EWMA = 0.1      # peso da amostra nova na média da profundidade
+
+# Resultado de enfileirar()
+ACEITO          = 0
+DESCARTE_CAUDA  = 1
+DESCARTE_RED    = 2
+
+# Classes de tráfego
+NORMAL      = 0
+PRIORITARIA = 1
+EXCEDENTE   = 2
+NOMES_CLASSE = {NORMAL: "normal", PRIORITARIA: "prioritaria", EXCEDENTE: "excedente"}
+
+
+def classe_do_pacote(pacote_dict: dict) -> int:
+    """
+    ACKs (segmento com is_ack) e erros do roteador (ver icmp.py) vão na
+    fila prioritária; o resto é dado.
+    """
+    segmento = pacote_dict.get("data")
+    if isinstance(segmento, dict) and (segmento.get("is_ack") or "icmp" in segmento):
+        return PRIORITARIA
+    return NORMAL
+
+
+class FilaSaida:
+    """Fila limitada de um enlace, drenada por uma thread transmissora."""
+
+    def __init__(self, endereco, sock, transmitir, capacidade: int = CAPACIDADE_PADRAO,
+                 politica: str = "cauda", escalonador: str = "estrito",
+                 peso: int = PESO_PADRAO):
+        if politica not in POLITICAS:
+            raise ValueError(f"política '{politica}' desconhecida (use {', '.join(POLITICAS)})")
+        if escalonador not in ESCALONADORES:
+            raise ValueError(f"escalonador '{escalonador}' desconhecido "
+                             f"(use {', '.join(ESCALONADORES)})")
+        self.endereco    = endereco
+        self.sock        = sock
+        self.transmitir  = transmitir
+        self.capacidade  = capacidade
+        self.politica    = politica
+        self.escalonador = escalonador
+        self.peso        = max(1, peso)
+
+        self._filas = {NORMAL: deque(), PRIORITARIA: deque(), EXCEDENTE: deque()}
+        self._reservas = {NORMAL: 0, PRIORITARIA: 0, EXCEDENTE: 0}   # vagas de admitir()
+        self._cond  = threading.Condition()
+        # Ponderado: prioritários servidos desde o último quadro de dados
+        self._seguidos = 0
+
+        # RED: quadros aceitos desde o último descarte antecipado
+        self._desde_descarte = 0
+        self._rnd = random.Random()
+
+        self.media           = 0.0
+        self.maximo          = 0
+        self.enfileirados    = 0
+        self.transmitidos    = 0
+        self.descartes_cauda = 0
+        self.descartes_red   = 0
+        self.prioritarios    = 0
+
+        threading.Thread(target=self._drenar, daemon=True,
+                         name=f"fila-{endereco[0]}:{endereco[1]}").start()
+
+    def __len__(self):
+        return sum(len(fila) for fila in self._filas.values()) + sum(self._reservas.values())
+
+    def _descarte_red(self) -> bool:
+        minimo = self.capacidade * RED_MIN
+        maximo = self.capacidade * RED_MAX
+        if self.media < minimo:
+            self._desde_descarte = 0
+            return False
+        if self.media >= maximo:
+            self._desde_descarte = 0
+            return True
+        pb = RED_MAX_P * (self.media - minimo) / (maximo - minimo)
+        # Espaça os descartes uniformemente em vez de deixá-los em rajadas
+        pa = pb / max(1e-9, 1 - self._desde_descarte * pb)
+        if self._desde_descarte * pb >= 1 or self._rnd.random() < pa:
+            self._desde_descarte = 0
+            return True
+        self._desde_descarte += 1
+        return False
+
+    def enfileirar(self, quadro_bytes: bytes, classe: int = NORMAL) -> int:
+        """Tenta enfileirar; retorna ACEITO ou o motivo do descarte."""
+        resultado = self.admitir(classe)
+        if resultado == ACEITO:
+            self.depositar(quadro_bytes, classe)
+        return resultado
+
+    def admitir(self, classe: int = NORMAL) -> int:
+        """
+        Decide a admissão de um quadro (cauda/RED) antes de ele existir e,
+        se ACEITO, reserva a vaga para o depositar() seguinte. O roteador
+        usa isso para saber quantas cópias de um pacote de grupo saem antes
+        de gravar essa contagem nelas.
+        """
+        with self._cond:
+            profundidade = len(self)
+            self.media += PESO_EWMA * (profundidade - self.media)
+
+            # Cada classe tem a capacidade inteira: ACKs nunca disputam
+            # espaço com uma fila de dados cheia
+            if len(self._filas[classe]) + self._reservas[classe] >= self.capacidade:
+                self.descartes_cauda += 1
+                return DESCARTE_CAUDA
+            if classe != PRIORITARIA and self.politica == "red" and self._descarte_red():
+                self.descartes_red += 1
+                return DESCARTE_RED
+
+            self._reservas[classe] += 1
+            if profundidade + 1 > self.maximo:
+                self.maximo = profundidade + 1
+            return ACEITO
+
+    def depositar(self, quadro_bytes: bytes, classe: int = NORMAL):
+        """Ocupa a vaga reservada por admitir()."""
+        with self._cond:
+            self._reservas[classe] -= 1
+            self._filas[classe].append((perfil.agora() if perfil.ATIVO else 0, quadro_bytes))
+            self.enfileirados += 1
+            if classe == PRIORITARIA:
+                self.prioritarios += 1
+            self._cond.notify()
+
+    def _proxima_classe(self) -> int:
+        """Escalonador; chamado com o lock e ao menos uma fila não vazia."""
+        prioritaria, normal = self._filas[PRIORITARIA], self._filas[NORMAL]
+        if not prioritaria:
+            self._seguidos = 0
+            return NORMAL if normal else EXCEDENTE
+        if self.escalonador == "ponderado" and normal and self._seguidos >= self.peso:
+            self._seguidos = 0
+            return NORMAL
+        self._seguidos += 1
+        return PRIORITARIA
+
+    def _drenar(self):
+        while True:
+            with self._cond:
+                while not any(self._filas.values()):
+                    self._cond.wait()
+                classe = self._proxima_classe()
+                t_entrada, quadro_bytes = self._filas[classe].popleft()
+            if perfil.ATIVO and t_entrada:
+                perfil.registrar(f"roteador.fila.espera.{NOMES_CLASSE[classe]}", t_entrada)
+
+            t = perfil.agora() if perfil.ATIVO else 0
+            self.transmitir(self.sock, quadro_bytes, self.endereco)
+            if perfil.ATIVO:
+                perfil.registrar("canal.enviar", t)
+            self.transmitidos += 1
+
+    def metricas(self) -> dict:
+        return {
+            "profundidade"   : len(self),
+            "maximo"         : self.maximo,
+            "media"          : round(self.media, 2),
+            "enfileirados"   : self.enfileirados,
+            "transmitidos"   : self.transmitidos,
+            "prioritarios"   : self.prioritarios,
+            "descartes_cauda": self.descartes_cauda,
+            "descartes_red"  : self.descartes_red,
+        }
+
+
+class FilasPorEnlace:
+    """Cria sob demanda uma FilaSaida (e sua thread) por próximo salto."""
+
+    def __init__(self, sock, transmitir, capacidade: int = CAPACIDADE_PADRAO,
+                 politica: str = "cauda", escalonador: str = "estrito",
+                 peso: int = PESO_PADRAO):
+        if politica not in POLITICAS:
+            raise ValueError(f"política '{politica}' desconhecida (use {', '.join(POLITICAS)})")
+        if escalonador not in ESCALONADORES:
+            raise ValueError(f"escalonador '{escalonador}' desconhecido "
+                             f"(use {', '.join(ESCALONADORES)})")
+        self.sock        = sock
+        self.transmitir  = transmitir
+        self.capacidade  = capacidade
+        self.politica    = politica
+        self.escalonador = escalonador
+        self.peso        = peso
+        self._filas: dict[tuple[str, int], FilaSaida] = {}
+        self._lock = threading.Lock()
+
+    def fila(self, endereco) -> FilaSaida:
+        fila = self._filas.get(endereco)
+        if fila is None:
+            with self._lock:
+                fila = self._filas.get(endereco)
+                if fila is None:
+                    fila = FilaSaida(endereco, self.sock, self.transmitir,
+                                     self.capacidade, self.politica,
+                                     self.escalonador, self.peso)
+                    self._filas[endereco] = fila
+        return fila
+
+    def enfileirar(self, endereco, quadro_bytes: bytes, classe: int = NORMAL) -> int:
+        return self.fila(endereco).enfileirar(quadro_bytes, classe)
+
+    def admitir(self, endereco, classe: int = NORMAL) -> int:
+        return self.fila(endereco).admitir(classe)
+
+    def depositar(self, endereco, quadro_bytes: bytes, classe: int = NORMAL):
+        self.fila(endereco).depositar(quadro_bytes, classe)
+
+    def metricas(self) -> dict:
+        return {endereco: fila.metricas() for endereco, fila in list(self._filas.items())}
+
+    def relatorio(self) -> str:
+        linhas = [f"{'enlace':22s} {'prof':>5s} {'máx':>5s} {'média':>7s} {'enfil.':>8s} "
+                  f"{'prior.':>7s} {'transm.':>8s} {'desc.cauda':>10s} {'desc.red':>9s}"]
+        for (ip, porta), m in sorted(self.metricas().items()):
+            linhas.append(
+                f"{ip + ':' + str(porta):22s} {m['profundidade']:5d} {m['maximo']:5d} "
+                f"{m['media']:7.2f} {m['enfileirados']:8d} {m['prioritarios']:7d} "
+                f"{m['transmitidos']:8d} {m['descartes_cauda']:10d} {m['descartes_red']:9d}")
+        if len(linhas) == 1:
+            linhas.append("(nenhum enlace usado ainda)")
+        return "\n".join(linhas)
@@ -0,0 +1,443 @@
+"""
+fisica.py - Camada física: UDP ou memória compartilhada, com ou sem ruído
+
+Todos os nós rodam em 127.0.0.1, e cada salto paga duas chamadas de
+sistema (sendto/recvfrom) e duas cópias pelo kernel. Numa medição do
+protocolo no mesmo host isso domina o custo. Aqui há um enlace
+alternativo sobre multiprocessing.shared_memory: SocketMemoria tem a
+mesma interface que os nós usam do socket UDP (bind, sendto, recvfrom,
+settimeout, gettimeout, close), então client.py, server.py e router.py
+só trocam a fábrica do socket (abrir_socket).
+
+Segmentos (em /dev/shm), endereçados pela porta como no UDP:
+  mininet_<P>        controle do nó que fez bind na porta P: a lista de
+                     portas que já lhe enviaram algo (VIZINHOS_MAX vagas)
+  mininet_<P>_<S>    anel do emissor S para o receptor P
+
+Cada anel tem um único produtor (o nó S, serializado por um lock entre
+suas threads) e um único consumidor (o nó P), então dispensa lock entre
+processos: o produtor copia o registro [tamanho u32][pad u32][dados] e só
+depois avança `cabeca`; o consumidor lê e só depois avança `cauda`. Os
+contadores são inteiros nativos de 64 bits alinhados, escritos com uma
+única instrução. Um anel sem espaço descarta o quadro, como um buffer UDP
+cheio. Só o registro no controle (uma vez por par) usa flock.
+
+O receptor consulta os anéis em rodízio. Sem nada para ler por
+GIRO_VAZIO voltas, marca-se "dormindo" no controle e bloqueia num FIFO
+(mininet_<P>.fifo, a campainha); o emissor só escreve um byte no FIFO se
+encontrar a marca. Com tráfego contínuo não há chamada de sistema alguma
+no caminho dos dados, e um nó ocioso não gasta CPU girando. A espera no
+FIFO dura no máximo ESPERA_MAXIMA, o que limita o custo de uma campainha
+perdida numa corrida entre a marca e o anel.
+
+Ruído: o simulador de protocol.py (perda, corrupção e latência) continua
+valendo nos dois enlaces por padrão; transmitir() o dispensa quando o
+ruído está desligado, para medir só o custo do protocolo.
+
+Ativação: MININET_ENLACE=memoria ou --memoria; MININET_RUIDO=0 ou
+--sem-ruido. Todos os nós de uma rede precisam usar o mesmo enlace.
+"""
+
+import os
+import time
+import fcntl
+import socket
+import tempfile
+import select
+import threading
+from contextlib import contextmanager
+from multiprocessing import shared_memory, resource_tracker
+from protocol import enviar_pela_rede_ruidosa
+
+# ──────────────────────────────────────────────
+# CONFIGURAÇÕES
+# ──────────────────────────────────────────────
+CAPACIDADE_ANEL = 4 * 1024 * 1024   # bytes por par emissor → receptor
+VIZINHOS_MAX    = 256               # emissores distintos por receptor
+GIRO_VAZIO      = 64 if (os.cpu_count() or 1) > 1 else 1   # voltas vazias antes da campainha
+ESPERA_MAXIMA   = 0.01              # limite de cada espera na campainha (s)
+IP_LOCAL        = "127.0.0.1"
+
+ENLACES = ("udp", "memoria")
+ENLACE_ATIVO = os.environ.get("MININET_ENLACE", "udp")
+RUIDO_ATIVO  = os.environ.get("MININET_RUIDO", "") != "0"
+
+_MAGIC    = 0x4D4E4554        # "MNET"
+_CABECALHO = 64               # bytes antes dos dados/vagas
+# Índices (em palavras de 64 bits) no cabeçalho de anéis e controles
+_MAGIC_I, _FECHADO_I, _CAPACIDADE_I, _CABECA_I, _CAUDA_I, _VERSAO_I, _DORMINDO_I = range(7)
+_REGISTRO = 8                 # tamanho u32 + pad u32
+
+_trava_rastreio = threading.Lock()   # ver _anexar
+
+
+def ativar_memoria():
+    """Usa o enlace por memória compartilhada nos sockets abertos daqui em diante."""
+    global ENLACE_ATIVO
+    ENLACE_ATIVO = "memoria"
+
+
+def desligar_ruido():
+    """transmitir() passa a enviar sem o simulador de canal."""
+    global RUIDO_ATIVO
+    RUIDO_ATIVO = False
+
+
+def abrir_socket():
+    """Socket do enlace ativo: UDP ou SocketMemoria."""
+    if ENLACE_ATIVO == "memoria":
+        return SocketMemoria()
+    return socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+
+def transmitir(sock, bytes_dados: bytes, endereco_destino):
+    """L1: envia pelo canal ruidoso, ou direto se o ruído estiver desligado."""
+    if RUIDO_ATIVO:
+        enviar_pela_rede_ruidosa(sock, bytes_dados, endereco_destino)
+    else:
+        sock.sendto(bytes_dados, endereco_destino)
+
+
+# ══════════════════════════════════════════════════════════════════
+# SEGMENTOS DE MEMÓRIA
+# ══════════════════════════════════════════════════════════════════
+def _nome_controle(porta: int) -> str:
+    return f"mininet_{porta}"
+
+
+def _nome_anel(destino: int, origem: int) -> str:
+    return f"mininet_{destino}_{origem}"
+
+
+def _caminho_campainha(porta: int) -> str:
+    return os.path.join(tempfile.gettempdir(), f"{_nome_controle(porta)}.fifo")
+
+
+def _anexar(nome: str) -> shared_memory.SharedMemory:
+    """Anexa um segmento de outro processo sem que o rastreador o apague na saída."""
+    try:
+        return shared_memory.SharedMemory(nome, track=False)
+    except TypeError:       # Python < 3.13
+        pass
+    # Sem `track`, o anexo nem chega a registrar o segmento. Registrar e tirar
+    # em seguida apagaria o registro do criador quando ele é este processo ou
+    # divide o rastreador com ele (filhos de multiprocessing), e o unlink dele
+    # acabaria em KeyError no rastreador
+    with _trava_rastreio:
+        registrar = resource_tracker.register
+        resource_tracker.register = lambda nome, tipo: None
+        try:
+            return shared_memory.SharedMemory(nome)
+        finally:
+            resource_tracker.register = registrar
+
+
+def _criar(nome: str, tamanho: int) -> shared_memory.SharedMemory:
+    """Cria o segmento, aposentando um resto de execução anterior com o mesmo nome."""
+    try:
+        antigo = shared_memory.SharedMemory(nome)
+    except FileNotFoundError:
+        pass
+    else:
+        if antigo.size >= _CABECALHO:
+            antigo.buf[_FECHADO_I * 8:_FECHADO_I * 8 + 8] = (1).to_bytes(8, "little")
+        antigo.close()
+        antigo.unlink()
+    with _trava_rastreio:
+        return shared_memory.SharedMemory(nome, create=True, size=tamanho)
+
+
+@contextmanager
+def _vagas(controle: "_Segmento", porta: int):
+    """
+    Lista de vizinhos do controle da `porta`, com flock entre processos.
+    A versão do controle avança na saída, para o receptor reler a lista.
+    """
+    caminho = os.path.join(tempfile.gettempdir(), f"{_nome_controle(porta)}.lock")
+    with open(caminho, "a") as trava:
+        fcntl.flock(trava, fcntl.LOCK_EX)
+        vagas = controle.dados.cast("Q")
+        try:
+            yield vagas
+        finally:
+            vagas.release()
+            controle.palavras[_VERSAO_I] += 1
+
+
+class _Segmento:
+    """Segmento de anel ou controle: cabeçalho de palavras de 64 bits + área de dados."""
+
+    def __init__(self, shm: shared_memory.SharedMemory, dono: bool):
+        self.shm     = shm
+        self.dono    = dono
+        self.palavras = shm.buf.cast("Q")
+        self.dados    = shm.buf[_CABECALHO:]
+
+    @classmethod
+    def criar(cls, nome: str, capacidade: int):
+        seg = cls(_criar(nome, _CABECALHO + capacidade), True)
+        seg.palavras[_CAPACIDADE_I] = capacidade
+        seg.palavras[_MAGIC_I]      = _MAGIC
+        return seg
+
+    @classmethod
+    def anexar(cls, nome: str):
+        seg = cls(_anexar(nome), False)
+        if seg.palavras[_MAGIC_I] != _MAGIC:
+            seg.fechar()
+            raise FileNotFoundError(nome)
+        return seg
+
+    @property
+    def fechado(self) -> bool:
+        return self.palavras[_FECHADO_I] != 0
+
+    def fechar(self):
+        if self.dono:
+            self.palavras[_FECHADO_I] = 1
+        self.palavras.release()
+        self.dados.release()
+        self.shm.close()
+        if self.dono:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+class _Anel(_Segmento):
+    """Anel de um produtor e um consumidor."""
+
+    def _copiar_para(self, posicao: int, dados):
+        capacidade = self.palavras[_CAPACIDADE_I]
+        i = posicao % capacidade
+        primeiro = min(len(dados), capacidade - i)
+        self.dados[i:i + primeiro] = dados[:primeiro]
+        if primeiro < len(dados):
+            self.dados[:len(dados) - primeiro] = dados[primeiro:]
+
+    def _copiar_de(self, posicao: int, tamanho: int) -> bytes:
+        capacidade = self.palavras[_CAPACIDADE_I]
+        i = posicao % capacidade
+        primeiro = min(tamanho, capacidade - i)
+        if primeiro == tamanho:
+            return bytes(self.dados[i:i + tamanho])
+        return bytes(self.dados[i:i + primeiro]) + bytes(self.dados[:tamanho - primeiro])
+
+    def escrever(self, dados: bytes) -> bool:
+        """Produtor: False se não há espaço (o quadro é descartado)."""
+        cabeca, cauda = self.palavras[_CABECA_I], self.palavras[_CAUDA_I]
+        necessario = _REGISTRO + len(dados)
+        if necessario > self.palavras[_CAPACIDADE_I] - (cabeca - cauda):
+            return False
+        self._copiar_para(cabeca, len(dados).to_bytes(4, "little") + bytes(4))
+        self._copiar_para(cabeca + _REGISTRO, dados)
+        self.palavras[_CABECA_I] = cabeca + necessario
+        return True
+
+    def ler(self):
+        """Consumidor: próximo registro, ou None se o anel está vazio."""
+        cauda = self.palavras[_CAUDA_I]
+        if self.palavras[_CABECA_I] == cauda:
+            return None
+        tamanho = int.from_bytes(self._copiar_de(cauda, 4), "little")
+        dados   = self._copiar_de(cauda + _REGISTRO, tamanho)
+        self.palavras[_CAUDA_I] = cauda + _REGISTRO + tamanho
+        return dados
+
+
+# ══════════════════════════════════════════════════════════════════
+# SOCKET
+# ══════════════════════════════════════════════════════════════════
+class SocketMemoria:
+    """Socket de datagramas sobre anéis em memória compartilhada (mesmo host)."""
+
+    def __init__(self, capacidade: int = CAPACIDADE_ANEL):
+        self.capacidade = capacidade
+        self.porta      = None
+        self._timeout   = None
+        self._controle: _Segmento = None
+        self._campainha = None     # fd de leitura do FIFO deste nó
+        self._entrada: dict[int, _Anel] = {}       # origem → anel
+        self._saida: dict[int, tuple] = {}         # destino → (anel, controle, fd do FIFO)
+        self._lock_envio    = threading.Lock()
+        self._lock_recepcao = threading.Lock()
+        self._proxima = 0          # rodízio entre os anéis de entrada
+        self._origens: list[int] = []
+        self._versao  = -1         # versão do controle quando _origens foi lida
+        self._aberto  = True
+        self.descartes = 0
+
+    # ── Interface de socket ──
+    def bind(self, endereco):
+        if self.porta is not None:
+            raise OSError("socket já associado a uma porta")
+        self.porta     = endereco[1]
+        self._controle = _Segmento.criar(_nome_controle(self.porta), VIZINHOS_MAX * 8)
+        caminho = _caminho_campainha(self.porta)
+        try:
+            os.unlink(caminho)
+        except FileNotFoundError:
+            pass
+        os.mkfifo(caminho)
+        # O_RDWR: o FIFO nunca fica sem escritor, então select não acorda com EOF
+        self._campainha = os.open(caminho, os.O_RDWR | os.O_NONBLOCK)
+
+    def getsockname(self):
+        return (IP_LOCAL, self.porta or 0)
+
+    def settimeout(self, timeout):
+        self._timeout = timeout
+
+    def gettimeout(self):
+        return self._timeout
+
+    def setsockopt(self, *args):
+        pass      # sem buffers do kernel para ajustar
+
+    def sendto(self, dados: bytes, endereco) -> int:
+        if self.porta is None:
+            raise OSError("SocketMemoria precisa de bind antes de enviar")
+        destino = endereco[1]
+        with self._lock_envio:
+            par = self._saida.get(destino)
+            if par is None or par[1].fechado:
+                par = self._conectar(destino, par)
+                if par is None:
+                    return len(dados)     # ninguém na porta: perdido, como no UDP
+            anel, controle, campainha = par
+            if not anel.escrever(dados):
+                self.descartes += 1
+            elif controle.palavras[_DORMINDO_I] and campainha is not None:
+                try:
+                    os.write(campainha, b"\0")
+                except BlockingIOError:
+                    pass          # FIFO cheio: a campainha já está tocando
+        return len(dados)
+
+    def recvfrom(self, bufsize: int = 65535):
+        if self._controle is None or not self._aberto:
+            raise OSError("socket fechado ou sem bind")
+        prazo = None if self._timeout is None else time.monotonic() + self._timeout
+        voltas = 0
+        with self._lock_recepcao:
+            palavras = self._controle.palavras
+            while True:
+                recebido = self._ler_algum()
+                if recebido is not None:
+                    return recebido
+                if not self._aberto:
+                    raise OSError("socket fechado")
+                restante = None if prazo is None else prazo - time.monotonic()
+                if restante is not None and restante <= 0:
+                    raise socket.timeout("timed out")
+                voltas += 1
+                if voltas < GIRO_VAZIO:
+                    continue
+
+                # Marca-se dormindo e confere de novo antes de bloquear
+                palavras[_DORMINDO_I] = 1
+                recebido = self._ler_algum()
+                if recebido is None:
+                    espera = ESPERA_MAXIMA if restante is None else min(ESPERA_MAXIMA, restante)
+                    if select.select([self._campainha], [], [], espera)[0]:
+                        try:
+                            os.read(self._campainha, 4096)
+                        except BlockingIOError:
+                            pass
+                palavras[_DORMINDO_I] = 0
+                voltas = 0
+                if recebido is not None:
+                    return recebido
+
+    def close(self):
+        # Um recvfrom bloqueado em outra thread percebe e solta o lock
+        self._aberto = False
+        with self._lock_envio:
+            for anel, controle, campainha in self._saida.values():
+                anel.fechar()
+                controle.fechar()
+                if campainha is not None:
+                    os.close(campainha)
+            self._saida.clear()
+        with self._lock_recepcao:
+            for anel in self._entrada.values():
+                anel.fechar()
+            self._entrada.clear()
+            if self._controle is not None:
+                self._controle.fechar()
+                self._controle = None
+                os.close(self._campainha)
+                try:
+                    os.unlink(_caminho_campainha(self.porta))
+                except FileNotFoundError:
+                    pass
+
+    # ── Internos ──
+    def _conectar(self, destino: int, antigo):
+        """Cria (ou recria) o anel para `destino` e se registra no controle dele."""
+        if antigo is not None:
+            antigo[1].fechar()
+            if antigo[2] is not None:
+                os.close(antigo[2])
+        try:
+            controle = _Segmento.anexar(_nome_controle(destino))
+        except FileNotFoundError:
+            if antigo is not None:
+                antigo[0].fechar()
+                del self._saida[destino]
+            return None
+        anel = antigo[0] if antigo is not None else _Anel.criar(
+            _nome_anel(destino, self.porta), self.capacidade)
+        try:
+            campainha = os.open(_caminho_campainha(destino), os.O_WRONLY | os.O_NONBLOCK)
+        except OSError:
+            campainha = None      # sem campainha, o receptor acorda pelo ESPERA_MAXIMA
+
+        with _vagas(controle, destino) as vagas:
+            if self.porta not in vagas:
+                if 0 not in vagas:
+                    anel.fechar()
+                    controle.fechar()
+                    raise OSError(f"porta {destino} sem vagas para novos vizinhos")
+                vagas[list(vagas).index(0)] = self.porta
+        self._saida[destino] = (anel, controle, campainha)
+        return self._saida[destino]
+
+    def _ler_algum(self):
+        """Um registro de algum anel de entrada (em rodízio), ou None."""
+        versao = self._controle.palavras[_VERSAO_I]
+        if versao != self._versao:
+            vagas = self._controle.dados.cast("Q")
+            try:
+                self._origens = [porta for porta in vagas if porta]
+            finally:
+                vagas.release()
+            self._versao = versao
+        origens = self._origens
+        for passo in range(len(origens)):
+            origem = origens[(self._proxima + passo) % len(origens)]
+            anel = self._entrada.get(origem)
+            if anel is not None and anel.fechado:
+                # O que o emissor escreveu antes de fechar ainda é entregue
+                dados = anel.ler()
+                if dados is not None:
+                    return dados, (IP_LOCAL, origem)
+                anel.fechar()
+                anel = None
+            if anel is None:
+                try:
+                    anel = self._entrada[origem] = _Anel.anexar(_nome_anel(self.porta, origem))
+                except FileNotFoundError:
+                    # O emissor fechou: libera a vaga (o anel é criado antes do registro)
+                    self._entrada.pop(origem, None)
+                    with _vagas(self._controle, self.porta) as vagas:
+                        for i, porta in enumerate(vagas):
+                            if porta == origem:
+                                vagas[i] = 0
+                    continue
+            dados = anel.ler()
+            if dados is not None:
+                self._proxima = (self._proxima + passo + 1) % len(origens)
+                return dados, (IP_LOCAL, origem)
+        return None
@@ -0,0 +1,422 @@
+"""
+historico.py - Log persistente das mensagens entregues no servidor
+
+As mensagens de chat entregues pelo run_server eram só impressas. Aqui
+cada uma é anexada a um log em disco, só de acréscimo, com um índice de
+offsets mapeado em memória (mmap) para consultar o histórico sem varrer
+o arquivo.
+
+Arquivos (em DIRETORIO):
+  mensagens.log   registros [tamanho u32][crc32 u32][JSON canônico]
+  mensagens.idx   cabeçalho [b"MNIX"][versão u32][total u64] seguido de
+                  uma entrada de 32 bytes por registro, na ordem do SEQ:
+                  [offset u64][instante f64][anterior i64][hash u32][pad]
+
+O SEQ de um registro é a sua posição no índice, então a busca por SEQ é
+uma multiplicação. `anterior` encadeia os registros do mesmo remetente
+(SEQ do registro anterior com o mesmo hash, -1 no primeiro): o histórico
+de um remetente segue a cadeia de trás para frente. `instante` é o
+relógio do servidor na entrega, não decrescente, e permite busca binária
+por tempo.
+
+Escrita em grupo (group commit): anexar() só enfileira e devolve o SEQ;
+uma thread gravadora junta o que chegou (até LOTE_MAX registros ou
+JANELA_COMMIT segundos), faz um único write + fsync para o lote e só
+então publica as entradas no índice. Um registro visível no índice já
+está no disco. anexar() aceita um `ao_gravar` chamado depois do fsync do
+lote: é por ele que o servidor só confirma (ACK) uma mensagem já durável.
+
+Na abertura, registros do log que o índice ainda não cobre (queda entre
+o fsync e o índice) são reindexados, e um registro final truncado ou com
+CRC inválido (queda no meio do write) é cortado do log.
+
+Recuperação do histórico (catch-up): um cliente que entra pede as
+últimas N mensagens ou as entregues desde um instante com um segmento
+extra "historico" (ver SegmentoHistorico). O servidor responde com a
+seleção inteira de uma vez, em partes de até LOTE_BYTES bytes com centenas
+de mensagens cada, em vez de uma troca Stop-and-Wait por mensagem. As
+partes que o canal perder são pedidas de novo numa única lista
+("faltando"), então milhares de mensagens chegam em poucas idas e voltas.
+Cada pedido sai em COPIAS_PEDIDO cópias com o número da rodada; o servidor
+responde só à primeira cópia de cada rodada, e no reenvio manda cada parte
+que falta também em COPIAS_PEDIDO cópias, para que a cauda de partes
+perdidas não custe uma rodada a mais por parte.
+
+  pedido    seq_num=0, payload={"ultimos": N} ou {"desde": instante},
+            "lote": bytes por parte, "rodada": n, "faltando": [partes] (reenvio)
+  resposta  seq_num=parte, payload={"mensagens": [...]}, "partes": total
+
+Uso:
+  python server.py ... --historico DIRETORIO
+  python client.py ... --historico 100          (últimas 100 ao entrar)
+  python client.py ... --desde 2025-06-01T10:00 (entregues desde então)
+"""
+
+import os
+import json
+import mmap
+import time
+import zlib
+import struct
+import bisect
+import threading
+from collections import OrderedDict
+from portas import SegmentoPortas, PORTA_LEGADO
+
+# ──────────────────────────────────────────────
+# CONFIGURAÇÕES
+# ──────────────────────────────────────────────
+JANELA_COMMIT   = 0.005    # espera por mais registros antes do fsync (s)
+LOTE_MAX        = 512      # registros por write + fsync
+ENTRADAS_INICIO = 4096     # capacidade inicial do índice (dobra quando enche)
+
+LOTE_BYTES      = 32768    # mensagens (em JSON) por parte da resposta
+LOTE_MINIMO     = 1024
+RESPOSTAS_MAX   = 64       # respostas guardadas no servidor para reenvio de partes
+COPIAS_PEDIDO   = 3        # cópias de cada pedido e de cada parte reenviada
+
+ARQUIVO_LOG    = "mensagens.log"
+ARQUIVO_INDICE = "mensagens.idx"
+
+_MAGIC     = b"MNIX"
+_VERSAO    = 1
+_CABECALHO = struct.Struct(">4sIQ")       # magic, versão, total de entradas
+_ENTRADA   = struct.Struct(">Qdqi4x")     # offset, instante, anterior, hash
+_REGISTRO  = struct.Struct(">II")         # tamanho, crc32
+
+# ──────────────────────────────────────────────
+# CORES ANSI
+# ──────────────────────────────────────────────
+AMARELO  = "\033[93m"
+VERDE    = "\033[92m"
+RESET    = "\033[0m"
+
+
+def log(camada: str, msg: str, cor: str = ""):
+    print(f"{cor}[{camada}] {msg}{RESET}")
+
+
+def _hash_remetente(remetente: str) -> int:
+    return zlib.crc32(remetente.encode("utf-8")) - (1 << 31)
+
+
+def _serializar(registro: dict) -> bytes:
+    dados = json.dumps(registro, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return _REGISTRO.pack(len(dados), zlib.crc32(dados)) + dados
+
+
+class LogMensagens:
+    """
+    Log de mensagens só de acréscimo com índice por SEQ e por remetente.
+    Cada registro é um dict com ao menos "remetente"; o log acrescenta
+    "seq" e "instante" (time.time() da entrega).
+    """
+
+    def __init__(self, diretorio: str, janela: float = JANELA_COMMIT, lote_max: int = LOTE_MAX):
+        os.makedirs(diretorio, exist_ok=True)
+        self.diretorio = diretorio
+        self.janela    = janela
+        self.lote_max  = lote_max
+
+        self._log = open(os.path.join(diretorio, ARQUIVO_LOG), "a+b")
+        self._idx = open(os.path.join(diretorio, ARQUIVO_INDICE), "a+b")
+        self._lock_indice = threading.RLock()
+        self._mapa  = None
+        self.total  = 0                  # entradas publicadas no índice
+        self._fim   = 0                  # fim do último registro indexado no log
+        self._ultimos: dict[int, int] = {}   # hash do remetente → último SEQ
+        self._abrir_indice()
+        self._recuperar()
+
+        # Fila da thread gravadora
+        self._cond       = threading.Condition()
+        self._pendentes: list[tuple[dict, bytes, object]] = []
+        self._proximo    = self.total    # SEQ do próximo anexar()
+        self._fechando   = False
+        self._gravador   = threading.Thread(target=self._gravar, daemon=True, name="historico")
+        self._gravador.start()
+
+        self.lotes    = 0
+        self.gravados = 0
+        log("HISTÓRICO", f"{self.total} mensagem(ns) em {diretorio}", VERDE)
+
+    # ── Índice (mmap) ──
+    def _abrir_indice(self):
+        tamanho = os.fstat(self._idx.fileno()).st_size
+        if tamanho < _CABECALHO.size + _ENTRADA.size:
+            self._idx.truncate(_CABECALHO.size + ENTRADAS_INICIO * _ENTRADA.size)
+        self._mapa = mmap.mmap(self._idx.fileno(), 0)
+        magic, versao, total = _CABECALHO.unpack_from(self._mapa, 0)
+        if magic != _MAGIC or versao != _VERSAO:
+            total = 0
+        self.total = min(total, self._capacidade())
+        self._escrever_cabecalho()
+
+    def _capacidade(self) -> int:
+        return (len(self._mapa) - _CABECALHO.size) // _ENTRADA.size
+
+    def _escrever_cabecalho(self):
+        _CABECALHO.pack_into(self._mapa, 0, _MAGIC, _VERSAO, self.total)
+
+    def _crescer(self, minimo: int):
+        capacidade = self._capacidade()
+        while capacidade < minimo:
+            capacidade *= 2
+        self._mapa.flush()
+        self._mapa.close()
+        self._idx.truncate(_CABECALHO.size + capacidade * _ENTRADA.size)
+        self._mapa = mmap.mmap(self._idx.fileno(), 0)
+
+    def _entrada(self, seq: int) -> tuple[int, float, int, int]:
+        return _ENTRADA.unpack_from(self._mapa, _CABECALHO.size + seq * _ENTRADA.size)
+
+    def _publicar(self, novas: list[tuple[int, float, str]]):
+        """Acrescenta (offset, instante, remetente) ao índice e ao cabeçalho."""
+        with self._lock_indice:
+            if self.total + len(novas) > self._capacidade():
+                self._crescer(self.total + len(novas))
+            for offset, instante, remetente in novas:
+                h = _hash_remetente(remetente)
+                _ENTRADA.pack_into(self._mapa, _CABECALHO.size + self.total * _ENTRADA.size,
+                                   offset, instante, self._ultimos.get(h, -1), h)
+                self._ultimos[h] = self.total
+                self.total += 1
+            self._escrever_cabecalho()
+
+    # ── Recuperação ──
+    def _ler_em(self, offset: int):
+        """(registro, fim) do registro em `offset`, ou (None, offset) se inválido."""
+        cabecalho = os.pread(self._log.fileno(), _REGISTRO.size, offset)
+        if len(cabecalho) < _REGISTRO.size:
+            return None, offset
+        tamanho, crc = _REGISTRO.unpack(cabecalho)
+        dados = os.pread(self._log.fileno(), tamanho, offset + _REGISTRO.size)
+        if len(dados) < tamanho or zlib.crc32(dados) != crc:
+            return None, offset
+        return json.loads(dados), offset + _REGISTRO.size + tamanho
+
+    def _recuperar(self):
+        tamanho_log = os.fstat(self._log.fileno()).st_size
+        if self.total:
+            offset = self._entrada(self.total - 1)[0]
+            registro, self._fim = self._ler_em(offset) if offset < tamanho_log else (None, 0)
+            if registro is None:
+                log("HISTÓRICO", "Índice não confere com o log → reconstruindo", AMARELO)
+                self.total, self._fim = 0, 0
+        for seq in range(self.total):
+            h = self._entrada(seq)[3]
+            self._ultimos[h] = seq
+
+        # Registros gravados depois do último publicado no índice
+        novas, offset = [], self._fim
+        while offset < tamanho_log:
+            registro, fim = self._ler_em(offset)
+            if registro is None:
+                log("HISTÓRICO", f"Registro incompleto em {offset} → log truncado", AMARELO)
+                self._log.truncate(offset)
+                break
+            novas.append((offset, registro["instante"], registro["remetente"]))
+            offset = fim
+        self._fim = offset
+        if novas:
+            self._publicar(novas)
+            log("HISTÓRICO", f"{len(novas)} registro(s) reindexado(s)", AMARELO)
+
+    # ── Escrita em grupo ──
+    def anexar(self, registro: dict, ao_gravar=None) -> int:
+        """
+        Enfileira `registro` para gravação e devolve o SEQ atribuído.
+        `ao_gravar()`, se dado, roda na thread gravadora depois do fsync do
+        lote que contém o registro (e de todos os anteriores).
+        """
+        with self._cond:
+            seq = self._proximo
+            self._proximo += 1
+            registro = dict(registro, seq=seq, instante=time.time())
+            self._pendentes.append((registro, _serializar(registro), ao_gravar))
+            self._cond.notify_all()
+        return seq
+
+    def sincronizar(self, timeout: float = None) -> bool:
+        """Espera até que tudo o que foi anexado esteja no disco e no índice."""
+        with self._cond:
+            alvo = self._proximo
+            return self._cond.wait_for(lambda: self.total >= alvo, timeout)
+
+    def _gravar(self):
+        """Thread: um write + fsync por lote de registros pendentes."""
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pendentes or self._fechando)
+                if not self._pendentes:
+                    return
+                if len(self._pendentes) < self.lote_max and not self._fechando:
+                    # Dá uma janela curta para o lote crescer
+                    self._cond.wait_for(lambda: len(self._pendentes) >= self.lote_max,
+                                        self.janela)
+                lote = self._pendentes[:self.lote_max]
+                del self._pendentes[:self.lote_max]
+
+            novas, offset = [], self._fim
+            for registro, bruto, _ in lote:
+                novas.append((offset, registro["instante"], registro["remetente"]))
+                offset += len(bruto)
+            self._log.write(b"".join(bruto for _, bruto, _ in lote))
+            self._log.flush()
+            os.fsync(self._log.fileno())
+            self._fim = offset
+            self._publicar(novas)
+
+            self.lotes    += 1
+            self.gravados += len(lote)
+            with self._cond:
+                self._cond.notify_all()
+            for _, _, ao_gravar in lote:
+                if ao_gravar is not None:
+                    ao_gravar()
+
+    # ── Consultas ──
+    def ler(self, seq: int) -> dict:
+        with self._lock_indice:
+            if not 0 <= seq < self.total:
+                raise IndexError(f"SEQ {seq} fora do histórico (0..{self.total - 1})")
+            offset = self._entrada(seq)[0]
+        registro, _ = self._ler_em(offset)
+        if registro is None:
+            raise ValueError(f"registro {seq} corrompido")
+        return registro
+
+    def ultimos(self, n: int) -> list[dict]:
+        """Os `n` registros mais recentes, do mais antigo ao mais novo."""
+        total = self.total
+        return [self.ler(seq) for seq in range(max(0, total - n), total)]
+
+    def desde(self, instante: float, limite: int = None) -> list[dict]:
+        """Registros entregues a partir de `instante` (time.time()), em ordem."""
+        with self._lock_indice:
+            total  = self.total
+            inicio = bisect.bisect_left(range(total), instante,
+                                        key=lambda seq: self._entrada(seq)[1])
+        fim = total if limite is None else min(total, inicio + limite)
+        return [self.ler(seq) for seq in range(inicio, fim)]
+
+    def do_remetente(self, remetente: str, n: int) -> list[dict]:
+        """Os `n` registros mais recentes de `remetente`, do mais antigo ao mais novo."""
+        h = _hash_remetente(remetente)
+        encontrados = []
+        with self._lock_indice:
+            seq = self._ultimos.get(h, -1)
+        while seq >= 0 and len(encontrados) < n:
+            registro = self.ler(seq)
+            if registro["remetente"] == remetente:     # hashes podem colidir
+                encontrados.append(registro)
+            with self._lock_indice:
+                seq = self._entrada(seq)[2]
+        encontrados.reverse()
+        return encontrados
+
+    def fechar(self):
+        with self._cond:
+            self._fechando = True
+            self._cond.notify_all()
+        self._gravador.join()
+        with self._lock_indice:
+            self._mapa.flush()
+            self._mapa.close()
+        self._idx.close()
+        self._log.close()
+
+
+# ══════════════════════════════════════════════════════════════════
+# RECUPERAÇÃO DO HISTÓRICO (catch-up)
+# ══════════════════════════════════════════════════════════════════
+class SegmentoHistorico(SegmentoPortas):
+    """Segmento de pedido ou de resposta de histórico (campo extra "historico")."""
+
+    def __init__(self, pedido: int, parte: int, payload, partes: int = None,
+                 src_port: int = PORTA_LEGADO, dst_port: int = PORTA_LEGADO, **extras):
+        super().__init__(parte, False, payload, src_port, dst_port)
+        self.pedido = pedido
+        self.partes = partes
+        self.extras = extras
+
+    def to_dict(self):
+        d = super().to_dict()
+        d["historico"] = self.pedido
+        if self.partes is not None:
+            d["partes"] = self.partes
+        d.update(self.extras)
+        return d
+
+
+def eh_segmento_de_historico(seg_dict: dict) -> bool:
+    return "historico" in seg_dict
+
+
+def em_partes(registros: list[dict], lote: int) -> list[list[dict]]:
+    """Divide `registros` em partes de até `lote` bytes de JSON (ao menos uma)."""
+    partes, atual, tamanho = [], [], 0
+    for registro in registros:
+        custo = len(json.dumps(registro, separators=(",", ":"))) + 1
+        if atual and tamanho + custo > lote:
+            partes.append(atual)
+            atual, tamanho = [], 0
+        atual.append(registro)
+        tamanho += custo
+    partes.append(atual)
+    return partes
+
+
+class RespostasHistorico:
+    """
+    Lado do servidor: seleciona as mensagens pedidas no LogMensagens e as
+    divide em partes. A divisão fica guardada por (fluxo, pedido) para que
+    um reenvio de partes perdidas receba exatamente as mesmas partes, mesmo
+    que novas mensagens tenham chegado nesse meio tempo.
+    Sem log (servidor sem --historico), responde com histórico vazio.
+    """
+
+    def __init__(self, historico: LogMensagens = None, memoria: int = RESPOSTAS_MAX):
+        self.historico = historico
+        self.memoria   = memoria
+        self._respostas: OrderedDict = OrderedDict()   # chave → (partes, última rodada)
+
+    def _selecionar(self, pedido: dict) -> list[dict]:
+        if self.historico is None:
+            return []
+        if isinstance(pedido.get("desde"), (int, float)):
+            return self.historico.desde(pedido["desde"])
+        ultimos = pedido.get("ultimos")
+        if isinstance(ultimos, int) and ultimos > 0:
+            return self.historico.ultimos(ultimos)
+        raise ValueError("pedido sem 'ultimos' nem 'desde'")
+
+    def responder(self, fluxo, seg_dict: dict) -> tuple[int, list[tuple[int, list[dict]]]]:
+        """
+        (total de partes, [(índice, mensagens), ...]) a enviar para o
+        pedido em `seg_dict`: todas as partes, ou COPIAS_PEDIDO vezes cada
+        uma das de "faltando". Uma cópia de uma rodada já respondida não
+        recebe nenhuma parte.
+        """
+        chave  = (fluxo, seg_dict["historico"])
+        rodada = seg_dict.get("rodada")
+        if chave in self._respostas:
+            partes, respondida = self._respostas[chave]
+            self._respostas.move_to_end(chave)
+            if rodada is not None and rodada == respondida:
+                return len(partes), []
+        else:
+            lote   = seg_dict.get("lote", LOTE_BYTES)
+            lote   = min(LOTE_BYTES, max(LOTE_MINIMO, lote if isinstance(lote, int) else 0))
+            partes = em_partes(self._selecionar(seg_dict.get("payload") or {}), lote)
+            if len(self._respostas) >= self.memoria:
+                self._respostas.popitem(last=False)
+        self._respostas[chave] = (partes, rodada)
+
+        faltando = seg_dict.get("faltando")
+        if isinstance(faltando, list):
+            indices = [i for i in faltando if isinstance(i, int) and 0 <= i < len(partes)
+                       for _ in range(COPIAS_PEDIDO)]
+        else:
+            indices = range(len(partes))
+        return len(partes), [(i, partes[i]) for i in indices]
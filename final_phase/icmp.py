@@ -0,0 +1,108 @@
+"""
+icmp.py - Mensagens de erro do roteador para o emissor (estilo ICMP)
+
+Quando o roteador descarta um pacote por TTL expirado, por não ter rota
+para o dst_vip ou por ele não caber na MTU do enlace, o emissor não fica
+sabendo e retransmite a cada 3 s para sempre. Aqui o roteador devolve um
+pacote de controle ao src_vip, e o cliente desiste da mensagem na
+primeira resposta (uma ida e volta) em vez de esgotar timeouts.
+
+Formato (campo "data" do Pacote, no lugar do Segmento):
+
+  {"icmp": {"tipo": "DESTINO_INALCANCAVEL", "vip_destino": "HOST_X",
+            "original": {"seq_num": 0, "is_ack": false, "src_port": 7, ...}}}
+
+`original` é o cabeçalho de transporte do pacote descartado (o segmento
+sem o payload): é por ele que o emissor sabe a que mensagem o erro se
+refere. O pacote de erro sai do VIP_ROTEADOR para o src_vip original.
+PACOTE_GRANDE leva também "mtu": a MTU do enlace que recusou o quadro
+(ver pmtu.py).
+
+Nunca se responde a um pacote que já é um erro, e os erros para cada
+src_vip passam por um balde de fichas (ERROS_POR_SEGUNDO, rajada
+ERROS_RAJADA; ver limitador.py) para que uma rajada de pacotes perdidos
+não vire uma rajada de erros.
+"""
+
+import time
+from protocol import Pacote
+from arp import VIP_ROTEADOR
+from limitador import BaldeFichas
+
+# ──────────────────────────────────────────────
+# CONFIGURAÇÕES
+# ──────────────────────────────────────────────
+TTL_EXCEDIDO         = "TTL_EXCEDIDO"
+DESTINO_INALCANCAVEL = "DESTINO_INALCANCAVEL"
+PACOTE_GRANDE        = "PACOTE_GRANDE"
+
+TTL_ICMP          = 8
+ERROS_POR_SEGUNDO = 10.0   # erros por VIP de origem
+ERROS_RAJADA      = 10.0
+
+DESCRICOES = {
+    TTL_EXCEDIDO        : "TTL excedido em trânsito",
+    DESTINO_INALCANCAVEL: "destino inalcançável",
+    PACOTE_GRANDE       : "pacote maior que a MTU do enlace",
+}
+
+
+def eh_icmp(seg_dict) -> bool:
+    """Indica se o conteúdo de um pacote é uma mensagem de erro do roteador."""
+    return isinstance(seg_dict, dict) and isinstance(seg_dict.get("icmp"), dict)
+
+
+class ErroICMP(Exception):
+    """Erro recebido do roteador para uma mensagem enviada por este nó."""
+
+    def __init__(self, icmp: dict):
+        self.tipo        = icmp.get("tipo")
+        self.vip_destino = icmp.get("vip_destino")
+        self.original    = icmp.get("original") or {}
+        self.mtu         = icmp.get("mtu")
+        super().__init__(f"{DESCRICOES.get(self.tipo, self.tipo)} ({self.vip_destino})")
+
+    def refere_se_a(self, dst_vip: str, **cabecalho) -> bool:
+        """True se o erro é sobre o pacote para `dst_vip` com esse cabeçalho."""
+        if self.vip_destino != dst_vip:
+            return False
+        return all(self.original.get(campo, 0) == valor for campo, valor in cabecalho.items())
+
+
+# ══════════════════════════════════════════════════════════════════
+# GERADOR (ROTEADOR)
+# ══════════════════════════════════════════════════════════════════
+class GeradorICMP:
+    """Monta as mensagens de erro do roteador, com limite de frequência."""
+
+    def __init__(self, taxa: float = ERROS_POR_SEGUNDO, rajada: float = ERROS_RAJADA):
+        self.taxa       = taxa
+        self.rajada     = rajada
+        self._baldes: dict[str, BaldeFichas] = {}
+        self.enviados   = 0
+        self.suprimidos = 0
+
+    def gerar(self, tipo: str, pacote_dict: dict, **extras):
+        """
+        Pacote de erro `tipo` para o src_vip de `pacote_dict` (como dict,
+        pronto para o codec), ou None se nada deve ser enviado: o pacote já
+        era um erro, ou o src_vip esgotou sua cota de erros.
+        """
+        segmento = pacote_dict.get("data")
+        if eh_icmp(segmento):
+            return None
+        src_vip, dst_vip = pacote_dict.get("src_vip"), pacote_dict.get("dst_vip")
+
+        balde = self._baldes.get(src_vip)
+        if balde is None:
+            balde = self._baldes[src_vip] = BaldeFichas(self.taxa, self.rajada)
+        if not balde.consumir(time.monotonic()):
+            self.suprimidos += 1
+            return None
+
+        cabecalho = ({k: v for k, v in segmento.items() if k != "payload"}
+                     if isinstance(segmento, dict) else {})
+        icmp = {"tipo": tipo, "vip_destino": dst_vip, "original": cabecalho, **extras}
+        self.enviados += 1
+        return Pacote(src_vip=VIP_ROTEADOR, dst_vip=src_vip, ttl=TTL_ICMP,
+                      segmento_dict={"icmp": icmp}).to_dict()
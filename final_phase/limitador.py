@@ -0,0 +1,85 @@
+"""
+limitador.py - Limitação de taxa por VIP de origem no roteador
+
+Um cliente retransmitindo agressivamente consegue ocupar o roteador sozinho.
+Cada VIP de origem ganha um balde de fichas (token bucket): `taxa` fichas
+por segundo, até `rajada` acumuladas; cada quadro consome uma ficha. A
+verificação acontece logo depois da leitura do cabeçalho L3, antes de
+qualquer trabalho de roteamento ou reserialização.
+
+Quadro acima do limite:
+  descartar  é descartado (veredito LIMITE na captura)
+  rebaixar   segue na classe EXCEDENTE das filas de saída (ver filas.py),
+             que só transmite quando não há mais nada a enviar no enlace;
+             sem filas (--fila 0) é descartado
+
+Contadores por VIP (aceitos, excedentes) no comando LIMITES da porta de
+controle do roteador.
+
+Uso:
+  python router.py --porta 5000 --rotas rotas.conf --limite 20 --rajada 10
+  python router.py ... --limite 20 --acao-limite rebaixar
+"""
+
+import time
+
+# ──────────────────────────────────────────────
+# CONFIGURAÇÕES
+# ──────────────────────────────────────────────
+ACOES = ("descartar", "rebaixar")
+
+
+class BaldeFichas:
+    """Token bucket: `taxa` fichas/s, no máximo `rajada` acumuladas."""
+
+    __slots__ = ("taxa", "rajada", "fichas", "ultimo", "aceitos", "excedentes")
+
+    def __init__(self, taxa: float, rajada: float):
+        self.taxa       = taxa
+        self.rajada     = rajada
+        self.fichas     = rajada
+        self.ultimo     = time.monotonic()
+        self.aceitos    = 0
+        self.excedentes = 0
+
+    def consumir(self, agora: float) -> bool:
+        self.fichas = min(self.rajada, self.fichas + (agora - self.ultimo) * self.taxa)
+        self.ultimo = agora
+        if self.fichas >= 1.0:
+            self.fichas -= 1.0
+            self.aceitos += 1
+            return True
+        self.excedentes += 1
+        return False
+
+
+class LimitadorTaxa:
+    """Um BaldeFichas por VIP de origem, criado no primeiro quadro do VIP."""
+
+    def __init__(self, taxa: float, rajada: float = None, acao: str = "descartar"):
+        if taxa <= 0:
+            raise ValueError("a taxa deve ser positiva")
+        if acao not in ACOES:
+            raise ValueError(f"ação '{acao}' desconhecida (use {', '.join(ACOES)})")
+        self.taxa   = taxa
+        self.rajada = rajada if rajada is not None else max(1.0, taxa)
+        self.acao   = acao
+        self._baldes: dict[str, BaldeFichas] = {}
+
+    def permitir(self, src_vip: str) -> bool:
+        """True se o quadro de `src_vip` está dentro do limite."""
+        balde = self._baldes.get(src_vip)
+        if balde is None:
+            balde = self._baldes[src_vip] = BaldeFichas(self.taxa, self.rajada)
+        return balde.consumir(time.monotonic())
+
+    def contadores(self) -> dict[str, tuple[int, int]]:
+        """VIP → (aceitos, excedentes)."""
+        return {vip: (b.aceitos, b.excedentes) for vip, b in list(self._baldes.items())}
+
+    def relatorio(self) -> str:
+        linhas = [f"taxa {self.taxa:g}/s, rajada {self.rajada:g}, ação {self.acao}",
+                  f"{'vip':16s} {'aceitos':>9s} {'excedentes':>11s}"]
+        for vip, (aceitos, excedentes) in sorted(self.contadores().items()):
+            linhas.append(f"{vip:16s} {aceitos:9d} {excedentes:11d}")
+        return "\n".join(linhas)
@@ -0,0 +1,63 @@
+"""
+molde.py - Moldes de cabeçalho pré-montados para a serialização de Quadros
+
+Quadro.serializar() gera o JSON do quadro inteiro duas vezes (uma ordenada
+para o CRC, outra para o envio) a cada mensagem, embora os cabeçalhos L2/L3
+(MACs, VIPs, TTL) sejam os mesmos para todas as mensagens a um mesmo par.
+
+O molde guarda, por par, o texto fixo antes e depois do segmento na forma
+canônica usada pelo CRC (json.dumps com sort_keys=True) e o estado do CRC32
+já aplicado ao prefixo. Montar um quadro passa a ser:
+
+  1. json.dumps do segmento (a única parte variável);
+  2. crc32 continuando do estado do prefixo, sobre o segmento e a cauda fixa;
+  3. concatenar prefixo + segmento + cauda com o FCS no lugar.
+
+O resultado é JSON equivalente ao de Quadro.serializar() (mesmo conteúdo,
+mesmo FCS) e é aceito sem mudanças por Quadro.deserializar(), que só lê o
+JSON e recalcula o CRC sobre a forma canônica.
+
+Dependência: nenhuma além da stdlib (o formato segue protocol.py)
+"""
+
+import json
+import zlib
+
+MOLDES_MAX = 256
+
+
+class MoldeQuadro:
+    """Prefixo/cauda fixos de um quadro para (MACs, VIPs, TTL) dados."""
+
+    __slots__ = ("prefixo", "cauda_antes_fcs", "cauda_depois_fcs", "cauda_crc", "crc_prefixo")
+
+    def __init__(self, src_mac: str, dst_mac: str, src_vip: str, dst_vip: str, ttl: int):
+        # Chaves em ordem alfabética em todos os níveis, como sort_keys=True:
+        #   quadro: data, dst_mac, fcs, src_mac | pacote: data, dst_vip, src_vip, ttl
+        d = json.dumps
+        self.prefixo = b'{"data": {"data": '
+        cauda_pacote = f', "dst_vip": {d(dst_vip)}, "src_vip": {d(src_vip)}, "ttl": {d(ttl)}}}'
+        self.cauda_antes_fcs  = f'{cauda_pacote}, "dst_mac": {d(dst_mac)}, "fcs": '.encode("utf-8")
+        self.cauda_depois_fcs = f', "src_mac": {d(src_mac)}}}'.encode("utf-8")
+        self.cauda_crc   = self.cauda_antes_fcs + b"0" + self.cauda_depois_fcs
+        self.crc_prefixo = zlib.crc32(self.prefixo)
+
+    def montar(self, segmento_dict: dict) -> bytes:
+        segmento = json.dumps(segmento_dict, sort_keys=True).encode("utf-8")
+        crc = zlib.crc32(self.cauda_crc, zlib.crc32(segmento, self.crc_prefixo))
+        return b"".join((self.prefixo, segmento, self.cauda_antes_fcs,
+                         str(crc).encode("ascii"), self.cauda_depois_fcs))
+
+
+_moldes: dict[tuple, MoldeQuadro] = {}
+
+
+def obter_molde(src_mac: str, dst_mac: str, src_vip: str, dst_vip: str, ttl: int) -> MoldeQuadro:
+    """Molde do cache; criado na primeira mensagem para o par."""
+    chave = (src_mac, dst_mac, src_vip, dst_vip, ttl)
+    molde = _moldes.get(chave)
+    if molde is None:
+        if len(_moldes) >= MOLDES_MAX:
+            _moldes.clear()
+        molde = _moldes[chave] = MoldeQuadro(*chave)
+    return molde
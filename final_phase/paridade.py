@@ -0,0 +1,189 @@
+"""
+paridade.py - Quadros de paridade por grupo na Camada de Transporte
+
+No Stop-and-Wait cada quadro perdido pelo canal (20%) custa um timeout
+inteiro de 3 s. No modo paridade o emissor envia um grupo de K segmentos de
+dados seguidos de um segmento de paridade com o XOR dos K payloads; o
+servidor reconstrói qualquer segmento único que falte no grupo sem esperar
+retransmissão e confirma o grupo com um só ACK.
+
+Segmentos do modo paridade carregam campos extras no dicionário:
+  seq_num = índice no grupo (0..K-1 dados, K = paridade)
+  grupo   = identificador do grupo (crescente por emissor)
+  k       = número de segmentos de dados do grupo
+
+Payload da paridade:
+  {"tamanhos": [len_0, ..., len_{K-1}], "xor": base64(XOR dos payloads)}
+onde cada payload é tomado em JSON canônico (chaves ordenadas, sem espaços)
+e completado com zeros até o maior tamanho do grupo.
+
+Se faltar mais de um segmento, o grupo fica aberto até a retransmissão;
+o emissor reenvia o grupo inteiro e o receptor ignora o que já tem.
+
+Ativação (modo streaming e --enviar-arquivo): python client.py --paridade 4
+"""
+
+import json
+import base64
+from collections import deque
+from portas import SegmentoPortas, PORTA_LEGADO
+
+# ──────────────────────────────────────────────
+# CONFIGURAÇÕES
+# ──────────────────────────────────────────────
+GRUPOS_ABERTOS_MAX = 256   # grupos incompletos guardados no receptor
+MEMORIA_CONCLUIDOS = 64    # grupos entregues lembrados por fluxo (re-ACK)
+
+# ──────────────────────────────────────────────
+# CORES ANSI
+# ──────────────────────────────────────────────
+VERDE    = "\033[92m"
+RESET    = "\033[0m"
+
+
+def log(camada: str, msg: str, cor: str = ""):
+    print(f"{cor}[{camada}] {msg}{RESET}")
+
+
+# ══════════════════════════════════════════════════════════════════
+# SEGMENTOS
+# ══════════════════════════════════════════════════════════════════
+class SegmentoGrupo(SegmentoPortas):
+    """Segmento com os campos do modo paridade (grupo e k)."""
+
+    def __init__(self, grupo: int, indice: int, k: int, is_ack: bool, payload,
+                 src_port: int = PORTA_LEGADO, dst_port: int = PORTA_LEGADO):
+        super().__init__(indice, is_ack, payload, src_port, dst_port)
+        self.grupo = grupo
+        self.k     = k
+
+    def to_dict(self):
+        d = super().to_dict()
+        d["grupo"] = self.grupo
+        d["k"]     = self.k
+        return d
+
+
+def eh_segmento_de_grupo(seg_dict: dict) -> bool:
+    return "grupo" in seg_dict
+
+
+def em_grupos(iteravel, k: int):
+    """Agrupa um iterável em listas de até k itens (o último pode ser menor)."""
+    grupo = []
+    for item in iteravel:
+        grupo.append(item)
+        if len(grupo) == k:
+            yield grupo
+            grupo = []
+    if grupo:
+        yield grupo
+
+
+# ══════════════════════════════════════════════════════════════════
+# PARIDADE XOR
+# ══════════════════════════════════════════════════════════════════
+def _canonico(payload) -> bytes:
+    return json.dumps(payload, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
+def _xor(blocos: list[bytes], tamanho: int) -> bytes:
+    acc = 0
+    for b in blocos:
+        acc ^= int.from_bytes(b.ljust(tamanho, b"\0"), "big")
+    return acc.to_bytes(tamanho, "big")
+
+
+def payload_paridade(payloads: list) -> dict:
+    """Payload do segmento de paridade de um grupo de payloads."""
+    blocos = [_canonico(p) for p in payloads]
+    maior  = max(len(b) for b in blocos)
+    return {
+        "tamanhos": [len(b) for b in blocos],
+        "xor"     : base64.b64encode(_xor(blocos, maior)).decode("ascii"),
+    }
+
+
+def reconstruir(blocos: dict[int, bytes], paridade: dict, k: int):
+    """
+    Recupera o único payload ausente de `blocos` (índice → JSON canônico).
+    Retorna (índice, payload).
+    """
+    (faltando,) = set(range(k)) - set(blocos)
+    xor     = base64.b64decode(paridade["xor"])
+    dados   = _xor(list(blocos.values()) + [xor], len(xor))
+    tamanho = paridade["tamanhos"][faltando]
+    return faltando, json.loads(dados[:tamanho])
+
+
+# ══════════════════════════════════════════════════════════════════
+# RECEPTOR
+# ══════════════════════════════════════════════════════════════════
+class _Grupo:
+    __slots__ = ("k", "blocos", "payloads", "paridade")
+
+    def __init__(self, k: int):
+        self.k        = k
+        self.blocos   = {}     # índice → JSON canônico (para o XOR)
+        self.payloads = {}     # índice → payload
+        self.paridade = None
+
+
+class ReceptorGrupos:
+    """
+    Junta os segmentos de cada (fluxo, grupo) e decide quando o grupo
+    pode ser entregue — completo ou reconstruído pela paridade. O fluxo é
+    qualquer chave do emissor (VIP, ou VIP + portas).
+    """
+
+    def __init__(self):
+        self._abertos: dict[tuple, _Grupo] = {}
+        self._concluidos: dict[object, deque] = {}
+        self.entregues   = 0
+        self.recuperados = 0
+
+    def receber(self, fluxo, seg_dict: dict):
+        """
+        Processa um segmento do modo paridade. Retorna:
+          lista de payloads (em ordem) → grupo completo agora: ACK + entrega
+          []                            → grupo já entregue (duplicata): só re-ACK
+          None                          → grupo ainda incompleto
+        Levanta KeyError/TypeError/ValueError se o segmento for malformado.
+        """
+        num, indice, k = seg_dict["grupo"], seg_dict["seq_num"], seg_dict["k"]
+        if not 0 <= indice <= k:
+            raise ValueError(f"índice {indice} fora do grupo de {k}")
+
+        concluidos = self._concluidos.setdefault(fluxo, deque(maxlen=MEMORIA_CONCLUIDOS))
+        if num in concluidos:
+            return []
+
+        chave = (fluxo, num)
+        grupo = self._abertos.get(chave)
+        if grupo is None:
+            if len(self._abertos) >= GRUPOS_ABERTOS_MAX:
+                del self._abertos[next(iter(self._abertos))]
+            grupo = self._abertos[chave] = _Grupo(k)
+
+        if indice == k:
+            grupo.paridade = seg_dict["payload"]
+        elif indice not in grupo.payloads:
+            grupo.payloads[indice] = seg_dict["payload"]
+            grupo.blocos[indice]   = _canonico(seg_dict["payload"])
+
+        if len(grupo.payloads) == k - 1 and grupo.paridade is not None:
+            faltando, payload = reconstruir(grupo.blocos, grupo.paridade, k)
+            grupo.payloads[faltando] = payload
+            self.recuperados += 1
+            log("TRANSPORTE",
+                f"Segmento {faltando} do grupo {num} reconstruído pela paridade "
+                f"(recuperados: {self.recuperados} em {self.entregues + 1} grupo(s))",
+                VERDE)
+
+        if len(grupo.payloads) < k:
+            return None
+
+        del self._abertos[chave]
+        concluidos.append(num)
+        self.entregues += 1
+        return [grupo.payloads[i] for i in range(k)]
@@ -0,0 +1,169 @@
+"""
+perfil.py - Instrumentação opcional de tempo por etapa da pilha
+
+Mede quanto tempo cada etapa consome (decodificação JSON, verificação de
+CRC, consulta de rota, montagem do ACK, simulador de canal...) e acumula
+as amostras em histogramas de baldes fixos (potências de 2 em µs).
+
+Desligado por padrão. Para ligar:
+  MININET_PERFIL=1 python router.py ...
+
+Com o perfil ligado, o relatório é impresso ao encerrar o processo e a
+qualquer momento com `kill -USR1 <pid>`.
+
+Uso nos módulos instrumentados (custo desligado: um teste de atributo):
+  t = perfil.agora() if perfil.ATIVO else 0
+  ...
+  if perfil.ATIVO: perfil.registrar("roteador.rota", t)
+"""
+
+import os
+import json
+import zlib
+import time
+import atexit
+import signal
+import threading
+import fec
+from codificacao import codec_do_quadro, CODEC_JSON
+
+# ──────────────────────────────────────────────
+# CONFIGURAÇÕES
+# ──────────────────────────────────────────────
+# Balde i conta amostras em [2^(i-1), 2^i) µs; o balde 0 conta < 1 µs e o
+# último acumula tudo acima de ~8,4 s.
+NUM_BALDES = 24
+
+ATIVO = False
+
+agora = time.perf_counter_ns
+
+
+# ══════════════════════════════════════════════════════════════════
+# HISTOGRAMA
+# ══════════════════════════════════════════════════════════════════
+class Histograma:
+    """Histograma de latências com baldes logarítmicos fixos."""
+
+    __slots__ = ("baldes", "n", "soma_ns", "max_ns")
+
+    def __init__(self):
+        self.baldes  = [0] * NUM_BALDES
+        self.n       = 0
+        self.soma_ns = 0
+        self.max_ns  = 0
+
+    def adicionar(self, ns: int):
+        balde = (ns // 1000).bit_length()
+        self.baldes[balde if balde < NUM_BALDES else NUM_BALDES - 1] += 1
+        self.n       += 1
+        self.soma_ns += ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+
+    def percentil(self, p: float) -> float:
+        """Limite superior (µs) do balde que contém o percentil p (0–100)."""
+        alvo = self.n * p / 100.0
+        acumulado = 0
+        for i, contagem in enumerate(self.baldes):
+            acumulado += contagem
+            if acumulado >= alvo and contagem:
+                return float(1 << i)
+        return float(1 << (NUM_BALDES - 1))
+
+
+_histogramas: dict[str, Histograma] = {}
+_lock = threading.Lock()
+
+
+def registrar(etapa: str, inicio_ns: int):
+    """Registra a duração de `etapa` desde `inicio_ns` (de agora())."""
+    duracao = time.perf_counter_ns() - inicio_ns
+    hist = _histogramas.get(etapa)
+    if hist is None:
+        with _lock:
+            hist = _histogramas.setdefault(etapa, Histograma())
+    hist.adicionar(duracao)
+
+
+# ══════════════════════════════════════════════════════════════════
+# ETAPAS QUE protocol.py EXECUTA DE UMA VEZ
+# ══════════════════════════════════════════════════════════════════
+def deserializar_medido(bytes_recebidos: bytes):
+    """
+    Equivalente a Quadro.deserializar(), separando em etapas o decode JSON
+    e a verificação de CRC. Só é chamado com o perfil ligado.
+    """
+    t = agora()
+    try:
+        dados_dict = json.loads(bytes_recebidos.decode('utf-8'))
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        registrar("enlace.json_decode", t)
+        return None, False
+    registrar("enlace.json_decode", t)
+
+    t = agora()
+    fcs_recebido = dados_dict.get('fcs', 0)
+    dados_para_calculo = dados_dict.copy()
+    dados_para_calculo['fcs'] = 0
+    json_str = json.dumps(dados_para_calculo, sort_keys=True)
+    fcs_calculado = zlib.crc32(json_str.encode('utf-8'))
+    registrar("enlace.crc", t)
+
+    return dados_dict, fcs_recebido == fcs_calculado
+
+
+def decodificar_medido(bytes_recebidos: bytes):
+    """Equivalente a codificacao.decodificar_quadro(), com tempo por codec."""
+    if fec.eh_protegido(bytes_recebidos):
+        t = agora()
+        bytes_recebidos = fec.abrir(bytes_recebidos)
+        registrar("enlace.fec", t)
+        if bytes_recebidos is None:
+            return None, False
+    codec = codec_do_quadro(bytes_recebidos)
+    if codec is CODEC_JSON:
+        return deserializar_medido(bytes_recebidos)
+    t = agora()
+    resultado = codec.decodificar(bytes_recebidos)
+    registrar(f"enlace.decodificar.{codec.nome}", t)
+    return resultado
+
+
+# ══════════════════════════════════════════════════════════════════
+# RELATÓRIO
+# ══════════════════════════════════════════════════════════════════
+def relatorio() -> str:
+    linhas = [
+        f"{'etapa':28s} {'n':>8s} {'média µs':>10s} {'p50':>8s} {'p99':>8s} {'máx µs':>10s}",
+        "─" * 78,
+    ]
+    for etapa, h in sorted(_histogramas.items()):
+        if not h.n:
+            continue
+        linhas.append(
+            f"{etapa:28s} {h.n:8d} {h.soma_ns / h.n / 1000:10.1f} "
+            f"{'≤' + str(int(h.percentil(50))):>8s} {'≤' + str(int(h.percentil(99))):>8s} "
+            f"{h.max_ns / 1000:10.1f}")
+    return "\n".join(linhas)
+
+
+def imprimir_relatorio(*_):
+    print("\n[PERFIL] Tempo por etapa (baldes em potências de 2 µs)")
+    print(relatorio())
+    print()
+
+
+def ativar():
+    """Liga a coleta e registra os gatilhos de relatório (atexit e SIGUSR1)."""
+    global ATIVO
+    if ATIVO:
+        return
+    ATIVO = True
+    atexit.register(imprimir_relatorio)
+    if hasattr(signal, "SIGUSR1") and threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGUSR1, imprimir_relatorio)
+
+
+if os.environ.get("MININET_PERFIL", "") not in ("", "0"):
+    ativar()
@@ -0,0 +1,56 @@
+"""
+pmtu.py - MTU por enlace e descoberta da MTU do caminho (PMTU)
+
+Até aqui todo salto aceitava quadros de até BUFFER_SIZE = 65535 bytes. O
+roteador agora tem uma MTU por enlace de saída (próximo salto IP:PORTA):
+um quadro reemitido maior que ela é descartado e o emissor recebe um erro
+PACOTE_GRANDE (ver icmp.py) com a MTU do enlace no campo "mtu".
+
+O emissor guarda a menor MTU conhecida por VIP de destino (CachePMTU) e:
+  - recusa na hora uma mensagem de chat cujo quadro não cabe nela;
+  - na transferência de arquivos, escolhe o maior bloco cujo quadro cabe
+    e retoma do bloco recusado (ver transferencia.py).
+
+Uma entrada expira após PMTU_VALIDADE segundos, para que um enlace que
+voltou a aceitar quadros maiores seja redescoberto.
+
+No arquivo de rotas do roteador:  MTU IP PORTA BYTES
+Na porta de controle:             MTU IP PORTA BYTES
+Padrão para todos os enlaces:     python router.py ... --mtu 1500
+"""
+
+import time
+
+# ──────────────────────────────────────────────
+# CONFIGURAÇÕES
+# ──────────────────────────────────────────────
+MTU_PADRAO    = 65507     # maior payload de um datagrama UDP/IPv4
+MTU_MINIMA    = 256       # abaixo disso nem um ACK cabe no quadro
+PMTU_VALIDADE = 600.0     # segundos até redescobrir a PMTU de um destino
+
+
+class CachePMTU:
+    """VIP de destino → MTU do caminho aprendida por erros PACOTE_GRANDE."""
+
+    def __init__(self, validade: float = PMTU_VALIDADE):
+        self.validade = validade
+        self._entradas: dict[str, tuple[int, float]] = {}
+
+    def obter(self, vip: str) -> int:
+        """PMTU conhecida para `vip`, ou MTU_PADRAO se não houver (ou expirou)."""
+        entrada = self._entradas.get(vip)
+        if entrada is None:
+            return MTU_PADRAO
+        mtu, expira = entrada
+        if expira <= time.monotonic():
+            del self._entradas[vip]
+            return MTU_PADRAO
+        return mtu
+
+    def registrar(self, vip: str, mtu: int) -> bool:
+        """Reduz a PMTU de `vip`; retorna True se ela diminuiu."""
+        mtu = max(MTU_MINIMA, int(mtu))
+        if mtu >= self.obter(vip):
+            return False
+        self._entradas[vip] = (mtu, time.monotonic() + self.validade)
+        return True
@@ -0,0 +1,68 @@
+"""
+portas.py - Portas de transporte (multiplexação de fluxos)
+
+O Segmento de protocol.py não tem portas: cada socket carrega uma única
+conversa e o servidor guarda um SEQ esperado por VIP. Aqui o cabeçalho de
+transporte ganha src_port/dst_port como campos extras do segmento, e um
+fluxo passa a ser identificado por (VIP de origem, src_port, dst_port) —
+cada fluxo com o próprio espaço de SEQ e a própria janela Stop-and-Wait
+sobre o mesmo socket UDP.
+
+Portas 0/0 são o modo legado: os campos não vão no quadro.
+
+O campo opcional "sinc" (uma época inteira) pede ao receptor que aceite o
+SEQ deste segmento como o esperado: o emissor o usa na primeira mensagem
+do fluxo e depois de desistir de uma, quando não sabe mais se o receptor
+chegou a alternar o bit. Retransmissões com a mesma época seguem a regra
+normal de duplicatas.
+
+O campo opcional "membros" vai nas cópias de uma mensagem para um VIP de
+grupo e nos ACKs delas: é a lista dos VIPs para os quais o roteador
+replicou a mensagem, e diz ao emissor de quem esperar confirmação.
+
+Portas conhecidas:
+  PORTA_CHAT    = 7     mensagens de chat
+  PORTA_ARQUIVO = 20    transferência de arquivos (transferencia.py)
+"""
+
+from protocol import Segmento
+
+# ──────────────────────────────────────────────
+# CONFIGURAÇÕES
+# ──────────────────────────────────────────────
+PORTA_LEGADO  = 0
+PORTA_CHAT    = 7
+PORTA_ARQUIVO = 20
+
+
+class SegmentoPortas(Segmento):
+    """Segmento com portas de origem e destino (e os campos opcionais acima)."""
+
+    def __init__(self, seq_num, is_ack, payload,
+                 src_port: int = PORTA_LEGADO, dst_port: int = PORTA_LEGADO,
+                 sinc: int = None, membros: tuple = None):
+        super().__init__(seq_num=seq_num, is_ack=is_ack, payload=payload)
+        self.src_port = src_port
+        self.dst_port = dst_port
+        self.sinc     = sinc
+        self.membros  = membros
+
+    def to_dict(self):
+        d = super().to_dict()
+        if self.src_port or self.dst_port:
+            d["src_port"] = self.src_port
+            d["dst_port"] = self.dst_port
+        if self.sinc is not None:
+            d["sinc"] = self.sinc
+        if self.membros is not None:
+            d["membros"] = list(self.membros)
+        return d
+
+
+def portas_do_segmento(seg_dict: dict) -> tuple[int, int]:
+    """(src_port, dst_port) de um segmento recebido; (0, 0) se legado."""
+    src_port = seg_dict.get("src_port", PORTA_LEGADO)
+    dst_port = seg_dict.get("dst_port", PORTA_LEGADO)
+    if not isinstance(src_port, int) or not isinstance(dst_port, int):
+        raise TypeError("portas devem ser inteiras")
+    return src_port, dst_port
@@ -0,0 +1,307 @@
+"""
+replay.py - Medição da capacidade de encaminhamento do roteador
+
+Dispara um trace de quadros contra run_router pelo loopback e mede:
+  - quadros encaminhados por segundo (pps)
+  - descartes por motivo (CRC, TTL, sem rota...) e perdas no socket do kernel
+  - CPU da thread do roteador por quadro
+
+O trace pode ser gravado (pcap de captura.py) ou sintético, misturando
+quadros válidos, corrompidos (1 byte com XOR 0xFF, como o canal real) e com
+TTL expirado. O roteador roda sem o simulador de canal (canal_ruidoso=False,
+e fisica.desligar_ruido() nos três processos para os quadros ARP e ICMP)
+e com a saída de logs descartada; emissor e sumidouro rodam em processos
+separados para não disputar o GIL com o roteador. Com --memoria os três usam
+o enlace por memória compartilhada de fisica.py em vez de UDP.
+
+Uso:
+  python replay.py --sintetico 20000 --corrompidos 0.2 --ttl-expirado 0.05
+  python replay.py --trace roteador.pcap --pps 5000
+  python replay.py --sintetico 20000 --pps 8000 --fila 32 --aqm red
+  python replay.py --sintetico 20000 --memoria
+"""
+
+import os
+import sys
+import time
+import random
+import socket
+import argparse
+import contextlib
+import threading
+import multiprocessing
+
+from protocol import Segmento, Pacote, Quadro
+from arp import mac_local
+from codificacao import decodificar_quadro
+from captura import ler_trace, NOMES_VEREDITO, VEREDITO_ENCAMINHADO, VEREDITO_ARP
+import router
+from filas import CAPACIDADE_PADRAO, POLITICAS, PESO_PADRAO
+from limitador import LimitadorTaxa
+import fisica
+
+# ──────────────────────────────────────────────
+# CONFIGURAÇÕES
+# ──────────────────────────────────────────────
+PORTA_ROTEADOR   = 5900
+PORTA_SUMIDOURO  = 5901
+PORTA_EMISSOR    = 5902   # o enlace por memória exige bind para enviar
+VIP_ORIGEM       = "REPLAY"
+VIP_DESTINO      = "SUMIDOURO"
+DRENO_SEGUNDOS   = 1.0    # espera após o último quadro antes de medir
+BUFFER_SOCKET    = 8 * 1024 * 1024
+
+
+# ══════════════════════════════════════════════════════════════════
+# TRACES
+# ══════════════════════════════════════════════════════════════════
+def gerar_trace_sintetico(n: int, frac_corrompidos: float, frac_ttl: float,
+                          semente: int = 0) -> list[bytes]:
+    """Quadros de chat válidos, corrompidos e com TTL=0, em ordem aleatória."""
+    rnd = random.Random(semente)
+    quadros = []
+    for i in range(n):
+        sorteio = rnd.random()
+        ttl = 0 if sorteio < frac_ttl else 8
+        payload = {
+            "type"     : "CHAT",
+            "sender"   : "replay",
+            "message"  : f"mensagem {i} " + "x" * rnd.randint(0, 200),
+            "timestamp": "2025-01-01T00:00:00",
+        }
+        seg    = Segmento(seq_num=i % 2, is_ack=False, payload=payload)
+        pacote = Pacote(VIP_ORIGEM, VIP_DESTINO, ttl, seg.to_dict())
+        dados  = Quadro(mac_local(VIP_ORIGEM), mac_local("ROTEADOR"), pacote.to_dict()).serializar()
+
+        if frac_ttl <= sorteio < frac_ttl + frac_corrompidos:
+            corrompido = bytearray(dados)
+            pos = rnd.randrange(len(corrompido))
+            corrompido[pos] ^= 0xFF
+            dados = bytes(corrompido)
+        quadros.append(dados)
+    return quadros
+
+
+def carregar_trace(caminho: str) -> list[bytes]:
+    return [quadro for _, _, quadro in ler_trace(caminho)]
+
+
+def vips_de_destino(quadros: list[bytes]) -> set[str]:
+    """VIPs de destino presentes nos quadros íntegros do trace."""
+    vips = set()
+    for dados in quadros:
+        quadro_dict, integro = decodificar_quadro(dados)
+        if integro and isinstance(quadro_dict.get("data"), dict):
+            vip = quadro_dict["data"].get("dst_vip")
+            if vip:
+                vips.add(vip)
+    return vips or {VIP_DESTINO}
+
+
+# ══════════════════════════════════════════════════════════════════
+# PROCESSOS AUXILIARES
+# ══════════════════════════════════════════════════════════════════
+def _sumidouro(porta: int, vips, endereco_roteador, pronto, parar, resultado,
+               memoria: bool = False):
+    """Recebe o que o roteador encaminha; anuncia os VIPs por ARP antes."""
+    fisica.desligar_ruido()
+    if memoria:
+        fisica.ativar_memoria()
+    sock = fisica.abrir_socket()
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, BUFFER_SOCKET)
+    sock.bind(("127.0.0.1", porta))
+    sock.settimeout(0.2)
+
+    for vip in vips:
+        anuncio = Quadro(mac_local(vip), "FF:FF:FF:FF:FF:FF", {"arp": {
+            "op": "ANUNCIO", "vip_origem": vip, "mac_origem": mac_local(vip)}})
+        sock.sendto(anuncio.serializar(), endereco_roteador)
+    pronto.set()
+
+    recebidos = 0
+    while not parar.is_set():
+        try:
+            sock.recvfrom(65535)
+            recebidos += 1
+        except socket.timeout:
+            pass
+    resultado.put(recebidos)
+    sock.close()
+
+
+def _emissor(quadros: list[bytes], endereco_roteador, pps: float, resultado,
+             memoria: bool = False):
+    """Envia o trace no ritmo pedido (pps=0: o mais rápido possível)."""
+    fisica.desligar_ruido()
+    if memoria:
+        fisica.ativar_memoria()
+    sock = fisica.abrir_socket()
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, BUFFER_SOCKET)
+    sock.bind(("127.0.0.1", PORTA_EMISSOR))
+    intervalo = 1.0 / pps if pps > 0 else 0.0
+    inicio = time.perf_counter()
+    for i, dados in enumerate(quadros):
+        if intervalo:
+            atraso = inicio + i * intervalo - time.perf_counter()
+            if atraso > 0:
+                time.sleep(atraso)
+        sock.sendto(dados, endereco_roteador)
+    resultado.put(time.perf_counter() - inicio)
+    sock.close()
+
+
+# ══════════════════════════════════════════════════════════════════
+# CONTAGEM NO ROTEADOR
+# ══════════════════════════════════════════════════════════════════
+class ContadorVereditos:
+    """
+    Passado a run_router no lugar de uma Captura: conta vereditos e amostra
+    o tempo de CPU da thread do roteador (registrar() roda nela).
+    """
+
+    def __init__(self):
+        self.zerar()
+
+    def zerar(self):
+        self.contagem   = {}
+        self.cpu_inicio = None
+        self.cpu_fim    = None
+        self.t_inicio   = None
+        self.t_fim      = None
+
+    def registrar(self, dados: bytes, veredito: int):
+        agora_cpu = time.thread_time()
+        agora     = time.perf_counter()
+        if self.cpu_inicio is None:
+            self.cpu_inicio, self.t_inicio = agora_cpu, agora
+        self.cpu_fim, self.t_fim = agora_cpu, agora
+        self.contagem[veredito] = self.contagem.get(veredito, 0) + 1
+
+
+# ══════════════════════════════════════════════════════════════════
+# EXECUÇÃO
+# ══════════════════════════════════════════════════════════════════
+def executar(quadros: list[bytes], pps: float = 0.0,
+             porta_roteador: int = PORTA_ROTEADOR,
+             porta_sumidouro: int = PORTA_SUMIDOURO,
+             capacidade_fila: int = CAPACIDADE_PADRAO,
+             politica_fila: str = "cauda", limite_taxa: float = None,
+             memoria: bool = False) -> dict:
+    endereco_roteador = ("127.0.0.1", porta_roteador)
+    fisica.desligar_ruido()
+    if memoria:
+        fisica.ativar_memoria()
+    vips = vips_de_destino(quadros)
+    router.trocar_tabela({vip: ("127.0.0.1", porta_sumidouro) for vip in vips}, "replay")
+
+    ctx       = multiprocessing.get_context("spawn")
+    pronto    = ctx.Event()
+    parar     = ctx.Event()
+    res_sum   = ctx.Queue()
+    res_emi   = ctx.Queue()
+    contador  = ContadorVereditos()
+
+    with open(os.devnull, "w") as nulo, contextlib.redirect_stdout(nulo):
+        threading.Thread(target=router.run_router,
+                         args=(porta_roteador, contador, False,
+                               capacidade_fila, politica_fila, "estrito", PESO_PADRAO,
+                               LimitadorTaxa(limite_taxa) if limite_taxa else None),
+                         daemon=True).start()
+        time.sleep(0.8)   # anúncios ARP do próprio roteador na partida
+
+        sumidouro = ctx.Process(target=_sumidouro,
+                                args=(porta_sumidouro, sorted(vips), endereco_roteador,
+                                      pronto, parar, res_sum, memoria))
+        sumidouro.start()
+        pronto.wait()
+        time.sleep(0.3)
+        contador.zerar()   # descarta os ARPs de aquecimento
+
+        emissor = ctx.Process(target=_emissor,
+                              args=(quadros, endereco_roteador, pps, res_emi, memoria))
+        emissor.start()
+        duracao_envio = res_emi.get()
+        emissor.join()
+
+        time.sleep(DRENO_SEGUNDOS)
+        parar.set()
+        entregues = res_sum.get()
+        sumidouro.join()
+
+    processados  = sum(contador.contagem.values())
+    encaminhados = contador.contagem.get(VEREDITO_ENCAMINHADO, 0)
+    janela       = (contador.t_fim - contador.t_inicio) if processados > 1 else 0.0
+    cpu          = (contador.cpu_fim - contador.cpu_inicio) if processados > 1 else 0.0
+
+    return {
+        "enviados"        : len(quadros),
+        "duracao_envio"   : duracao_envio,
+        "processados"     : processados,
+        "perdidos_kernel" : len(quadros) - processados,
+        "vereditos"       : dict(contador.contagem),
+        "encaminhados"    : encaminhados,
+        "entregues"       : entregues,
+        "pps_encaminhado" : encaminhados / janela if janela else 0.0,
+        "pps_processado"  : processados / janela if janela else 0.0,
+        "cpu_us_quadro"   : cpu / processados * 1e6 if processados else 0.0,
+        "filas"           : router.filas_saida.relatorio() if router.filas_saida else None,
+    }
+
+
+def imprimir_relatorio(r: dict):
+    print("=" * 55)
+    print("  Mini-NET — Capacidade do Roteador (replay)")
+    print("=" * 55)
+    print(f"  Quadros enviados       : {r['enviados']} em {r['duracao_envio']:.3f}s")
+    print(f"  Processados (roteador) : {r['processados']}")
+    print(f"  Perdidos no kernel     : {r['perdidos_kernel']}")
+    print(f"  Recebidos no sumidouro : {r['entregues']}")
+    print()
+    print("  Vereditos:")
+    for veredito, n in sorted(r["vereditos"].items()):
+        if veredito != VEREDITO_ARP:
+            print(f"    {NOMES_VEREDITO.get(veredito, veredito):12s} {n}")
+    print()
+    print(f"  Encaminhados/s         : {r['pps_encaminhado']:.0f} pps")
+    print(f"  Processados/s          : {r['pps_processado']:.0f} pps")
+    print(f"  CPU por quadro         : {r['cpu_us_quadro']:.1f} µs")
+    if r["filas"]:
+        print()
+        print("  Filas de saída:")
+        for linha in r["filas"].splitlines():
+            print(f"    {linha}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay de trace contra o roteador Mini-NET")
+    origem = parser.add_mutually_exclusive_group(required=True)
+    origem.add_argument("--trace", help="pcap gravado com --captura")
+    origem.add_argument("--sintetico", type=int, metavar="N", help="gera N quadros sintéticos")
+    parser.add_argument("--corrompidos", type=float, default=0.2,
+                        help="fração corrompida no trace sintético (padrão 0.2)")
+    parser.add_argument("--ttl-expirado", type=float, default=0.05,
+                        help="fração com TTL=0 no trace sintético (padrão 0.05)")
+    parser.add_argument("--pps", type=float, default=0.0,
+                        help="taxa de envio; 0 = o mais rápido possível")
+    parser.add_argument("--fila", type=int, default=CAPACIDADE_PADRAO,
+                        help="capacidade das filas de saída do roteador (0 = síncrono)")
+    parser.add_argument("--aqm", choices=POLITICAS, default="cauda",
+                        help="política de descarte das filas do roteador")
+    parser.add_argument("--limite", type=float, metavar="TAXA",
+                        help="limite de quadros/s por VIP de origem no roteador")
+    parser.add_argument("--memoria", action="store_true",
+                        help="roteador, emissor e sumidouro pelo enlace de memória compartilhada")
+    parser.add_argument("--porta-roteador", type=int, default=PORTA_ROTEADOR)
+    parser.add_argument("--porta-sumidouro", type=int, default=PORTA_SUMIDOURO)
+    args = parser.parse_args()
+
+    if args.trace:
+        quadros = carregar_trace(args.trace)
+    else:
+        quadros = gerar_trace_sintetico(args.sintetico, args.corrompidos, args.ttl_expirado)
+    if not quadros:
+        print("Trace vazio.")
+        sys.exit(1)
+
+    imprimir_relatorio(executar(quadros, args.pps, args.porta_roteador, args.porta_sumidouro,
+                                args.fila, args.aqm, args.limite, args.memoria))
@@ -12,15 +12,75 @@ O Roteador opera na fronteira L2/L3:
   → Lê o cabeçalho de Rede (dst_vip, TTL)
   → Gera um novo Quadro para o próximo salto
 
-Uso:
-  python router.py
+O MAC de destino de cada salto é resolvido por ARP (ver arp.py): os hosts
+se anunciam ao subir e o roteador responde aos REQUESTs pelo próprio MAC.
 
-Dependência: protocol.py (mesma pasta)
+Uso:
+  python router.py                              (configuração interativa)
+  python router.py --porta 5000 --rotas rotas.conf [--vigiar] [--controle 5999]
+
+Reconfiguração em tempo real (sem parar o encaminhamento):
+  --vigiar         recarrega o arquivo de rotas sempre que ele for alterado
+  --controle PORTA abre uma porta UDP de controle em 127.0.0.1 que aceita:
+                     ADD VIP IP PORTA | GRUPO NOME VIP... | MTU IP PORTA BYTES
+                     DEL VIP | RELOAD | SHOW
+                   ex.: echo "ADD HOST_C 127.0.0.1 5004" | nc -u -w1 127.0.0.1 5999
+  --captura ARQ    grava quadros e vereditos em pcap (ver captura.py)
+
+VIPs de grupo (multicast): no arquivo de rotas, `GRUPO NOME VIP1 VIP2 ...`
+(ou o comando GRUPO NOME VIP1 VIP2 ... na porta de controle). Um pacote
+para NOME é replicado para o próximo salto de cada membro com rota, exceto
+o próprio remetente; o pacote é lido uma vez e só o cabeçalho de enlace
+(MAC de destino e CRC) é refeito por cópia. O segmento replicado leva
+"membros" (os VIPs cujas cópias saíram: as barradas pela MTU ou pela fila
+do enlace não contam), que os membros ecoam no ACK: assim o emissor sabe
+de quem esperar confirmação (ver portas.py).
+
+Filas de saída (ver filas.py): cada próximo salto tem uma fila limitada e
+uma thread transmissora; o comando FILAS da porta de controle mostra as
+métricas.
+  --fila N         capacidade por enlace (padrão 64; 0 = envio síncrono)
+  --aqm cauda|red  política de descarte da fila (padrão cauda)
+  --escalonador estrito|ponderado [--peso N]
+                   como ACKs passam à frente dos dados (padrão estrito)
+
+Limite de taxa por VIP de origem (ver limitador.py; comando LIMITES):
+  --limite TAXA [--rajada N] [--acao-limite descartar|rebaixar]
+
+Erros para o emissor (ver icmp.py): pacotes descartados por TTL expirado ou
+sem rota geram TTL_EXCEDIDO / DESTINO_INALCANCAVEL de volta ao src_vip.
+  --sem-icmp       descarta em silêncio, como antes
+
+MTU por enlace de saída (ver pmtu.py): quadros maiores são descartados com
+um erro PACOTE_GRANDE que informa a MTU ao emissor.
+  --mtu BYTES      MTU de todos os enlaces (padrão 65507)
+                   no arquivo de rotas, `MTU IP PORTA BYTES` vale para um enlace
+
+Dependências (mesma pasta): protocol.py, fisica.py, codificacao.py, fec.py,
+arp.py, filas.py, icmp.py, pmtu.py, limitador.py, captura.py, perfil.py
 """
 
+import os
+import sys
+import time
 import socket
-import json
-from protocol import Quadro, enviar_pela_rede_ruidosa
+import argparse
+import threading
+from protocol import enviar_pela_rede_ruidosa
+import perfil
+import fec
+import fisica
+from codificacao import codec_do_quadro
+from arp import NoARP, VIP_ROTEADOR
+from filas import (FilasPorEnlace, classe_do_pacote, CAPACIDADE_PADRAO, POLITICAS,
+                   ESCALONADORES, PESO_PADRAO, ACEITO, DESCARTE_CAUDA, EXCEDENTE,
+                   PRIORITARIA)
+from icmp import GeradorICMP, TTL_EXCEDIDO, DESTINO_INALCANCAVEL, PACOTE_GRANDE
+from pmtu import MTU_PADRAO, MTU_MINIMA
+from limitador import LimitadorTaxa, ACOES
+from captura import (Captura, VEREDITO_CRC_FALHA, VEREDITO_TTL, VEREDITO_SEM_ROTA,
+                     VEREDITO_ENCAMINHADO, VEREDITO_ARP, VEREDITO_MALFORMADO,
+                     VEREDITO_FILA, VEREDITO_LIMITE, VEREDITO_MTU)
 
 # ──────────────────────────────────────────────
 # CORES ANSI
@@ -34,26 +94,245 @@ RESET    = "\033[0m"
 
 BUFFER_SIZE = 65535
 
-# MAC do roteador (origem dos quadros que ele gera)
-MAC_ROTEADOR = "DD:DD:DD:DD:DD:04"
-
-# Tabela de MACs fictícios dos hosts (para montar dst_mac do novo quadro)
-TABELA_MAC = {
-    "HOST_A"  : "AA:AA:AA:AA:AA:01",
-    "HOST_B"  : "BB:BB:BB:BB:BB:02",
-    "SERVIDOR": "CC:CC:CC:CC:CC:03",
-}
-
 
 def log(camada: str, msg: str, cor: str = ""):
     print(f"{cor}[{camada}] {msg}{RESET}")
 
 
 # ══════════════════════════════════════════════════════════════════
-# TABELA DE ROTEAMENTO ESTÁTICA
+# TABELA DE ROTEAMENTO
 # ══════════════════════════════════════════════════════════════════
+# A tabela nunca é alterada no lugar depois que o roteador sobe: cada mudança
+# monta um dicionário novo e troca a referência global de uma vez. O laço de
+# encaminhamento lê `tabela_roteamento` sem lock e sempre enxerga uma tabela
+# completa (a antiga ou a nova).
 tabela_roteamento: dict[str, tuple[str, int]] = {}
 
+# VIP de grupo → VIPs membros (mesma disciplina de troca atômica)
+tabela_grupos: dict[str, tuple[str, ...]] = {}
+
+# MTU por enlace de saída (IP, PORTA) → bytes; os demais usam `mtu_padrao`
+tabela_mtu: dict[tuple[str, int], int] = {}
+mtu_padrao = MTU_PADRAO
+_lock_tabela = threading.Lock()   # serializa apenas os escritores
+
+# Filas de saída do roteador em execução (None = envio síncrono)
+filas_saida: FilasPorEnlace = None
+
+# Limite de taxa por VIP de origem (None = sem limite)
+limitador: LimitadorTaxa = None
+
+
+def interpretar_rotas(linhas) -> dict[str, tuple[str, int]]:
+    """
+    Converte linhas no formato `VIP IP PORTA` em tabela de rotas.
+    Linhas vazias, comentários (#) e linhas GRUPO/MTU são ignorados.
+    Lança ValueError na primeira linha inválida.
+    """
+    tabela = {}
+    for numero, linha in enumerate(linhas, start=1):
+        linha = linha.split("#", 1)[0].strip()
+        if not linha:
+            continue
+        partes = linha.split()
+        if partes[0].upper() in ("GRUPO", "MTU"):
+            continue
+        if len(partes) != 3:
+            raise ValueError(f"linha {numero}: use VIP IP PORTA")
+        vip, ip, porta = partes
+        try:
+            tabela[vip] = (ip, int(porta))
+        except ValueError:
+            raise ValueError(f"linha {numero}: porta inválida '{porta}'") from None
+    return tabela
+
+
+def interpretar_grupos(linhas) -> dict[str, tuple[str, ...]]:
+    """
+    Extrai as linhas `GRUPO NOME VIP1 VIP2 ...` (as demais são ignoradas).
+    Lança ValueError na primeira linha GRUPO inválida.
+    """
+    grupos = {}
+    for numero, linha in enumerate(linhas, start=1):
+        partes = linha.split("#", 1)[0].split()
+        if not partes or partes[0].upper() != "GRUPO":
+            continue
+        if len(partes) < 3:
+            raise ValueError(f"linha {numero}: use GRUPO NOME VIP1 [VIP2 ...]")
+        nome, membros = partes[1], tuple(dict.fromkeys(partes[2:]))
+        if nome in membros:
+            raise ValueError(f"linha {numero}: o grupo {nome} não pode conter a si mesmo")
+        grupos[nome] = membros
+    return grupos
+
+
+def interpretar_mtus(linhas) -> dict[tuple[str, int], int]:
+    """
+    Extrai as linhas `MTU IP PORTA BYTES` (as demais são ignoradas).
+    Lança ValueError na primeira linha MTU inválida.
+    """
+    mtus = {}
+    for numero, linha in enumerate(linhas, start=1):
+        partes = linha.split("#", 1)[0].split()
+        if not partes or partes[0].upper() != "MTU":
+            continue
+        if len(partes) != 4:
+            raise ValueError(f"linha {numero}: use MTU IP PORTA BYTES")
+        _, ip, porta, mtu = partes
+        try:
+            endereco, mtu = (ip, int(porta)), int(mtu)
+        except ValueError:
+            raise ValueError(f"linha {numero}: porta ou MTU inválida") from None
+        if mtu < MTU_MINIMA:
+            raise ValueError(f"linha {numero}: MTU mínima é {MTU_MINIMA}")
+        mtus[endereco] = mtu
+    return mtus
+
+
+def carregar_tabela(caminho: str) -> dict[str, tuple[str, int]]:
+    with open(caminho, encoding="utf-8") as arquivo:
+        return interpretar_rotas(arquivo)
+
+
+def carregar_grupos(caminho: str) -> dict[str, tuple[str, ...]]:
+    with open(caminho, encoding="utf-8") as arquivo:
+        return interpretar_grupos(arquivo)
+
+
+def carregar_mtus(caminho: str) -> dict[tuple[str, int], int]:
+    with open(caminho, encoding="utf-8") as arquivo:
+        return interpretar_mtus(arquivo)
+
+
+def trocar_tabela(nova: dict[str, tuple[str, int]], origem: str):
+    """Substitui a tabela inteira de forma atômica."""
+    global tabela_roteamento
+    tabela_roteamento = nova
+    log("ROTEADOR", f"Tabela substituída ({origem}): {len(nova)} rota(s)", VERDE)
+
+
+def trocar_grupos(novos: dict[str, tuple[str, ...]], origem: str):
+    """Substitui a tabela de grupos inteira de forma atômica."""
+    global tabela_grupos
+    tabela_grupos = novos
+    log("ROTEADOR", f"Grupos substituídos ({origem}): {len(novos)} grupo(s)", VERDE)
+
+
+def trocar_mtus(novas: dict[tuple[str, int], int], origem: str):
+    """Substitui a tabela de MTUs inteira de forma atômica."""
+    global tabela_mtu
+    tabela_mtu = novas
+    log("ROTEADOR", f"MTUs substituídas ({origem}): {len(novas)} enlace(s)", VERDE)
+
+
+def recarregar(caminho: str):
+    """Relê rotas, grupos e MTUs; nada muda se alguma linha for inválida."""
+    rotas, grupos, mtus = carregar_tabela(caminho), carregar_grupos(caminho), carregar_mtus(caminho)
+    trocar_tabela(rotas, f"arquivo {caminho}")
+    trocar_grupos(grupos, f"arquivo {caminho}")
+    trocar_mtus(mtus, f"arquivo {caminho}")
+
+
+def exibir_tabela():
+    print(f"\n{AZUL}Tabela de Roteamento:{RESET}")
+    for vip, (ip, porta) in tabela_roteamento.items():
+        print(f"  {vip:20s} → {ip}:{porta}")
+    for nome, membros in tabela_grupos.items():
+        print(f"  {nome:20s} ⇉ {' '.join(membros)}")
+    for (ip, porta), mtu in tabela_mtu.items():
+        print(f"  MTU {ip}:{porta:<10d} = {mtu} bytes")
+    print()
+
+
+def vigiar_arquivo(caminho: str, intervalo: float = 1.0):
+    """Thread: recarrega o arquivo de rotas quando o mtime muda."""
+    ultima_mtime = os.stat(caminho).st_mtime_ns
+    while True:
+        time.sleep(intervalo)
+        try:
+            mtime = os.stat(caminho).st_mtime_ns
+            if mtime == ultima_mtime:
+                continue
+            ultima_mtime = mtime
+            with _lock_tabela:
+                recarregar(caminho)
+        except (OSError, ValueError) as e:
+            log("ROTEADOR", f"Recarga de {caminho} ignorada: {e}", VERMELHO)
+
+
+def executar_comando(comando: str, caminho_rotas: str = None) -> str:
+    """Aplica um comando de controle e retorna a resposta em texto."""
+    partes = comando.split()
+    if not partes:
+        return "ERRO comando vazio"
+    verbo = partes[0].upper()
+
+    with _lock_tabela:
+        if verbo == "ADD" and len(partes) == 4:
+            nova = dict(tabela_roteamento)
+            nova.update(interpretar_rotas([" ".join(partes[1:])]))
+            trocar_tabela(nova, f"controle: {comando}")
+            return "OK"
+        if verbo == "GRUPO" and len(partes) >= 3:
+            novos = dict(tabela_grupos)
+            novos.update(interpretar_grupos([comando]))
+            trocar_grupos(novos, f"controle: {comando}")
+            return "OK"
+        if verbo == "MTU" and len(partes) == 4:
+            novas = dict(tabela_mtu)
+            novas.update(interpretar_mtus([comando]))
+            trocar_mtus(novas, f"controle: {comando}")
+            return "OK"
+        if verbo == "DEL" and len(partes) == 2:
+            if partes[1] in tabela_grupos:
+                novos = dict(tabela_grupos)
+                del novos[partes[1]]
+                trocar_grupos(novos, f"controle: {comando}")
+                return "OK"
+            if partes[1] not in tabela_roteamento:
+                return f"ERRO rota {partes[1]} inexistente"
+            nova = dict(tabela_roteamento)
+            del nova[partes[1]]
+            trocar_tabela(nova, f"controle: {comando}")
+            return "OK"
+        if verbo == "RELOAD" and len(partes) == 1:
+            if caminho_rotas is None:
+                return "ERRO roteador iniciado sem --rotas"
+            recarregar(caminho_rotas)
+            return "OK"
+        if verbo == "SHOW" and len(partes) == 1:
+            linhas = [f"{vip} {ip} {porta}" for vip, (ip, porta) in tabela_roteamento.items()]
+            linhas += [f"GRUPO {nome} {' '.join(membros)}"
+                       for nome, membros in tabela_grupos.items()]
+            linhas += [f"MTU {ip} {porta} {mtu}" for (ip, porta), mtu in tabela_mtu.items()]
+            return "\n".join(linhas) or "(vazia)"
+
+    if verbo == "FILAS" and len(partes) == 1:
+        if filas_saida is None:
+            return "ERRO roteador sem filas de saída (--fila 0)"
+        return filas_saida.relatorio()
+    if verbo == "LIMITES" and len(partes) == 1:
+        if limitador is None:
+            return "ERRO roteador sem limite de taxa (--limite)"
+        return limitador.relatorio()
+
+    return ("ERRO use ADD VIP IP PORTA | GRUPO NOME VIP... | MTU IP PORTA BYTES | DEL VIP "
+            "| RELOAD | SHOW | FILAS | LIMITES")
+
+
+def servir_controle(porta: int, caminho_rotas: str = None):
+    """Thread: porta UDP de controle (apenas 127.0.0.1)."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(("127.0.0.1", porta))
+    log("ROTEADOR", f"Porta de controle em 127.0.0.1:{porta}", VERDE)
+    while True:
+        dados, endereco = sock.recvfrom(BUFFER_SIZE)
+        try:
+            resposta = executar_comando(dados.decode("utf-8").strip(), caminho_rotas)
+        except (UnicodeDecodeError, OSError, ValueError) as e:
+            resposta = f"ERRO {e}"
+        sock.sendto(resposta.encode("utf-8"), endereco)
+
 
 def configurar_tabela():
     print(f"\n{AZUL}{'─'*50}")
@@ -83,20 +362,83 @@ def configurar_tabela():
     if not tabela_roteamento:
         print(f"{VERMELHO}Nenhuma rota cadastrada!{RESET}")
     else:
-        print(f"\n{AZUL}Tabela de Roteamento:{RESET}")
-        for vip, (ip, porta) in tabela_roteamento.items():
-            print(f"  {vip:20s} → {ip}:{porta}")
-        print()
+        exibir_tabela()
 
 
 # ══════════════════════════════════════════════════════════════════
 # ROTEADOR
 # ══════════════════════════════════════════════════════════════════
-def run_router(minha_porta: int):
-    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+def _enviar_direto(sock, bytes_dados, endereco_destino):
+    """Canal ideal: sem perda, corrupção ou latência simuladas."""
+    sock.sendto(bytes_dados, endereco_destino)
+
+
+def run_router(minha_porta: int, captura: Captura = None, canal_ruidoso: bool = True,
+               capacidade_fila: int = CAPACIDADE_PADRAO, politica_fila: str = "cauda",
+               escalonador: str = "estrito", peso: int = PESO_PADRAO,
+               limite: LimitadorTaxa = None, icmp: bool = True, mtu: int = MTU_PADRAO):
+    """
+    Laço principal de encaminhamento. Com `captura`, cada quadro recebido é
+    registrado no buffer circular junto com o veredito do roteador.
+    `canal_ruidoso=False` encaminha sem o simulador de canal (medição de
+    capacidade, ver replay.py), inclusive os quadros ARP do roteador.
+    Com `capacidade_fila` > 0 os quadros vão para a fila de saída do próximo
+    salto (política `politica_fila`), e ACKs passam à frente dos dados
+    conforme `escalonador`; com 0 são transmitidos aqui mesmo.
+    `limite` aplica o limite de taxa por VIP de origem.
+    Com `icmp`, descartes por TTL, falta de rota ou MTU são avisados ao
+    emissor. `mtu` vale para os enlaces sem linha MTU na tabela.
+    """
+    global filas_saida, limitador, mtu_padrao
+    limitador  = limite
+    mtu_padrao = mtu
+    transmitir = enviar_pela_rede_ruidosa if canal_ruidoso else _enviar_direto
+
+    sock = fisica.abrir_socket()
     sock.bind(("127.0.0.1", minha_porta))
 
-    log("ROTEADOR", f"MAC={MAC_ROTEADOR} | Porta={minha_porta}", VERDE)
+    if capacidade_fila > 0:
+        filas_saida = FilasPorEnlace(sock, transmitir, capacidade_fila, politica_fila,
+                                     escalonador, peso)
+        log("ROTEADOR", f"Filas de saída: {capacidade_fila} quadros/enlace, "
+                        f"política {politica_fila}, escalonador {escalonador}", VERDE)
+
+    def transmitir_arp(sock, quadro_bytes, endereco):
+        """ARP sai como os dados, mas nunca dorme no laço de encaminhamento."""
+        if filas_saida is not None:
+            filas_saida.enfileirar(endereco, quadro_bytes, PRIORITARIA)
+        elif canal_ruidoso:
+            threading.Thread(target=transmitir, args=(sock, quadro_bytes, endereco),
+                             daemon=True).start()
+        else:
+            transmitir(sock, quadro_bytes, endereco)
+
+    # ── L2: ARP — cache dos MACs dos vizinhos ──
+    no_arp = NoARP(sock, VIP_ROTEADOR, transmitir=transmitir_arp)
+    for ip, porta in set(tabela_roteamento.values()):
+        no_arp.anunciar((ip, porta))
+
+    gerador_icmp = GeradorICMP() if icmp else None
+
+    def responder_erro(tipo, pacote_dict, endereco_origem, codec, com_fec, **extras):
+        """Devolve um erro ao emissor pela rota do src_vip (ou por onde veio)."""
+        if gerador_icmp is None:
+            return
+        erro = gerador_icmp.gerar(tipo, pacote_dict, **extras)
+        if erro is None:
+            return
+        endereco = tabela_roteamento.get(erro["dst_vip"], endereco_origem)
+        dst_mac  = no_arp.resolver(erro["dst_vip"], endereco)
+        quadro_bytes = codec.codificar(no_arp.meu_mac, dst_mac, erro)
+        if com_fec or fec.FEC_ATIVO:
+            quadro_bytes = fec.proteger(quadro_bytes)
+        log("REDE", f"Erro {tipo} → {erro['dst_vip']}", AMARELO)
+        if filas_saida is not None:
+            filas_saida.enfileirar(endereco, quadro_bytes, PRIORITARIA)
+        else:
+            transmitir(sock, quadro_bytes, endereco)
+
+    log("ROTEADOR", f"MAC={no_arp.meu_mac} | Porta={minha_porta}", VERDE)
     log("ROTEADOR", "Aguardando quadros...\n", VERDE)
 
     while True:
@@ -106,11 +448,26 @@ def run_router(minha_porta: int):
             log("ROTEADOR", f"Erro ao receber: {e}", VERMELHO)
             continue
 
-        # ── L2: Enlace — desserializa e verifica CRC ──
-        quadro_dict, integro = Quadro.deserializar(dados_brutos)
+        t_quadro = perfil.agora() if perfil.ATIVO else 0
+
+        # ── L2: Enlace — repara (FEC), desserializa e verifica CRC ──
+        # O quadro é decodificado e reemitido no mesmo codec em que chegou,
+        # com FEC se chegou com FEC
+        com_fec = fec.eh_protegido(dados_brutos)
+        dados_quadro = fec.abrir(dados_brutos) if com_fec else dados_brutos
+        if dados_quadro is None:
+            quadro_dict, integro = None, False
+        else:
+            codec = codec_do_quadro(dados_quadro)
+            if perfil.ATIVO:
+                quadro_dict, integro = perfil.decodificar_medido(dados_quadro)
+            else:
+                quadro_dict, integro = codec.decodificar(dados_quadro)
 
         if quadro_dict is None:
             log("ENLACE", "Quadro destruído (JSON inválido) → descartado", VERMELHO)
+            if captura is not None:
+                captura.registrar(dados_brutos, VEREDITO_CRC_FALHA)
             print()
             continue
 
@@ -119,6 +476,8 @@ def run_router(minha_porta: int):
                 "Erro de CRC! Quadro corrompido → descartado silenciosamente",
                 VERMELHO)
             # Não reenvia nada — o timeout do emissor original tratará isso
+            if captura is not None:
+                captura.registrar(dados_brutos, VEREDITO_CRC_FALHA)
             print()
             continue
 
@@ -126,6 +485,12 @@ def run_router(minha_porta: int):
             f"CRC OK ✓ | {quadro_dict['src_mac']} → {quadro_dict['dst_mac']} | De: {endereco_origem}",
             AZUL)
 
+        if no_arp.processar(quadro_dict, endereco_origem):
+            if captura is not None:
+                captura.registrar(dados_brutos, VEREDITO_ARP)
+            print()
+            continue
+
         # ── L3: Rede — lê cabeçalho do Pacote ──
         try:
             pacote_dict = quadro_dict["data"]
@@ -134,6 +499,8 @@ def run_router(minha_porta: int):
             ttl     = pacote_dict["ttl"]
         except KeyError:
             log("REDE", "Pacote malformado dentro do quadro → descartado", VERMELHO)
+            if captura is not None:
+                captura.registrar(dados_brutos, VEREDITO_MALFORMADO)
             print()
             continue
 
@@ -144,9 +511,21 @@ def run_router(minha_porta: int):
             f"Pacote [{tipo_str}] | {src_vip} → {dst_vip} | TTL={ttl}",
             MAGENTA)
 
+        # Limite de taxa do VIP de origem
+        excedente = limitador is not None and not limitador.permitir(src_vip)
+        if excedente and (limitador.acao == "descartar" or filas_saida is None):
+            log("REDE", f"{src_vip} acima do limite de taxa → descartado", VERMELHO)
+            if captura is not None:
+                captura.registrar(dados_brutos, VEREDITO_LIMITE)
+            print()
+            continue
+
         # Verifica TTL
         if ttl <= 0:
             log("REDE", f"TTL expirado → pacote descartado", VERMELHO)
+            if captura is not None:
+                captura.registrar(dados_brutos, VEREDITO_TTL)
+            responder_erro(TTL_EXCEDIDO, pacote_dict, endereco_origem, codec, com_fec)
             print()
             continue
 
@@ -154,33 +533,110 @@ def run_router(minha_porta: int):
         pacote_dict["ttl"] = ttl - 1
         log("REDE", f"TTL decrementado: {ttl} → {ttl - 1}", MAGENTA)
 
-        # Consulta tabela de roteamento
-        if dst_vip not in tabela_roteamento:
-            log("REDE",
-                f"Destino '{dst_vip}' não encontrado na tabela → descartado",
-                VERMELHO)
+        # Consulta tabela de roteamento (uma única leitura da referência atual)
+        # Um VIP de grupo vira um próximo salto por membro com rota
+        t = perfil.agora() if perfil.ATIVO else 0
+        rotas   = tabela_roteamento
+        membros = tabela_grupos.get(dst_vip)
+        if membros is None:
+            destinos = [(dst_vip, rotas[dst_vip])] if dst_vip in rotas else []
+        else:
+            destinos = [(vip, rotas[vip]) for vip in membros if vip != src_vip and vip in rotas]
+        if perfil.ATIVO:
+            perfil.registrar("roteador.rota", t)
+        if not destinos:
+            if membros is None:
+                log("REDE",
+                    f"Destino '{dst_vip}' não encontrado na tabela → descartado",
+                    VERMELHO)
+            else:
+                log("REDE", f"Grupo '{dst_vip}' sem membros alcançáveis → descartado",
+                    VERMELHO)
+            if captura is not None:
+                captura.registrar(dados_brutos, VEREDITO_SEM_ROTA)
+            responder_erro(DESTINO_INALCANCAVEL, pacote_dict, endereco_origem, codec, com_fec)
             print()
             continue
 
-        ip_destino, porta_destino = tabela_roteamento[dst_vip]
-        log("REDE", f"Rota: {dst_vip} → {ip_destino}:{porta_destino}", AZUL)
+        segmento = pacote_dict.get("data")
+        contar   = membros is not None and isinstance(segmento, dict) and "icmp" not in segmento
+        if membros is None:
+            log("REDE", f"Rota: {dst_vip} → {destinos[0][1][0]}:{destinos[0][1][1]}", AZUL)
+        else:
+            log("REDE", f"Grupo {dst_vip} → {', '.join(vip for vip, _ in destinos)}", AZUL)
+        if contar:
+            # Provisório: corrigido abaixo se alguma cópia não passar da MTU ou da fila
+            pacote_dict["data"] = dict(segmento, membros=[vip for vip, _ in destinos])
 
         # ── L2: Re-encapsula em novo Quadro com MACs do próximo salto ──
-        dst_mac  = TABELA_MAC.get(dst_vip, "FF:FF:FF:FF:FF:FF")
-        novo_quadro = Quadro(
-            src_mac     = MAC_ROTEADOR,
-            dst_mac     = dst_mac,
-            pacote_dict = pacote_dict
-        )
-        quadro_bytes = novo_quadro.serializar()  # Recalcula CRC para o novo quadro
+        # O pacote é codificado uma vez; cada cópia só troca o dst_mac e o CRC
+        t = perfil.agora() if perfil.ATIVO else 0
+        dst_macs = [no_arp.resolver(vip, rota) for vip, rota in destinos]
+        quadros  = codec.codificar_para_varios(no_arp.meu_mac, dst_macs, pacote_dict)  # Recalcula CRC
+        if com_fec or fec.FEC_ATIVO:
+            quadros = [fec.proteger(q) for q in quadros]
+        if perfil.ATIVO:
+            perfil.registrar("roteador.serializar", t)
 
         log("ENLACE",
-            f"Novo quadro gerado com CRC32 | {MAC_ROTEADOR} → {dst_mac}",
+            f"Novo quadro gerado com CRC32 | {no_arp.meu_mac} → {', '.join(dst_macs)}",
             AZUL)
 
-        # ── L1: Encaminha pelo canal ruidoso ──
-        log("REDE", f"Encaminhando para {ip_destino}:{porta_destino}...", AZUL)
-        enviar_pela_rede_ruidosa(sock, quadro_bytes, (ip_destino, porta_destino))
+        # ── L1: Admissão — MTU e fila de cada enlace, antes de qualquer envio ──
+        classe = EXCEDENTE if excedente else classe_do_pacote(pacote_dict)
+        admitidos, veredito_descarte = [], VEREDITO_FILA
+        mtus = tabela_mtu
+        for i, (vip, endereco) in enumerate(destinos):
+            mtu_enlace = mtus.get(endereco, mtu_padrao)
+            if len(quadros[i]) > mtu_enlace:
+                log("REDE", f"Quadro de {len(quadros[i])} B excede a MTU de "
+                            f"{endereco[0]}:{endereco[1]} ({mtu_enlace} B) → descartado", VERMELHO)
+                responder_erro(PACOTE_GRANDE, pacote_dict, endereco_origem, codec, com_fec,
+                               mtu=mtu_enlace)
+                veredito_descarte = VEREDITO_MTU
+                continue
+            if filas_saida is not None:
+                resultado = filas_saida.admitir(endereco, classe)
+                if resultado != ACEITO:
+                    motivo = "fila cheia" if resultado == DESCARTE_CAUDA else "RED"
+                    log("REDE", f"Descartado na fila de {endereco[0]}:{endereco[1]} ({motivo})",
+                        VERMELHO)
+                    continue
+            admitidos.append(i)
+
+        # Grupo: "membros" lista só as cópias que de fato saem do roteador.
+        # Uma lista menor nunca aumenta o quadro, então a MTU continua valendo
+        if contar and admitidos and len(admitidos) < len(destinos):
+            pacote_dict["data"] = dict(segmento, membros=[destinos[i][0] for i in admitidos])
+            refeitos = codec.codificar_para_varios(no_arp.meu_mac,
+                                                   [dst_macs[i] for i in admitidos], pacote_dict)
+            if com_fec or fec.FEC_ATIVO:
+                refeitos = [fec.proteger(q) for q in refeitos]
+            for i, quadro_bytes in zip(admitidos, refeitos):
+                quadros[i] = quadro_bytes
+            log("REDE", f"Grupo {dst_vip}: {len(admitidos)} de {len(destinos)} cópia(s) "
+                        f"saem", AMARELO)
+
+        # ── L1: Encaminha pelo canal ruidoso (via fila de saída do enlace) ──
+        for i in admitidos:
+            endereco = destinos[i][1]
+            log("REDE", f"Encaminhando para {endereco[0]}:{endereco[1]}...", AZUL)
+            if filas_saida is not None:
+                filas_saida.depositar(endereco, quadros[i], classe)
+            else:
+                t = perfil.agora() if perfil.ATIVO else 0
+                transmitir(sock, quadros[i], endereco)
+                if perfil.ATIVO:
+                    perfil.registrar("canal.enviar", t)
+        if perfil.ATIVO:
+            perfil.registrar("roteador.total", t_quadro)
+        if not admitidos:
+            if captura is not None:
+                captura.registrar(dados_brutos, veredito_descarte)
+            print()
+            continue
+        if captura is not None:
+            captura.registrar(dados_brutos, VEREDITO_ENCAMINHADO)
 
         log("REDE", "Quadro encaminhado.\n", VERDE)
 
@@ -193,6 +649,70 @@ if __name__ == "__main__":
     print("  Mini-NET — Roteador (Fase 4: Enlace + Rede)")
     print("=" * 55)
 
-    minha_porta = int(input("Porta do roteador: "))
-    configurar_tabela()
-    run_router(minha_porta)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Roteador Mini-NET")
+    parser.add_argument("--porta", type=int, help="porta UDP do roteador")
+    parser.add_argument("--rotas", help="arquivo de rotas (VIP IP PORTA por linha)")
+    parser.add_argument("--vigiar", action="store_true",
+                        help="recarrega o arquivo de rotas quando ele mudar")
+    parser.add_argument("--controle", type=int, metavar="PORTA",
+                        help="porta UDP de controle em 127.0.0.1")
+    parser.add_argument("--captura", metavar="ARQUIVO",
+                        help="grava os quadros recebidos e vereditos em pcap")
+    parser.add_argument("--fila", type=int, default=CAPACIDADE_PADRAO, metavar="N",
+                        help=f"capacidade da fila de saída por enlace (padrão {CAPACIDADE_PADRAO}; "
+                             "0 = envio síncrono)")
+    parser.add_argument("--aqm", choices=POLITICAS, default="cauda",
+                        help="política de descarte das filas (padrão cauda)")
+    parser.add_argument("--escalonador", choices=ESCALONADORES, default="estrito",
+                        help="prioridade dos ACKs nas filas (padrão estrito)")
+    parser.add_argument("--peso", type=int, default=PESO_PADRAO,
+                        help=f"ponderado: ACKs por quadro de dados (padrão {PESO_PADRAO})")
+    parser.add_argument("--limite", type=float, metavar="TAXA",
+                        help="quadros/s por VIP de origem (padrão: sem limite)")
+    parser.add_argument("--rajada", type=float, metavar="N",
+                        help="fichas acumuláveis por VIP (padrão: igual à taxa)")
+    parser.add_argument("--acao-limite", choices=ACOES, default="descartar",
+                        help="o que fazer acima do limite (padrão descartar)")
+    parser.add_argument("--fec", action="store_true",
+                        help="protege com FEC todos os quadros emitidos (ou $MININET_FEC=1)")
+    parser.add_argument("--memoria", action="store_true",
+                        help="enlace por memória compartilhada, não UDP (ou $MININET_ENLACE=memoria)")
+    parser.add_argument("--sem-ruido", action="store_true",
+                        help="envia sem perda/corrupção/latência simuladas (ou $MININET_RUIDO=0)")
+    parser.add_argument("--sem-icmp", action="store_true",
+                        help="não avisa o emissor de descartes por TTL, rota ou MTU")
+    parser.add_argument("--mtu", type=int, default=MTU_PADRAO, metavar="BYTES",
+                        help=f"MTU dos enlaces de saída (padrão {MTU_PADRAO})")
+    args = parser.parse_args()
+    if args.mtu < MTU_MINIMA:
+        parser.error(f"--mtu mínima é {MTU_MINIMA}")
+
+    if args.fec:
+        fec.ativar()
+    if args.memoria:
+        fisica.ativar_memoria()
+    if args.sem_ruido:
+        fisica.desligar_ruido()
+
+    minha_porta = args.porta or int(input("Porta do roteador: "))
+
+    if args.rotas:
+        try:
+            recarregar(args.rotas)
+        except (OSError, ValueError) as e:
+            print(f"{VERMELHO}Erro ao ler {args.rotas}: {e}{RESET}")
+            sys.exit(1)
+        exibir_tabela()
+        if args.vigiar:
+            threading.Thread(target=vigiar_arquivo, args=(args.rotas,), daemon=True).start()
+    else:
+        configurar_tabela()
+
+    if args.controle:
+        threading.Thread(target=servir_controle, args=(args.controle, args.rotas),
+                         daemon=True).start()
+
+    captura = Captura(args.captura).iniciar() if args.captura else None
+    limite = LimitadorTaxa(args.limite, args.rajada, args.acao_limite) if args.limite else None
+    run_router(minha_porta, captura, fisica.RUIDO_ATIVO, args.fila, args.aqm, args.escalonador, args.peso,
+               limite, not args.sem_icmp, args.mtu)
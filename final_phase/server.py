@@ -2,27 +2,56 @@
 server.py - Servidor da Fase 4: Camada de Enlace
 
 Implementa a pilha completa (L7 -> L2) e recebe mensagens.
+
+Quatro threads ligadas por filas limitadas:
+  recepção    lê o socket, verifica CRC/TTL, decide ACK e duplicatas
+  ACK         envia os ACKs e as respostas de histórico pelo canal ruidoso
+              (que dorme 0,1–0,5 s por quadro)
+  aplicação   entrega as mensagens à L7 (log, arquivos)
+  histórico   seleciona e monta as partes dos pedidos de histórico
+A recepção nunca dorme no canal nem espera a aplicação: com a fila da
+aplicação cheia o segmento é descartado sem ACK (o cliente retransmite), e
+com a fila de ACKs cheia o ACK é descartado (idem). Um pedido de histórico
+só é repassado à sua thread; com a fila dela cheia é descartado, e o
+cliente pede de novo.
 """
 
-import socket
+import sys
+import queue
+import threading
 import json
+import argparse
+from collections import OrderedDict
 from datetime import datetime
-from protocol import Segmento, Pacote, Quadro, enviar_pela_rede_ruidosa
+from protocol import Segmento, Pacote
+from molde import obter_molde
+from codificacao import (decodificar_quadro, codec_envio, definir_codec_envio,
+                         codecs_disponiveis, CODEC_JSON)
+import perfil
+import fec
+import fisica
+from fisica import abrir_socket, transmitir
+from arp import NoARP, mac_local, MAC_BROADCAST, VIP_ROTEADOR
+from transferencia import ReceptorArquivos
+from paridade import SegmentoGrupo, ReceptorGrupos, eh_segmento_de_grupo
+from portas import SegmentoPortas, portas_do_segmento
+from icmp import ErroICMP, eh_icmp
+from historico import (LogMensagens, RespostasHistorico, SegmentoHistorico,
+                       eh_segmento_de_historico)
+from captura import (Captura, VEREDITO_CRC_FALHA, VEREDITO_TTL, VEREDITO_SEM_ROTA,
+                     VEREDITO_ENTREGUE, VEREDITO_ARP, VEREDITO_MALFORMADO)
 
 # ──────────────────────────────────────────────
 # CONFIGURAÇÕES
 # ──────────────────────────────────────────────
-TIMEOUT_SEGUNDOS = 3.0
-BUFFER_SIZE      = 65535
-TTL_INICIAL      = 8
-
-# Tabela de MACs fictícios (ARP simulado — estático)
-TABELA_MAC = {
-    "HOST_A"  : "AA:AA:AA:AA:AA:01",
-    "HOST_B"  : "BB:BB:BB:BB:BB:02",
-    "SERVIDOR": "CC:CC:CC:CC:CC:03",
-    "ROTEADOR": "DD:DD:DD:DD:DD:04",
-}
+TIMEOUT_SEGUNDOS   = 3.0
+BUFFER_SIZE        = 65535
+TTL_INICIAL        = 8
+CACHE_ACK_MAX      = 1024   # quadros de ACK serializados mantidos em memória
+FILA_ACK_MAX       = 256    # ACKs aguardando o canal
+FILA_APLICACAO_MAX = 1024   # mensagens aguardando a aplicação
+TRANSMISSORES_ACK  = 4      # threads de envio de ACK (o canal dorme por quadro)
+FILA_HISTORICO_MAX = 64     # pedidos de histórico aguardando resposta
 
 # ──────────────────────────────────────────────
 # CORES ANSI
@@ -43,89 +72,321 @@ def log(camada: str, msg: str, cor: str = ""):
 # ══════════════════════════════════════════════════════════════════
 # HELPERS DE EMPACOTAMENTO / DESEMPACOTAMENTO
 # ══════════════════════════════════════════════════════════════════
-def construir_quadro(segmento: Segmento, src_vip: str, dst_vip: str) -> bytes:
+def construir_quadro(segmento: Segmento, src_vip: str, dst_vip: str,
+                     dst_mac: str = MAC_BROADCAST) -> bytes:
     """
     Empilha todas as camadas e serializa com CRC:
-      Segmento → Pacote → Quadro.serializar()
-    O MAC de destino sempre aponta para o Roteador (próximo salto).
+      Segmento → Pacote → Quadro
+    O MAC de destino é o do Roteador (próximo salto), resolvido via ARP.
+
+    Com o codec json, os cabeçalhos de Pacote e Quadro vêm de um molde
+    pré-montado por par (ver molde.py): só o segmento é codificado a cada
+    mensagem e o CRC32 continua do estado já calculado para o prefixo fixo.
+    Outros codecs (ver codificacao.py) codificam o quadro inteiro.
+    Com o modo FEC ligado, o resultado é protegido por fec.py.
     """
-    # Camada 4 → 3: envolve Segmento em Pacote
-    pacote = Pacote(
-        src_vip       = src_vip,
-        dst_vip       = dst_vip,
-        ttl           = TTL_INICIAL,
-        segmento_dict = segmento.to_dict()
-    )
+    t = perfil.agora() if perfil.ATIVO else 0
+
+    codec = codec_envio()
+    if codec is not CODEC_JSON:
+        pacote = Pacote(src_vip=src_vip, dst_vip=dst_vip, ttl=TTL_INICIAL,
+                        segmento_dict=segmento.to_dict())
+        quadro_bytes = codec.codificar(mac_local(src_vip), dst_mac, pacote.to_dict())
+        if perfil.ATIVO:
+            perfil.registrar(f"construir.{codec.nome}", t)
+        return fec.enquadrar(quadro_bytes)
+
+    # Camadas 3 e 2: cabeçalhos fixos para (MACs, VIPs, TTL)
+    molde = obter_molde(mac_local(src_vip), dst_mac, src_vip, dst_vip, TTL_INICIAL)
 
-    # Camada 3 → 2: envolve Pacote em Quadro com MACs
-    src_mac = TABELA_MAC.get(src_vip, "00:00:00:00:00:00")
-    dst_mac = TABELA_MAC.get("ROTEADOR")   # próximo salto é sempre o roteador
+    if perfil.ATIVO:
+        perfil.registrar("construir.molde", t)
+        t = perfil.agora()
 
-    quadro = Quadro(src_mac=src_mac, dst_mac=dst_mac, pacote_dict=pacote.to_dict())
+    # Camada 4: encaixa o segmento e calcula o FCS
+    quadro_bytes = molde.montar(segmento.to_dict())
 
-    # serializar() calcula e embute o CRC32 automaticamente
-    return quadro.serializar()
+    if perfil.ATIVO:
+        perfil.registrar("construir.serializar", t)
+    return fec.enquadrar(quadro_bytes)
 
 
-def receber_quadro(dados_brutos: bytes, meu_vip: str):
+def receber_quadro(dados_brutos: bytes, meu_vip: str,
+                   no_arp: NoARP = None, endereco_origem=None, captura: Captura = None):
     """
     Desserializa bytes e verifica CRC (Camada de Enlace).
+    Quadros ARP são consumidos aqui pelo `no_arp` e não sobem de camada.
+    Com `captura`, os quadros descartados aqui são registrados com o veredito.
     Retorna (pacote_dict, segmento_dict) ou (None, None) se inválido.
     """
-    quadro_dict, integro = Quadro.deserializar(dados_brutos)
+    if perfil.ATIVO:
+        quadro_dict, integro = perfil.decodificar_medido(dados_brutos)
+    else:
+        quadro_dict, integro = decodificar_quadro(dados_brutos)
 
     if quadro_dict is None:
         log("ENLACE", "Quadro destruído (JSON inválido) → descartado", VERMELHO)
+        if captura is not None:
+            captura.registrar(dados_brutos, VEREDITO_CRC_FALHA)
         return None, None
 
     if not integro:
         log("ENLACE",
             f"Erro de CRC detectado! Quadro corrompido → descartado silenciosamente",
             VERMELHO)
+        if captura is not None:
+            captura.registrar(dados_brutos, VEREDITO_CRC_FALHA)
         return None, None
 
     log("ENLACE",
         f"CRC OK ✓ | {quadro_dict['src_mac']} → {quadro_dict['dst_mac']}",
         AZUL)
 
+    if no_arp is not None and no_arp.processar(quadro_dict, endereco_origem):
+        if captura is not None:
+            captura.registrar(dados_brutos, VEREDITO_ARP)
+        return None, None
+
     try:
         pacote_dict   = quadro_dict["data"]
         segmento_dict = pacote_dict["data"]
         return pacote_dict, segmento_dict
     except KeyError:
         log("ENLACE", "Estrutura do quadro inválida → descartado", VERMELHO)
+        if captura is not None:
+            captura.registrar(dados_brutos, VEREDITO_MALFORMADO)
         return None, None
 
 
+class CacheACK:
+    """
+    Cache LRU limitado de quadros de ACK já serializados.
+
+    Para um mesmo (origem, destino, SEQ, portas, MAC do próximo salto) os
+    bytes do ACK são sempre idênticos, então re-ACKs de retransmissões custam uma
+    consulta ao dicionário em vez de Segmento → Pacote → Quadro + CRC.
+    """
+
+    def __init__(self, capacidade: int = CACHE_ACK_MAX):
+        self.capacidade = capacidade
+        self._quadros: OrderedDict[tuple, bytes] = OrderedDict()
+
+    def obter(self, src_vip: str, dst_vip: str, seq_num: int, dst_mac: str,
+              portas: tuple[int, int] = (0, 0), membros: tuple = None) -> bytes:
+        chave = (src_vip, dst_vip, seq_num, dst_mac, portas, membros)
+        quadro_bytes = self._quadros.get(chave)
+        if quadro_bytes is not None:
+            self._quadros.move_to_end(chave)
+            return quadro_bytes
+
+        ack_seg      = SegmentoPortas(seq_num, True, None, *portas, membros=membros)
+        quadro_bytes = construir_quadro(ack_seg, src_vip=src_vip, dst_vip=dst_vip,
+                                        dst_mac=dst_mac)
+        self._quadros[chave] = quadro_bytes
+        if len(self._quadros) > self.capacidade:
+            self._quadros.popitem(last=False)
+        return quadro_bytes
+
+
+class ACKsRetidos:
+    """
+    ACKs que só saem depois que a aplicação tornou a mensagem durável
+    (servidor com --historico). O ACK de uma mensagem nova é retido aqui
+    e liberado pelo `ao_gravar` do histórico, depois do fsync; até lá as
+    retransmissões dela ficam sem resposta, para o cliente nunca ver ACK
+    de algo que uma queda ainda pode apagar. Um retido por fluxo basta:
+    o Stop-and-Wait (ou o grupo de paridade) só avança com o ACK.
+    """
+
+    def __init__(self, fila_ack: queue.Queue, endereco_roteador):
+        self._fila_ack  = fila_ack
+        self._endereco  = endereco_roteador
+        self._retidos: dict[tuple, object] = {}
+        self._lock      = threading.Lock()
+
+    def reter(self, fluxo: tuple, chave, ack_bytes: bytes):
+        """Retém o ACK de (`fluxo`, `chave`) e devolve a função que o libera."""
+        with self._lock:
+            self._retidos[fluxo] = chave
+
+        def liberar():
+            with self._lock:
+                if self._retidos.get(fluxo) == chave:
+                    del self._retidos[fluxo]
+            if not _enfileirar(self._fila_ack, ack_bytes, self._endereco):
+                log("TRANSPORTE", "Fila de ACKs cheia → ACK descartado", AMARELO)
+        return liberar
+
+    def esquecer(self, fluxo: tuple, chave):
+        with self._lock:
+            if self._retidos.get(fluxo) == chave:
+                del self._retidos[fluxo]
+
+    def retido(self, fluxo: tuple, chave) -> bool:
+        with self._lock:
+            return self._retidos.get(fluxo) == chave
+
+
+# ══════════════════════════════════════════════════════════════════
+# APLICAÇÃO
+# ══════════════════════════════════════════════════════════════════
+def entregar_aplicacao(payload: dict, src_vip: str, receptor_arquivos: ReceptorArquivos,
+                       historico: LogMensagens = None, confirmar=None):
+    """
+    L7: segmentos ARQUIVO_* vão para o receptor de arquivos; o resto é chat.
+    Com `historico`, cada mensagem de chat é anexada ao log persistente.
+    `confirmar()` (o ACK retido, ver ACKsRetidos) roda quando a mensagem
+    está entregue: depois do fsync para chat com histórico, na hora no resto.
+    """
+    if receptor_arquivos.processar(payload, src_vip):
+        if confirmar is not None:
+            confirmar()
+        return
+    remetente = payload.get("sender", src_vip)
+    mensagem  = payload.get("message", "")
+    ts        = payload.get("timestamp", "")[:19]
+
+    log("APLICAÇÃO", f"[{ts}] {remetente}: {mensagem}", VERDE)
+    if historico is not None:
+        historico.anexar({"remetente": remetente, "src_vip": src_vip,
+                          "mensagem": mensagem, "timestamp": payload.get("timestamp", "")},
+                         confirmar)
+    elif confirmar is not None:
+        confirmar()
+
+
+def _aplicacao(fila_app: queue.Queue, receptor_arquivos: ReceptorArquivos,
+               historico: LogMensagens = None):
+    """Thread: entrega à L7 as mensagens aceitas pela recepção, em ordem."""
+    while True:
+        t_entrada, payload, src_vip, confirmar = fila_app.get()
+        if perfil.ATIVO and t_entrada:
+            perfil.registrar("servidor.fila.aplicacao", t_entrada)
+        try:
+            entregar_aplicacao(payload, src_vip, receptor_arquivos, historico, confirmar)
+        except Exception as e:
+            log("APLICAÇÃO", f"Erro ao entregar mensagem de {src_vip}: {e}", VERMELHO)
+            if confirmar is not None:
+                confirmar()     # não há o que esperar: não trava o fluxo do cliente
+
+
+def _historico(fila_hist: queue.Queue, fila_ack: queue.Queue,
+               respostas_hist: RespostasHistorico, meu_vip: str, endereco_roteador):
+    """Thread: responde os pedidos de histórico, pondo as partes na fila de ACKs."""
+    while True:
+        t_entrada, fluxo, seg_dict, src_vip, portas_ack, mac_roteador, rotulo = fila_hist.get()
+        if perfil.ATIVO and t_entrada:
+            perfil.registrar("servidor.fila.historico", t_entrada)
+        try:
+            total, partes = respostas_hist.responder(fluxo, seg_dict)
+        except (KeyError, TypeError, ValueError, IndexError) as e:
+            log("APLICAÇÃO", f"Pedido de histórico malformado ({e}) → descartado", VERMELHO)
+            continue
+        log("APLICAÇÃO", f"Histórico {seg_dict['historico']} para {rotulo}: "
+                         f"{len(partes)} quadro(s) de {total} parte(s)", CIANO)
+        for indice, mensagens in partes:
+            resposta = SegmentoHistorico(seg_dict["historico"], indice,
+                                         {"mensagens": mensagens}, total, *portas_ack)
+            if not _enfileirar(fila_ack, construir_quadro(resposta, src_vip=meu_vip,
+                                                          dst_vip=src_vip,
+                                                          dst_mac=mac_roteador),
+                               endereco_roteador):
+                log("APLICAÇÃO", "Fila de saída cheia → partes restantes descartadas",
+                    AMARELO)
+                break
+
+
+def _transmissor(sock, fila_ack: queue.Queue):
+    """Thread: envia os ACKs enfileirados pelo canal ruidoso."""
+    while True:
+        t_entrada, ack_bytes, endereco = fila_ack.get()
+        if perfil.ATIVO and t_entrada:
+            perfil.registrar("servidor.fila.ack", t_entrada)
+        t = perfil.agora() if perfil.ATIVO else 0
+        transmitir(sock, ack_bytes, endereco)
+        if perfil.ATIVO:
+            perfil.registrar("canal.enviar", t)
+
+
+def _enfileirar(fila: queue.Queue, *item) -> bool:
+    """put sem bloquear, com o instante de entrada para o perfil."""
+    try:
+        fila.put_nowait((perfil.agora() if perfil.ATIVO else 0, *item))
+        return True
+    except queue.Full:
+        return False
+
+
 # ══════════════════════════════════════════════════════════════════
 # SERVIDOR
 # ══════════════════════════════════════════════════════════════════
-def run_server(minha_porta: int, meu_vip: str, ip_roteador: str, porta_roteador: int):
+def run_server(minha_porta: int, meu_vip: str, ip_roteador: str, porta_roteador: int,
+               diretorio_arquivos: str = "recebidos", captura: Captura = None,
+               grupos=(), historico: LogMensagens = None):
     """
     Servidor com pilha completa (L2 → L7).
     Verifica CRC antes de qualquer processamento.
+    O estado de transporte é por fluxo (VIP de origem, src_port, dst_port),
+    então vários fluxos de um mesmo host avançam de forma independente.
+    Arquivos recebidos (aplicação ARQUIVO_*) são gravados em `diretorio_arquivos`.
+    Com `captura`, cada quadro recebido é registrado com o veredito.
+    `grupos` são VIPs de grupo (multicast) dos quais este servidor é membro:
+    pacotes para eles também são aceitos, e o ACK sai do VIP do servidor.
+    Com `historico`, as mensagens de chat entregues vão para o log persistente
+    e os pedidos de histórico (ver historico.py) são respondidos a partir dele.
+    Nesse caso o ACK de uma mensagem nova fica retido (ACKsRetidos) até o lote
+    dela passar pelo fsync; duplicatas que chegam antes disso não são
+    confirmadas, e o cliente retransmite.
+    Este laço é a thread de recepção; ACKs, aplicação e respostas de
+    histórico têm threads próprias.
     """
-    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    meus_vips = {meu_vip, *grupos}
+    sock = abrir_socket()
     sock.bind(("127.0.0.1", minha_porta))
 
-    log("SERVIDOR", f"VIP={meu_vip} | MAC={TABELA_MAC.get(meu_vip)} | Porta={minha_porta}", VERDE)
+    seq_esperado: dict[tuple[str, int, int], int] = {}
+    ultima_sinc:  dict[tuple[str, int, int], int] = {}
+    endereco_roteador = (ip_roteador, porta_roteador)
+    receptor_arquivos = ReceptorArquivos(diretorio_arquivos)
+    receptor_grupos   = ReceptorGrupos()
+    cache_ack         = CacheACK()
+    respostas_hist    = RespostasHistorico(historico)
+
+    fila_ack: queue.Queue = queue.Queue(FILA_ACK_MAX)
+    fila_app: queue.Queue = queue.Queue(FILA_APLICACAO_MAX)
+    fila_hist: queue.Queue = queue.Queue(FILA_HISTORICO_MAX)
+    acks_retidos = ACKsRetidos(fila_ack, endereco_roteador) if historico is not None else None
+    for _ in range(TRANSMISSORES_ACK):
+        threading.Thread(target=_transmissor, args=(sock, fila_ack), daemon=True).start()
+    threading.Thread(target=_aplicacao, args=(fila_app, receptor_arquivos, historico),
+                     daemon=True).start()
+    threading.Thread(target=_historico, args=(fila_hist, fila_ack, respostas_hist, meu_vip,
+                                              endereco_roteador),
+                     daemon=True).start()
+
+    # ── L2: ARP — anuncia-se ao roteador e descobre o MAC dele ──
+    no_arp = NoARP(sock, meu_vip)
+    no_arp.anunciar(endereco_roteador)
+    no_arp.descobrir(VIP_ROTEADOR, endereco_roteador)
+
+    log("SERVIDOR", f"VIP={meu_vip} | MAC={no_arp.meu_mac} | Porta={minha_porta}", VERDE)
     log("SERVIDOR", f"Roteador em {ip_roteador}:{porta_roteador}", VERDE)
+    if grupos:
+        log("SERVIDOR", f"Membro dos grupos: {', '.join(grupos)}", VERDE)
     log("SERVIDOR", "Aguardando mensagens...\n", VERDE)
 
-    seq_esperado: dict[str, int] = {}
-    endereco_roteador = (ip_roteador, porta_roteador)
-
     while True:
         try:
-            dados_brutos, _ = sock.recvfrom(BUFFER_SIZE)
+            dados_brutos, endereco_origem = sock.recvfrom(BUFFER_SIZE)
         except Exception as e:
             log("SERVIDOR", f"Erro ao receber: {e}", VERMELHO)
             continue
 
         # ── L2: Enlace — verifica CRC ──
-        pacote_dict, seg_dict = receber_quadro(dados_brutos, meu_vip)
+        pacote_dict, seg_dict = receber_quadro(dados_brutos, meu_vip,
+                                               no_arp, endereco_origem, captura)
         if pacote_dict is None:
-            # CRC falhou → descarta. O timeout do cliente retransmitirá.
+            # CRC falhou (ou era ARP) → descarta. O timeout do cliente retransmitirá.
             print()
             continue
 
@@ -138,70 +399,223 @@ def run_server(minha_porta: int, meu_vip: str, ip_roteador: str, porta_roteador:
 
         if ttl <= 0:
             log("REDE", "TTL expirado → descartado", VERMELHO)
+            if captura is not None:
+                captura.registrar(dados_brutos, VEREDITO_TTL)
             continue
 
-        if dst_vip != meu_vip:
+        if dst_vip not in meus_vips:
             log("REDE", f"Pacote não é para mim ({dst_vip} ≠ {meu_vip}) → ignorado", AMARELO)
+            if captura is not None:
+                captura.registrar(dados_brutos, VEREDITO_SEM_ROTA)
+            continue
+
+        if eh_icmp(seg_dict):
+            # Um ACK nosso não teve como chegar; o emissor retransmitirá
+            log("REDE", f"Roteador: {ErroICMP(seg_dict['icmp'])}", AMARELO)
             continue
 
-        # ── L4: Transporte — extrai Segmento ──
+        # ── L4: Transporte — extrai Segmento e identifica o fluxo ──
         try:
             seg = Segmento(
                 seq_num = seg_dict["seq_num"],
                 is_ack  = seg_dict["is_ack"],
                 payload = seg_dict["payload"]
             )
+            src_port, dst_port = portas_do_segmento(seg_dict)
         except (KeyError, TypeError):
             log("TRANSPORTE", "Segmento malformado → descartado", VERMELHO)
+            if captura is not None:
+                captura.registrar(dados_brutos, VEREDITO_MALFORMADO)
             continue
 
+        if captura is not None:
+            captura.registrar(dados_brutos, VEREDITO_ENTREGUE)
+
         if seg.is_ack:
             continue
 
-        log("TRANSPORTE",
-            f"Segmento | SEQ={seg.seq_num} | Esperado={seq_esperado.get(src_vip, 0)}",
-            CIANO)
+        fluxo      = (src_vip, src_port, dst_port)
+        portas_ack = (dst_port, src_port)
+        # Mensagem para um VIP de grupo: o ACK ecoa os membros que a receberam
+        membros    = seg_dict.get("membros") if dst_vip != meu_vip else None
+        if isinstance(membros, list) and all(isinstance(vip, str) for vip in membros):
+            membros = tuple(membros)
+        else:
+            membros = None
+        rotulo     = f"{src_vip}:{src_port}→{dst_port}" if src_port or dst_port else src_vip
+
+        # ── L7: Pedido de histórico — a thread de histórico monta as partes ──
+        if eh_segmento_de_historico(seg_dict):
+            if not _enfileirar(fila_hist, fluxo, seg_dict, src_vip, portas_ack,
+                               no_arp.resolver(VIP_ROTEADOR, endereco_roteador), rotulo):
+                log("APLICAÇÃO", f"Fila de histórico cheia → pedido de {rotulo} descartado",
+                    AMARELO)
+            print()
+            continue
 
-        # ── L4: Envia ACK de volta (encapsulado em Quadro) ──
-        ack_seg   = Segmento(seq_num=seg.seq_num, is_ack=True, payload=None)
-        ack_bytes = construir_quadro(ack_seg, src_vip=meu_vip, dst_vip=src_vip)
+        # ── L4: Modo paridade — grupos de K segmentos + 1 de paridade ──
+        if eh_segmento_de_grupo(seg_dict):
+            k = seg_dict.get("k")
+            if isinstance(k, int) and FILA_APLICACAO_MAX - fila_app.qsize() < k:
+                log("TRANSPORTE", f"Aplicação sobrecarregada → grupo de {rotulo} descartado",
+                    AMARELO)
+                continue
+            try:
+                entregar = receptor_grupos.receber(fluxo, seg_dict)
+            except (KeyError, TypeError, ValueError) as e:
+                log("TRANSPORTE", f"Segmento de grupo malformado ({e}) → descartado", VERMELHO)
+                continue
+
+            if entregar is not None:
+                grupo   = seg_dict["grupo"]
+                chave   = ("grupo", grupo)
+                if not entregar and acks_retidos is not None and acks_retidos.retido(fluxo, chave):
+                    log("TRANSPORTE", f"Grupo {grupo} de {rotulo} ainda não gravado → "
+                                      f"ACK retido", AMARELO)
+                    print()
+                    continue
+                ack_seg = SegmentoGrupo(grupo, seg_dict["k"], seg_dict["k"], True, None,
+                                        *portas_ack)
+                ack_seg.membros = membros
+                ack_bytes = construir_quadro(ack_seg, src_vip=meu_vip, dst_vip=src_vip,
+                                             dst_mac=no_arp.resolver(VIP_ROTEADOR,
+                                                                     endereco_roteador))
+                # Com histórico, o ACK vai junto com o último payload e sai depois do fsync
+                confirmar = (acks_retidos.reter(fluxo, chave, ack_bytes)
+                             if entregar and acks_retidos is not None else None)
+                log("TRANSPORTE", f"Grupo {grupo} completo → ACK para {rotulo}"
+                                  + (" após gravar" if confirmar else ""), CIANO)
+                # Só a recepção enfileira, então as k vagas conferidas acima continuam livres
+                for i, payload in enumerate(entregar):
+                    _enfileirar(fila_app, payload, src_vip,
+                                confirmar if i == len(entregar) - 1 else None)
+                if confirmar is None and not _enfileirar(fila_ack, ack_bytes, endereco_roteador):
+                    log("TRANSPORTE", "Fila de ACKs cheia → ACK descartado", AMARELO)
+            print()
+            continue
 
-        log("TRANSPORTE", f"Enviando ACK {seg.seq_num} → Roteador → {src_vip}", CIANO)
-        enviar_pela_rede_ruidosa(sock, ack_bytes, endereco_roteador)
+        esperado = seq_esperado.get(fluxo, 0)
+        sinc     = seg_dict.get("sinc")
+        if isinstance(sinc, int) and sinc != ultima_sinc.get(fluxo) and seg.seq_num in (0, 1):
+            # Emissor novo ou que desistiu de uma mensagem: adota o SEQ dele
+            log("TRANSPORTE", f"Ressincronização de {rotulo} (época {sinc}) → "
+                              f"Esperado={seg.seq_num}", AMARELO)
+            esperado = seg.seq_num
+        log("TRANSPORTE",
+            f"Segmento {rotulo} | SEQ={seg.seq_num} | Esperado={esperado}",
+            CIANO)
 
-        # ── L7: Aplicação — exibe mensagem (se não for duplicata) ──
-        esperado = seq_esperado.get(src_vip, 0)
+        t = perfil.agora() if perfil.ATIVO else 0
+        ack_bytes = cache_ack.obter(meu_vip, src_vip, seg.seq_num,
+                                    no_arp.resolver(VIP_ROTEADOR, endereco_roteador),
+                                    portas_ack, membros)
+        if perfil.ATIVO:
+            perfil.registrar("servidor.ack", t)
 
+        # ── L7: Aplicação — entrega a mensagem (se não for duplicata) ──
+        # Antes do ACK: sem vaga na fila da aplicação o segmento é recusado
+        # sem ACK, e o cliente retransmite quando a aplicação tiver folga
         if seg.seq_num == esperado:
-            payload   = seg.payload
-            remetente = payload.get("sender", src_vip)
-            mensagem  = payload.get("message", "")
-            ts        = payload.get("timestamp", "")[:19]
-
-            log("APLICAÇÃO", f"[{ts}] {remetente}: {mensagem}", VERDE)
-            seq_esperado[src_vip] = 1 - esperado
+            confirmar = (acks_retidos.reter(fluxo, seg.seq_num, ack_bytes)
+                         if acks_retidos is not None else None)
+            if not _enfileirar(fila_app, seg.payload, src_vip, confirmar):
+                if confirmar is not None:
+                    acks_retidos.esquecer(fluxo, seg.seq_num)
+                log("TRANSPORTE", f"Aplicação sobrecarregada → SEQ={seg.seq_num} de {rotulo} "
+                                  f"descartado sem ACK", AMARELO)
+                print()
+                continue
+            seq_esperado[fluxo] = 1 - esperado
+            if isinstance(sinc, int):
+                ultima_sinc[fluxo] = sinc
+            if confirmar is not None:
+                # ── L4: o ACK sai quando a aplicação gravar a mensagem ──
+                log("TRANSPORTE", f"ACK {seg.seq_num} para {rotulo} após gravar no histórico",
+                    CIANO)
+                print()
+                continue
         else:
             log("TRANSPORTE",
-                f"Duplicata de {src_vip} (SEQ={seg.seq_num}) → descartada",
+                f"Duplicata de {rotulo} (SEQ={seg.seq_num}) → descartada",
                 AMARELO)
+            if acks_retidos is not None and acks_retidos.retido(fluxo, seg.seq_num):
+                log("TRANSPORTE", "Mensagem ainda não gravada → ACK retido", AMARELO)
+                print()
+                continue
+
+        # ── L4: Envia ACK de volta (encapsulado em Quadro) ──
+        log("TRANSPORTE", f"Enviando ACK {seg.seq_num} → Roteador → {rotulo}", CIANO)
+        if not _enfileirar(fila_ack, ack_bytes, endereco_roteador):
+            log("TRANSPORTE", "Fila de ACKs cheia → ACK descartado", AMARELO)
 
         print()
 
 
+def separar_endereco(texto: str) -> tuple[str, int]:
+    """Converte 'IP:PORTA' (ou só 'PORTA') em tupla."""
+    ip, _, porta = texto.rpartition(":")
+    return (ip or "127.0.0.1", int(porta))
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Servidor Mini-NET. Sem flags, pergunta tudo no terminal.")
+    parser.add_argument("--porta", type=int, help="minha porta UDP real")
+    parser.add_argument("--vip", help="meu VIP (padrão: SERVIDOR)")
+    parser.add_argument("--roteador", help="endereço do roteador, IP:PORTA")
+    parser.add_argument("--diretorio", default="recebidos",
+                        help="onde gravar arquivos recebidos (padrão: recebidos)")
+    parser.add_argument("--codec", metavar="NOME",
+                        help="codec de envio dos quadros (padrão: json ou $MININET_CODEC; "
+                             f"instalados: {', '.join(codecs_disponiveis())}; "
+                             "um indisponível cai para json com aviso)")
+    parser.add_argument("--fec", action="store_true",
+                        help="protege os quadros enviados com FEC (ou $MININET_FEC=1)")
+    parser.add_argument("--memoria", action="store_true",
+                        help="enlace por memória compartilhada, não UDP (ou $MININET_ENLACE=memoria)")
+    parser.add_argument("--sem-ruido", action="store_true",
+                        help="envia sem perda/corrupção/latência simuladas (ou $MININET_RUIDO=0)")
+    parser.add_argument("--captura", metavar="ARQUIVO",
+                        help="grava os quadros recebidos e vereditos em pcap")
+    parser.add_argument("--grupo", action="append", default=[], metavar="NOME",
+                        help="aceita também pacotes para o VIP de grupo NOME (repetível)")
+    parser.add_argument("--historico", metavar="DIRETORIO",
+                        help="grava as mensagens entregues num log persistente em DIRETORIO")
+    args = parser.parse_args()
+
+    if args.codec:
+        definir_codec_envio(args.codec)
+    if args.fec:
+        fec.ativar()
+    if args.memoria:
+        fisica.ativar_memoria()
+    if args.sem_ruido:
+        fisica.desligar_ruido()
+
     print("=" * 60)
     print("  Mini-NET — SERVIDOR")
     print("=" * 60)
 
+    historico = None
     try:
-        minha_porta = int(input("Minha porta real: "))
-        meu_vip     = input("Meu VIP [SERVIDOR]: ").strip() or "SERVIDOR"
-        
-        ip_roteador    = input("IP do roteador  [127.0.0.1]: ").strip() or "127.0.0.1"
-        porta_roteador = int(input("Porta do roteador: "))
-        
-        run_server(minha_porta, meu_vip, ip_roteador, porta_roteador)
+        minha_porta = args.porta or int(input("Minha porta real: "))
+        meu_vip     = args.vip or input("Meu VIP [SERVIDOR]: ").strip() or "SERVIDOR"
+
+        if args.roteador:
+            ip_roteador, porta_roteador = separar_endereco(args.roteador)
+        else:
+            ip_roteador    = input("IP do roteador  [127.0.0.1]: ").strip() or "127.0.0.1"
+            porta_roteador = int(input("Porta do roteador: "))
+
+        captura   = Captura(args.captura).iniciar() if args.captura else None
+        historico = LogMensagens(args.historico) if args.historico else None
+        run_server(minha_porta, meu_vip, ip_roteador, porta_roteador, args.diretorio, captura,
+                   args.grupo, historico)
     except KeyboardInterrupt:
         print("\nEncerrado.")
     except ValueError:
         print("\nValores inválidos.")
+        sys.exit(2)
+    finally:
+        if historico is not None:
+            historico.fechar()
@@ -0,0 +1,512 @@
+"""
+simulacao.py - Modelo de eventos discretos da Mini-NET com relógio virtual
+
+Em tempo real cada salto dorme 0,1–0,5 s no canal e cada perda custa um
+timeout de 3 s: juntar estatística de uma configuração leva minutos. Aqui
+cliente, roteador e servidor rodam sobre um relógio virtual e uma heap de
+eventos, sem sockets nem time.sleep: uma hora de tráfego simulado roda em
+segundos, e dá para varrer taxas de perda e tamanhos de janela.
+
+É um modelo, não a rede real rodando mais rápido: RoteadorSimulado,
+ServidorSimulado e ClienteSimulado reescrevem em forma de eventos só as
+decisões de encaminhamento e de transporte que a medição precisa, e não
+chamam router.py, server.py nem client.py. Uma mudança nesses arquivos
+não chega aqui sozinha; os números valem para o protocolo como modelado
+abaixo.
+
+O que é real e o que é modelado:
+  - os quadros são os mesmos bytes da rede real: Segmento/Pacote de
+    protocol.py, codec de codificacao.py (com CRC32) e FEC opcional de
+    fec.py; corrupção inverte um byte (XOR 0xFF) e o receptor decide pelo
+    CRC, como no canal de verdade;
+  - o canal segue enviar_pela_rede_ruidosa: o descarte é sorteado antes e
+    não gasta tempo; um quadro que segue ocupa a thread que o envia pela
+    latência sorteada e só então chega. Cada nó tem as threads de envio
+    que tem de verdade: 1 no cliente, TRANSMISSORES_ACK no servidor e uma
+    por enlace de saída no roteador (fila limitada, ACKs na frente);
+  - o transporte é o Stop-and-Wait do client.py generalizado para uma
+    janela de W mensagens com repetição seletiva (SEQ módulo 2W, timer de
+    TIMEOUT_SEGUNDOS por mensagem a partir do fim do envio, ACK por
+    mensagem). W = 1 é exatamente o bit alternante real, inclusive a
+    retransmissão imediata quando chega um ACK com CRC inválido. Os timers
+    de retransmissão ficam na roda de temporizadores (temporizador.py) no
+    relógio virtual; a heap guarda só as chegadas do canal.
+
+O que fica de fora do modelo:
+  - a janela com repetição seletiva (W > 1) não existe no client.py, que é
+    Stop-and-Wait por fluxo; W > 1 responde "e se houvesse janela";
+  - o cliente nunca desiste de uma mensagem (sem --max-tentativas nem a
+    ressincronização do SEQ que vem depois de uma desistência);
+  - ARP (os MACs são fixos, de mac_local), ICMP, PMTU e fragmentação;
+  - grupos (VIPs multicast, confirmações por membro) e o modo paridade;
+  - portas e fluxos multiplexados, transferência de arquivos e histórico;
+  - limitação de taxa, RED e o escalonador ponderado do roteador (as filas
+    são de descarte na cauda com prioridade estrita para ACKs);
+  - a thread de aplicação do servidor e a fila dela (a entrega é imediata).
+
+Uso:
+  python simulacao.py --duracao 3600
+  python simulacao.py --duracao 3600 --perda 0,0.1,0.2,0.3 --janela 1,2,4,8
+  python simulacao.py --duracao 600 --clientes 20 --janela 4 --fec
+"""
+
+import time
+import heapq
+import random
+import argparse
+import itertools
+from collections import deque
+from protocol import (Segmento, Pacote, PROBABILIDADE_PERDA, PROBABILIDADE_CORRUPCAO,
+                      LATENCIA_MIN, LATENCIA_MAX)
+from codificacao import codec_envio, codec_do_quadro, definir_codec_envio, codecs_disponiveis
+from arp import mac_local, VIP_ROTEADOR
+from filas import CAPACIDADE_PADRAO
+from temporizador import RodaTemporizadores, Temporizador
+import fec
+
+# ──────────────────────────────────────────────
+# CONFIGURAÇÕES
+# ──────────────────────────────────────────────
+TIMEOUT_SEGUNDOS  = 3.0     # como client.py
+TTL_INICIAL       = 8
+TRANSMISSORES_ACK = 4       # como server.py
+DURACAO_PADRAO    = 3600.0  # segundos simulados
+SEMENTE_PADRAO    = 1
+
+
+# ══════════════════════════════════════════════════════════════════
+# RELÓGIO VIRTUAL
+# ══════════════════════════════════════════════════════════════════
+class Simulador:
+    """
+    Relógio virtual, heap de eventos (instante, ordem, ação, args) e roda de
+    temporizadores canceláveis no mesmo relógio.
+    """
+
+    def __init__(self):
+        self.agora = 0.0
+        self._eventos = []
+        self._ordem = itertools.count()
+        self.temporizadores = RodaTemporizadores(relogio=lambda: self.agora)
+        self.processados = 0
+
+    def agendar(self, atraso: float, acao, *args) -> list:
+        """Agenda `acao(*args)` para daqui a `atraso` segundos; devolve o evento."""
+        evento = [self.agora + atraso, next(self._ordem), acao, args]
+        heapq.heappush(self._eventos, evento)
+        return evento
+
+    def armar(self, atraso: float, acao, *args) -> Temporizador:
+        """Temporizador cancelável: `acao(*args)` daqui a `atraso` segundos."""
+        return self.temporizadores.agendar(atraso, self._disparar, acao, args)
+
+    def _disparar(self, acao, args):
+        self.agora = self.temporizadores.instante
+        acao(*args)
+        self.processados += 1
+
+    def executar(self, ate: float):
+        """Processa eventos e temporizadores até o instante `ate`."""
+        eventos, roda = self._eventos, self.temporizadores
+        while True:
+            # Temporizadores que vencem antes do próximo evento vão primeiro
+            proximo = eventos[0][0] if eventos and eventos[0][0] < ate else ate
+            if roda.avancar(proximo):
+                continue
+            if not eventos or eventos[0][0] > ate:
+                break
+            instante, _, acao, args = heapq.heappop(eventos)
+            self.agora = instante
+            acao(*args)
+            self.processados += 1
+        self.agora = ate
+
+
+# ══════════════════════════════════════════════════════════════════
+# CANAL (camada física)
+# ══════════════════════════════════════════════════════════════════
+class Canal:
+    """Parâmetros e sorteios do canal ruidoso, com contadores."""
+
+    def __init__(self, perda: float = PROBABILIDADE_PERDA,
+                 corrupcao: float = PROBABILIDADE_CORRUPCAO,
+                 latencia_min: float = LATENCIA_MIN, latencia_max: float = LATENCIA_MAX,
+                 semente: int = SEMENTE_PADRAO):
+        self.perda        = perda
+        self.corrupcao    = corrupcao
+        self.latencia_min = latencia_min
+        self.latencia_max = latencia_max
+        self.rnd          = random.Random(semente)
+        self.enviados     = 0
+        self.perdidos     = 0
+        self.corrompidos  = 0
+
+    def sortear(self, quadro: bytes):
+        """(bytes que chegam, latência), ou None se o quadro se perde."""
+        self.enviados += 1
+        if self.rnd.random() < self.perda:
+            self.perdidos += 1
+            return None
+        if self.rnd.random() < self.corrupcao and quadro:
+            dados = bytearray(quadro)
+            pos = self.rnd.randrange(len(dados))
+            dados[pos] ^= 0xFF
+            quadro = bytes(dados)
+            self.corrompidos += 1
+        return quadro, self.rnd.uniform(self.latencia_min, self.latencia_max)
+
+
+class Transmissor:
+    """
+    Threads de envio de um nó (ou de um enlace do roteador) em tempo
+    virtual: cada quadro ocupa uma thread pela latência sorteada, como
+    enviar_pela_rede_ruidosa. `capacidade` limita a fila (0 = sem limite).
+    """
+
+    def __init__(self, sim: Simulador, canal: Canal, threads: int = 1, capacidade: int = 0):
+        self.sim        = sim
+        self.canal      = canal
+        self.threads    = threads
+        self.capacidade = capacidade
+        self._ocupadas  = 0
+        self._prioritaria = deque()
+        self._normal      = deque()
+        self.descartes_fila = 0
+
+    def enviar(self, quadro: bytes, entregar, ao_terminar=None, prioritario: bool = False) -> bool:
+        """Enfileira o quadro; `entregar(bytes)` roda na chegada, `ao_terminar()` no fim do envio."""
+        fila = self._prioritaria if prioritario else self._normal
+        if self.capacidade and len(fila) >= self.capacidade:
+            self.descartes_fila += 1
+            return False
+        fila.append((quadro, entregar, ao_terminar))
+        self._servir()
+        return True
+
+    def _servir(self):
+        while self._ocupadas < self.threads and (self._prioritaria or self._normal):
+            fila = self._prioritaria if self._prioritaria else self._normal
+            quadro, entregar, ao_terminar = fila.popleft()
+            sorteio = self.canal.sortear(quadro)
+            if sorteio is None:
+                # Perda: enviar_pela_rede_ruidosa retorna na hora
+                if ao_terminar is not None:
+                    ao_terminar()
+                continue
+            chegada, latencia = sorteio
+            self._ocupadas += 1
+            self.sim.agendar(latencia, self._concluir, chegada, entregar, ao_terminar)
+
+    def _concluir(self, quadro: bytes, entregar, ao_terminar):
+        self._ocupadas -= 1
+        entregar(quadro)
+        if ao_terminar is not None:
+            ao_terminar()
+        self._servir()
+
+
+# ══════════════════════════════════════════════════════════════════
+# NÓS
+# ══════════════════════════════════════════════════════════════════
+def montar_quadro(seq_num: int, is_ack: bool, payload, src_vip: str, dst_vip: str,
+                  dst_mac: str, com_fec: bool, ttl: int = TTL_INICIAL) -> bytes:
+    pacote = Pacote(src_vip, dst_vip, ttl, Segmento(seq_num, is_ack, payload).to_dict())
+    quadro = codec_envio().codificar(mac_local(src_vip), dst_mac, pacote.to_dict())
+    return fec.proteger(quadro) if com_fec else quadro
+
+
+def _decodificar(dados: bytes):
+    """decodificar_quadro sem o log de reparo do FEC, que inundaria a saída."""
+    if fec.eh_protegido(dados):
+        dados = fec.reparar(dados)[0]
+        if dados is None:
+            return None, False, None
+    quadro_dict, integro = codec_do_quadro(dados).decodificar(dados)
+    return quadro_dict, integro, dados
+
+
+def abrir_quadro(dados: bytes):
+    """(pacote_dict, segmento_dict) se o quadro passa no CRC, senão (None, None)."""
+    quadro_dict, integro, _ = _decodificar(dados)
+    if quadro_dict is None or not integro:
+        return None, None
+    try:
+        return quadro_dict["data"], quadro_dict["data"]["data"]
+    except (KeyError, TypeError):
+        return None, None
+
+
+class RoteadorSimulado:
+    """Encaminhamento do router.py: CRC, TTL, rota, novo quadro, fila por enlace."""
+
+    def __init__(self, sim: Simulador, canal: Canal, capacidade_fila: int = CAPACIDADE_PADRAO):
+        self.sim      = sim
+        self.canal    = canal
+        self.capacidade_fila = capacidade_fila
+        self.meu_mac  = mac_local(VIP_ROTEADOR)
+        self.rotas: dict[str, object] = {}
+        self._enlaces: dict[str, Transmissor] = {}
+        self.descartes_crc = 0
+        self.descartes_ttl = 0
+        self.sem_rota      = 0
+
+    def conectar(self, vip: str, no):
+        self.rotas[vip] = no
+        self._enlaces[vip] = Transmissor(self.sim, self.canal, 1, self.capacidade_fila)
+
+    def receber(self, dados: bytes):
+        quadro_dict, integro, aberto = _decodificar(dados)
+        if quadro_dict is None or not integro:
+            self.descartes_crc += 1
+            return
+        pacote = quadro_dict.get("data") or {}
+        ttl = pacote.get("ttl", 0) - 1
+        if ttl <= 0:
+            self.descartes_ttl += 1
+            return
+        dst_vip = pacote.get("dst_vip")
+        destino = self.rotas.get(dst_vip)
+        if destino is None:
+            self.sem_rota += 1
+            return
+        pacote = dict(pacote, ttl=ttl)
+        quadro = codec_do_quadro(aberto).codificar(self.meu_mac, mac_local(dst_vip), pacote)
+        if fec.eh_protegido(dados):
+            quadro = fec.proteger(quadro)
+        segmento = pacote.get("data")
+        prioritario = isinstance(segmento, dict) and bool(segmento.get("is_ack"))
+        self._enlaces[dst_vip].enviar(quadro, destino.receber, prioritario=prioritario)
+
+    @property
+    def descartes_fila(self) -> int:
+        return sum(t.descartes_fila for t in self._enlaces.values())
+
+
+class ServidorSimulado:
+    """Receptor do server.py: CRC, SEQ esperado por fluxo, ACK de tudo que chega."""
+
+    def __init__(self, sim: Simulador, canal: Canal, vip: str, roteador: RoteadorSimulado,
+                 janela: int = 1, com_fec: bool = False):
+        self.sim      = sim
+        self.vip      = vip
+        self.roteador = roteador
+        self.janela   = janela
+        self.com_fec  = com_fec
+        self.transmissor = Transmissor(sim, canal, TRANSMISSORES_ACK)
+        # Por VIP de origem: próximo SEQ a entregar e SEQs fora de ordem já recebidos
+        self._esperado: dict[str, int] = {}
+        self._guardados: dict[str, set] = {}
+        self.entregues  = 0
+        self.duplicatas = 0
+
+    def receber(self, dados: bytes):
+        pacote, segmento = abrir_quadro(dados)
+        if pacote is None or pacote.get("dst_vip") != self.vip or segmento.get("is_ack"):
+            return
+        src_vip, seq = pacote["src_vip"], segmento["seq_num"]
+        modulo   = 2 * self.janela
+        esperado = self._esperado.get(src_vip, 0)
+        guardados = self._guardados.setdefault(src_vip, set())
+
+        if (seq - esperado) % modulo < self.janela:
+            if seq in guardados:
+                self.duplicatas += 1
+            guardados.add(seq)
+            while esperado in guardados:      # entrega em ordem
+                guardados.discard(esperado)
+                esperado = (esperado + 1) % modulo
+                self.entregues += 1
+            self._esperado[src_vip] = esperado
+        else:
+            self.duplicatas += 1              # já entregue: só confirma de novo
+
+        ack = montar_quadro(seq, True, None, self.vip, src_vip, self.roteador.meu_mac,
+                            self.com_fec)
+        self.transmissor.enviar(ack, self.roteador.receber)
+
+
+class ClienteSimulado:
+    """
+    Emissor do client.py com janela de `janela` mensagens (1 = Stop-and-Wait).
+    Há sempre mensagem nova para enviar (fonte saturada).
+    """
+
+    def __init__(self, sim: Simulador, canal: Canal, vip: str, destino: str,
+                 roteador: RoteadorSimulado, janela: int = 1, com_fec: bool = False):
+        self.sim      = sim
+        self.vip      = vip
+        self.destino  = destino
+        self.roteador = roteador
+        self.janela   = janela
+        self.com_fec  = com_fec
+        self.transmissor = Transmissor(sim, canal, 1)
+        self._base      = 0              # mensagem mais antiga sem ACK
+        self._proxima   = 0              # próxima mensagem nova
+        self._timers: dict[int, Temporizador] = {}
+        self._primeiro_envio: dict[int, float] = {}
+        self._confirmadas: set[int] = set()
+        self.confirmadas    = 0
+        self.envios         = 0
+        self.retransmissoes = 0
+        self.latencias: list[float] = []
+
+    def iniciar(self):
+        self._preencher()
+
+    def _preencher(self):
+        while self._proxima < self._base + self.janela:
+            self._enviar(self._proxima)
+            self._proxima += 1
+
+    def _enviar(self, n: int):
+        if n in self._primeiro_envio:
+            self.retransmissoes += 1
+        else:
+            self._primeiro_envio[n] = self.sim.agora
+        self.envios += 1
+        timer = self._timers.pop(n, None)
+        if timer is not None:
+            timer.cancelar()
+        payload = {"type": "CHAT", "sender": self.vip, "message": f"mensagem {n}",
+                   "timestamp": f"{self.sim.agora:.3f}"}
+        quadro = montar_quadro(n % (2 * self.janela), False, payload, self.vip, self.destino,
+                               self.roteador.meu_mac, self.com_fec)
+        self.transmissor.enviar(quadro, self.roteador.receber,
+                                ao_terminar=lambda: self._armar(n))
+
+    def _armar(self, n: int):
+        """O timer conta do fim do envio, como o _esperar_ack depois do canal."""
+        if n not in self._confirmadas and n >= self._base:
+            anterior = self._timers.get(n)
+            if anterior is not None:
+                anterior.cancelar()
+            self._timers[n] = self.sim.armar(TIMEOUT_SEGUNDOS, self._expirar, n)
+
+    def _expirar(self, n: int):
+        self._timers.pop(n, None)
+        if n not in self._confirmadas:
+            self._enviar(n)
+
+    def receber(self, dados: bytes):
+        pacote, segmento = abrir_quadro(dados)
+        if pacote is None:
+            # ACK com CRC inválido: o client.py retransmite na hora
+            if self._base < self._proxima and self._base in self._timers:
+                self._enviar(self._base)
+            return
+        if not segmento.get("is_ack"):
+            return
+        seq = segmento.get("seq_num")
+        for n in range(self._base, self._proxima):
+            if n % (2 * self.janela) == seq and n not in self._confirmadas:
+                self._confirmadas.add(n)
+                timer = self._timers.pop(n, None)
+                if timer is not None:
+                    timer.cancelar()
+                self.confirmadas += 1
+                self.latencias.append(self.sim.agora - self._primeiro_envio.pop(n))
+                break
+        while self._base in self._confirmadas:
+            self._confirmadas.discard(self._base)
+            self._base += 1
+        self._preencher()
+
+
+# ══════════════════════════════════════════════════════════════════
+# EXECUÇÃO
+# ══════════════════════════════════════════════════════════════════
+def simular(duracao: float = DURACAO_PADRAO, perda: float = PROBABILIDADE_PERDA,
+            corrupcao: float = PROBABILIDADE_CORRUPCAO, janela: int = 1, clientes: int = 1,
+            com_fec: bool = False, capacidade_fila: int = CAPACIDADE_PADRAO,
+            semente: int = SEMENTE_PADRAO) -> dict:
+    """Uma rodada: `clientes` emissores saturados → roteador → um servidor."""
+    sim      = Simulador()
+    canal    = Canal(perda, corrupcao, semente=semente)
+    roteador = RoteadorSimulado(sim, canal, capacidade_fila)
+    servidor = ServidorSimulado(sim, canal, "SERVIDOR", roteador, janela, com_fec)
+    roteador.conectar("SERVIDOR", servidor)
+    emissores = []
+    for i in range(clientes):
+        cliente = ClienteSimulado(sim, canal, f"HOST_{i}", "SERVIDOR", roteador, janela, com_fec)
+        roteador.conectar(cliente.vip, cliente)
+        emissores.append(cliente)
+
+    inicio = time.perf_counter()
+    for cliente in emissores:
+        cliente.iniciar()
+    sim.executar(duracao)
+    tempo_real = time.perf_counter() - inicio
+
+    latencias = sorted(l for c in emissores for l in c.latencias)
+    confirmadas = sum(c.confirmadas for c in emissores)
+    envios      = sum(c.envios for c in emissores)
+    return {
+        "perda"          : perda,
+        "janela"         : janela,
+        "clientes"       : clientes,
+        "duracao"        : duracao,
+        "confirmadas"    : confirmadas,
+        "entregues"      : servidor.entregues,
+        "vazao"          : confirmadas / duracao,
+        "envios_por_msg" : envios / confirmadas if confirmadas else float("inf"),
+        "latencia_media" : sum(latencias) / len(latencias) if latencias else 0.0,
+        "latencia_p95"   : latencias[int(0.95 * (len(latencias) - 1))] if latencias else 0.0,
+        "quadros"        : canal.enviados,
+        "descartes_fila" : roteador.descartes_fila,
+        "eventos"        : sim.processados,
+        "tempo_real"     : tempo_real,
+    }
+
+
+def imprimir_tabela(resultados: list[dict]):
+    print(f"{'perda':>6s} {'janela':>6s} {'clientes':>8s} {'msgs':>7s} {'msg/s':>7s} "
+          f"{'envios/msg':>10s} {'lat.média':>9s} {'lat.p95':>8s} {'desc.fila':>9s} "
+          f"{'eventos':>8s} {'real':>7s}")
+    for r in resultados:
+        print(f"{r['perda']:6.2f} {r['janela']:6d} {r['clientes']:8d} {r['confirmadas']:7d} "
+              f"{r['vazao']:7.2f} {r['envios_por_msg']:10.2f} {r['latencia_media']:8.2f}s "
+              f"{r['latencia_p95']:7.2f}s {r['descartes_fila']:9d} {r['eventos']:8d} "
+              f"{r['tempo_real']:6.2f}s")
+
+
+def _lista(tipo):
+    return lambda texto: [tipo(v) for v in texto.split(",") if v.strip()]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Simulação de eventos discretos da Mini-NET (relógio virtual)")
+    parser.add_argument("--duracao", type=float, default=DURACAO_PADRAO,
+                        help=f"segundos simulados por rodada (padrão {DURACAO_PADRAO:.0f})")
+    parser.add_argument("--perda", type=_lista(float), default=[PROBABILIDADE_PERDA],
+                        help="probabilidade(s) de perda por salto, separadas por vírgula")
+    parser.add_argument("--corrupcao", type=float, default=PROBABILIDADE_CORRUPCAO,
+                        help=f"probabilidade de corrupção por salto (padrão {PROBABILIDADE_CORRUPCAO})")
+    parser.add_argument("--janela", type=_lista(int), default=[1],
+                        help="tamanho(s) de janela, separados por vírgula (1 = Stop-and-Wait)")
+    parser.add_argument("--clientes", type=int, default=1,
+                        help="emissores simultâneos para o mesmo servidor (padrão 1)")
+    parser.add_argument("--fila", type=int, default=CAPACIDADE_PADRAO,
+                        help="capacidade das filas de saída do roteador (0 = sem limite)")
+    parser.add_argument("--fec", action="store_true", help="quadros protegidos com FEC")
+    parser.add_argument("--codec", metavar="NOME",
+                        help=f"codec dos quadros (instalados: {', '.join(codecs_disponiveis())}; "
+                             "um indisponível cai para json com aviso)")
+    parser.add_argument("--semente", type=int, default=SEMENTE_PADRAO)
+    args = parser.parse_args()
+
+    if args.codec:
+        definir_codec_envio(args.codec)
+
+    resultados = []
+    for perda in args.perda:
+        for janela in args.janela:
+            if janela < 1:
+                parser.error("--janela deve ser ao menos 1")
+            resultados.append(simular(args.duracao, perda, args.corrupcao, janela,
+                                      args.clientes, args.fec, args.fila, args.semente))
+
+    print("=" * 55)
+    print(f"  Mini-NET — Simulação ({args.duracao:.0f}s simulados por rodada)")
+    print("=" * 55)
+    imprimir_tabela(resultados)
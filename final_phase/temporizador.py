@@ -0,0 +1,301 @@
+"""
+temporizador.py - Roda hierárquica de temporizadores
+
+Os prazos de retransmissão do transporte eram um timeout por sessão:
+cada fluxo bloqueado esperando ACK dormia com o próprio prazo (o timeout
+do socket, no transporte de fluxo único), e na simulação cada timer ia
+para a heap de eventos (O(log n) por timer, mais os cancelados que ficam
+lá até vencer). Com milhares de sessões o custo cresce com elas.
+
+Toda espera por ACK do client.py passa pela roda: o transporte de fluxo
+único é um Fluxo de um Multiplexador próprio. O servidor e o roteador não
+têm temporizadores de retransmissão: o servidor só responde ao que chega,
+e o roteador encaminha sem guardar estado de sessão.
+
+A roda divide o tempo em ticks de RESOLUCAO segundos e guarda cada
+temporizador num balde pelo tick em que vence:
+  - nível 0: 256 baldes de 1 tick;
+  - níveis 1..3: 64 baldes cada, cobrindo 256·64^(n-1) ticks por balde.
+Agendar calcula o nível e o balde em O(1); cancelar remove do balde em
+O(1) (cada balde é um dict indexado pelo próprio temporizador). A cada
+volta do nível 0 o balde corrente do nível de cima desce para os de baixo
+("cascata", como nos timers clássicos do kernel Linux), então cada
+temporizador é movido no máximo NIVEIS-1 vezes. Um temporizador vence no
+primeiro tick em ou depois do prazo pedido (até RESOLUCAO de atraso).
+
+Quem avança a roda é o dono: uma thread própria (`iniciar()`), usada pelo
+Multiplexador do client.py, ou o laço de eventos de simulacao.py com o
+relógio virtual. As ações rodam fora da trava e devem ser curtas (pôr
+algo numa fila, agendar um evento).
+
+Uso (medição do custo por temporizador conforme o número de sessões):
+  python temporizador.py
+  python temporizador.py --sessoes 1000,10000,100000,1000000
+"""
+
+import gc
+import math
+import time
+import heapq
+import random
+import argparse
+import threading
+
+# ──────────────────────────────────────────────
+# CONFIGURAÇÕES
+# ──────────────────────────────────────────────
+RESOLUCAO   = 0.01      # segundos por tick
+BITS_NIVEL0 = 8         # 256 baldes no nível 0
+BITS_NIVEL  = 6         # 64 baldes nos demais
+NIVEIS      = 4         # alcance: 2^26 ticks ≈ 7,7 dias com RESOLUCAO = 0,01
+
+_BALDES0 = 1 << BITS_NIVEL0
+_BALDES  = 1 << BITS_NIVEL
+_ALCANCE = [1 << (BITS_NIVEL0 + BITS_NIVEL * n) for n in range(NIVEIS)]
+
+
+class Temporizador:
+    """Um prazo agendado na roda; `cancelar()` é O(1) e idempotente."""
+
+    __slots__ = ("tick", "acao", "args", "_roda", "_balde", "_nivel")
+
+    def __init__(self, roda: "RodaTemporizadores", tick: int, acao, args):
+        self.tick   = tick
+        self.acao   = acao
+        self.args   = args
+        self._roda  = roda
+        self._balde = None
+        self._nivel = 0
+
+    @property
+    def ativo(self) -> bool:
+        return self._balde is not None
+
+    def cancelar(self) -> bool:
+        """Desagenda; devolve False se já venceu ou já foi cancelado."""
+        return self._roda._remover(self)
+
+
+class RodaTemporizadores:
+    """Roda hierárquica; `relogio` é time.monotonic ou o relógio virtual."""
+
+    def __init__(self, relogio=time.monotonic, resolucao: float = RESOLUCAO):
+        self._relogio   = relogio
+        self.resolucao  = resolucao
+        self._tick      = int(relogio() / resolucao)   # próximo tick a processar
+        self._niveis    = [[{} for _ in range(_BALDES0)]] + \
+                          [[{} for _ in range(_BALDES)] for _ in range(NIVEIS - 1)]
+        self._no_nivel0 = 0
+        self.pendentes  = 0
+        self.disparados = 0
+        self.instante   = self._tick * resolucao   # tick em processamento, para as ações
+        self._trava     = threading.Lock()
+        self._parar     = threading.Event()
+        self._thread    = None
+
+    # ── agendar / cancelar ───────────────────────────────────────────
+    def agendar(self, atraso: float, acao, *args) -> Temporizador:
+        """Agenda `acao(*args)` para daqui a `atraso` segundos."""
+        tick = math.ceil((self._relogio() + atraso) / self.resolucao - 1e-9)
+        temporizador = Temporizador(self, tick, acao, args)
+        with self._trava:
+            self._inserir(temporizador)
+            self.pendentes += 1
+        return temporizador
+
+    def _inserir(self, t: Temporizador):
+        delta = t.tick - self._tick
+        if delta < _ALCANCE[0]:
+            balde = self._niveis[0][max(t.tick, self._tick) & (_BALDES0 - 1)]
+            self._no_nivel0 += 1
+            nivel = 0
+        else:
+            for nivel in range(1, NIVEIS):
+                if delta < _ALCANCE[nivel]:
+                    break
+            else:
+                t.tick = self._tick + _ALCANCE[-1] - 1     # além do alcance: satura
+            deslocamento = BITS_NIVEL0 + BITS_NIVEL * (nivel - 1)
+            balde = self._niveis[nivel][(t.tick >> deslocamento) & (_BALDES - 1)]
+        balde[t] = None
+        t._balde = balde
+        t._nivel = nivel
+
+    def _remover(self, t: Temporizador) -> bool:
+        with self._trava:
+            balde = t._balde
+            if balde is None:
+                return False
+            del balde[t]
+            t._balde = None
+            if t._nivel == 0:
+                self._no_nivel0 -= 1
+            self.pendentes -= 1
+            return True
+
+    # ── avanço ───────────────────────────────────────────────────────
+    def avancar(self, agora: float = None) -> bool:
+        """
+        Processa os ticks vencidos até `agora` (padrão: o relógio), parando
+        logo depois do primeiro que disparar algum temporizador — as ações
+        podem ter agendado coisas que o chamador precisa ver antes de
+        seguir. Devolve True se disparou algo.
+        """
+        alvo = int((self._relogio() if agora is None else agora) / self.resolucao + 1e-9)
+        with self._trava:
+            vencidos = None
+            while self._tick <= alvo:
+                if not self.pendentes:
+                    self._tick = alvo + 1
+                    break
+                indice = self._tick & (_BALDES0 - 1)
+                if indice == 0:
+                    self._cascata()
+                elif not self._no_nivel0:
+                    # Nada no nível 0: pula até a próxima cascata
+                    self._tick = min(alvo + 1, (self._tick | (_BALDES0 - 1)) + 1)
+                    continue
+                balde = self._niveis[0][indice]
+                tick  = self._tick
+                self._tick += 1
+                if balde:
+                    vencidos = list(balde)
+                    balde.clear()
+                    for t in vencidos:
+                        t._balde = None
+                    self._no_nivel0 -= len(vencidos)
+                    self.pendentes  -= len(vencidos)
+                    self.disparados += len(vencidos)
+                    self.instante = tick * self.resolucao
+                    break
+        if not vencidos:
+            return False
+        for t in vencidos:
+            t.acao(*t.args)
+        return True
+
+    def _cascata(self):
+        for nivel in range(1, NIVEIS):
+            deslocamento = BITS_NIVEL0 + BITS_NIVEL * (nivel - 1)
+            indice = (self._tick >> deslocamento) & (_BALDES - 1)
+            balde  = self._niveis[nivel][indice]
+            if balde:
+                descendo = list(balde)
+                balde.clear()
+                for t in descendo:
+                    self._inserir(t)
+            if indice:
+                break
+
+    # ── thread própria ───────────────────────────────────────────────
+    def iniciar(self) -> "RodaTemporizadores":
+        """Avança a roda numa thread de fundo a cada tick (relógio real)."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._rodar, daemon=True)
+            self._thread.start()
+        return self
+
+    def parar(self):
+        self._parar.set()
+
+    def _rodar(self):
+        while not self._parar.wait(self.resolucao):
+            while self.avancar():
+                pass
+
+
+# ══════════════════════════════════════════════════════════════════
+# MEDIÇÃO
+# ══════════════════════════════════════════════════════════════════
+def medir(sessoes: int, prazo: float = 3.0, fracao_ack: float = 0.9, semente: int = 1) -> dict:
+    """
+    Cada sessão arma um timer de retransmissão em instante aleatório de uma
+    janela de `prazo` segundos; `fracao_ack` delas é cancelada (ACK chegou)
+    e o resto vence. Compara a roda com uma heap com cancelamento
+    preguiçoso, ambas no relógio virtual. Tempos em ns por sessão, com o
+    coletor de lixo desligado (com milhões de objetos vivos as passadas
+    dele dominariam a medição das duas estruturas).
+    """
+    rnd = random.Random(semente)
+    inicios = sorted(rnd.uniform(0, prazo) for _ in range(sessoes))
+    cancela = [rnd.random() < fracao_ack for _ in range(sessoes)]
+    coletor = gc.isenabled()
+    gc.disable()
+    try:
+        return _medir(inicios, cancela, prazo)
+    finally:
+        if coletor:
+            gc.enable()
+
+
+def _medir(inicios: list, cancela: list, prazo: float) -> dict:
+    sessoes  = len(inicios)
+    disparos = [0]
+
+    def disparou():
+        disparos[0] += 1
+
+    # ── roda ──
+    agora = [0.0]
+    roda = RodaTemporizadores(relogio=lambda: agora[0])
+    t0 = time.perf_counter()
+    armados = []
+    for inicio in inicios:
+        agora[0] = inicio
+        armados.append(roda.agendar(prazo, disparou))
+    t1 = time.perf_counter()
+    for temporizador, c in zip(armados, cancela):
+        if c:
+            temporizador.cancelar()
+    t2 = time.perf_counter()
+    while roda.avancar(3 * prazo):
+        pass
+    t3 = time.perf_counter()
+    resultado = {"sessoes": sessoes,
+                 "roda_agendar": (t1 - t0) / sessoes * 1e9,
+                 "roda_cancelar": (t2 - t1) / sessoes * 1e9,
+                 "roda_vencer": (t3 - t2) / sessoes * 1e9,
+                 "roda_disparos": disparos[0]}
+
+    # ── heap ──
+    disparos[0] = 0
+    heap, ordem = [], 0
+    t0 = time.perf_counter()
+    armados = []
+    for inicio in inicios:
+        evento = [inicio + prazo, ordem, disparou]
+        ordem += 1
+        heapq.heappush(heap, evento)
+        armados.append(evento)
+    t1 = time.perf_counter()
+    for evento, c in zip(armados, cancela):
+        if c:
+            evento[2] = None
+    t2 = time.perf_counter()
+    while heap:
+        evento = heapq.heappop(heap)
+        if evento[2] is not None:
+            evento[2]()
+    t3 = time.perf_counter()
+    resultado.update({"heap_agendar": (t1 - t0) / sessoes * 1e9,
+                      "heap_cancelar": (t2 - t1) / sessoes * 1e9,
+                      "heap_vencer": (t3 - t2) / sessoes * 1e9,
+                      "heap_disparos": disparos[0]})
+    return resultado
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Custo por temporizador da roda vs heap, por número de sessões")
+    parser.add_argument("--sessoes", default="1000,10000,100000,1000000",
+                        help="números de sessões separados por vírgula")
+    args = parser.parse_args()
+
+    print(f"{'sessões':>9s} | {'roda: agendar':>13s} {'cancelar':>9s} {'vencer':>8s} "
+          f"| {'heap: agendar':>13s} {'cancelar':>9s} {'vencer':>8s}   (ns/sessão)")
+    for n in (int(v) for v in args.sessoes.split(",") if v.strip()):
+        r = medir(n)
+        assert r["roda_disparos"] == r["heap_disparos"]
+        print(f"{n:9d} | {r['roda_agendar']:13.0f} {r['roda_cancelar']:9.0f} "
+              f"{r['roda_vencer']:8.0f} | {r['heap_agendar']:13.0f} "
+              f"{r['heap_cancelar']:9.0f} {r['heap_vencer']:8.0f}")
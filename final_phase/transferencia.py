@@ -0,0 +1,274 @@
+"""
+transferencia.py - Aplicação de transferência de arquivos sobre a pilha Mini-NET
+
+Segunda aplicação (L7) além do chat. Usa os mesmos Segmento/Pacote/Quadro e
+o Stop-and-Wait do cliente; cada bloco do arquivo vira um segmento.
+
+Mensagens de aplicação (campo "type" do payload):
+  ARQUIVO_INICIO  {id, nome, tamanho, bloco, sha256}
+  ARQUIVO_BLOCO   {id, offset, dados (base64)}
+  ARQUIVO_FIM     {id}
+
+Memória constante nas duas pontas:
+  - O emissor mapeia o arquivo com mmap e codifica fatias (memoryview) do
+    mapeamento diretamente, sem ler o arquivo inteiro para a memória.
+  - O receptor pré-aloca o arquivo de saída e grava cada bloco no seu
+    offset; ao final confere o SHA-256 do arquivo inteiro.
+
+O tamanho do bloco segue a PMTU do destino (ver pmtu.py): o emissor usa o
+maior bloco cujo quadro cabe nela e, se um bloco for recusado por MTU no
+caminho, retoma daquele offset com blocos menores. Como cada bloco leva o
+próprio offset, o receptor não precisa saber que o tamanho mudou.
+
+Dependências: client.py (Transporte), server.py (ReceptorArquivos)
+"""
+
+import os
+import mmap
+import uuid
+import base64
+import hashlib
+import binascii
+from paridade import em_grupos, payload_paridade
+
+# ──────────────────────────────────────────────
+# CONFIGURAÇÕES
+# ──────────────────────────────────────────────
+# 32 KiB viram ~44 KB em base64: cabe com folga num datagrama UDP (65507 B)
+BLOCO_PADRAO = 32 * 1024
+
+# ──────────────────────────────────────────────
+# CORES ANSI
+# ──────────────────────────────────────────────
+VERMELHO = "\033[91m"
+AMARELO  = "\033[93m"
+VERDE    = "\033[92m"
+RESET    = "\033[0m"
+
+
+def log(camada: str, msg: str, cor: str = ""):
+    print(f"{cor}[{camada}] {msg}{RESET}")
+
+
+def sha256_de(visao) -> str:
+    """SHA-256 de um buffer (bytes, mmap ou memoryview) em fatias de 1 MiB."""
+    h = hashlib.sha256()
+    for inicio in range(0, len(visao), 1 << 20):
+        h.update(visao[inicio:inicio + (1 << 20)])
+    return h.hexdigest()
+
+
+# ══════════════════════════════════════════════════════════════════
+# EMISSOR
+# ══════════════════════════════════════════════════════════════════
+def mensagens_do_arquivo(caminho: str, tamanho_bloco: int = BLOCO_PADRAO,
+                         id_transferencia: str = None, retomar_de: int = None):
+    """
+    Gera os payloads INICIO, BLOCO... e FIM de um arquivo.
+    Com `retomar_de`, continua a transferência `id_transferencia` a partir
+    desse offset (sem novo INICIO).
+    O arquivo fica mapeado enquanto o gerador estiver vivo.
+    """
+    id_transferencia = id_transferencia or uuid.uuid4().hex[:12]
+    nome             = os.path.basename(caminho)
+
+    with open(caminho, "rb") as arquivo:
+        tamanho = os.fstat(arquivo.fileno()).st_size
+
+        # mmap não aceita arquivos vazios
+        mapa  = mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ) if tamanho else None
+        visao = memoryview(mapa) if mapa is not None else memoryview(b"")
+        try:
+            if retomar_de is None:
+                yield {
+                    "type"   : "ARQUIVO_INICIO",
+                    "id"     : id_transferencia,
+                    "nome"   : nome,
+                    "tamanho": tamanho,
+                    "bloco"  : tamanho_bloco,
+                    "sha256" : sha256_de(visao),
+                }
+
+            for offset in range(retomar_de or 0, tamanho, tamanho_bloco):
+                yield {
+                    "type"  : "ARQUIVO_BLOCO",
+                    "id"    : id_transferencia,
+                    "offset": offset,
+                    "dados" : base64.b64encode(visao[offset:offset + tamanho_bloco]).decode("ascii"),
+                }
+
+            yield {"type": "ARQUIVO_FIM", "id": id_transferencia}
+        finally:
+            visao.release()
+            if mapa is not None:
+                mapa.close()
+
+
+def bloco_para_pmtu(transporte, dst_vip: str, maximo: int, paridade: int = 0) -> int:
+    """
+    Maior tamanho de bloco (até `maximo`) cujo quadro cabe na PMTU que o
+    `transporte` conhece para `dst_vip`. No modo paridade quem limita é o
+    quadro de paridade, maior que os de dados.
+    """
+    pmtu  = transporte.pmtu.obter(dst_vip)
+    bloco = maximo
+    while bloco > 1:
+        modelo = {"type": "ARQUIVO_BLOCO", "id": "0" * 12, "offset": 1 << 40,
+                  "dados": "A" * (4 * -(-bloco // 3))}
+        if paridade > 0:
+            modelo = payload_paridade([modelo])
+        excesso = transporte.tamanho_quadro(modelo, dst_vip) - pmtu
+        if excesso <= 0:
+            return bloco
+        # Cada byte do bloco vira ~4/3 no base64 (e ~16/9 na paridade)
+        bloco = min(bloco - 1, bloco - excesso * 9 // 16)
+    return 1
+
+
+def enviar_arquivo(transporte, caminho: str, dst_vip: str,
+                   tamanho_bloco: int = BLOCO_PADRAO, max_tentativas: int = None,
+                   paridade: int = 0) -> bool:
+    """
+    Envia um arquivo pelo `transporte` (client.Transporte) bloco a bloco.
+    Com `paridade` = K > 0, os segmentos seguem em grupos de K com um
+    quadro de paridade (ver paridade.py).
+    Os blocos nunca passam da PMTU conhecida do destino; se o caminho
+    recusar um bloco por MTU, a transferência retoma dele com blocos menores.
+    Retorna True se todos os segmentos foram confirmados.
+    """
+    tamanho = os.path.getsize(caminho)
+    bloco   = bloco_para_pmtu(transporte, dst_vip, tamanho_bloco, paridade)
+    log("ARQUIVO", f"Enviando '{caminho}' ({tamanho} bytes, blocos de {bloco} B) → {dst_vip}",
+        VERDE)
+
+    id_transferencia, retomar_de = uuid.uuid4().hex[:12], None
+    while True:
+        mensagens = mensagens_do_arquivo(caminho, bloco, id_transferencia, retomar_de)
+        lotes     = em_grupos(mensagens, paridade) if paridade > 0 else ([m] for m in mensagens)
+
+        for lote in lotes:
+            if paridade > 0:
+                confirmado = transporte.enviar_grupo(lote, dst_vip, max_tentativas) is not None
+            else:
+                confirmado = transporte.enviar(lote[0], dst_vip, max_tentativas) is not None
+            blocos = [p for p in lote if p["type"] == "ARQUIVO_BLOCO"]
+            if not confirmado:
+                menor = bloco_para_pmtu(transporte, dst_vip, bloco, paridade)
+                if menor < bloco and lote[0]["type"] != "ARQUIVO_FIM":
+                    # Sem nenhum bloco confirmado ainda, recomeça com novo INICIO
+                    retomar_de = blocos[0]["offset"] if lote[0]["type"] == "ARQUIVO_BLOCO" else None
+                    log("ARQUIVO", f"PMTU menor no caminho → retomando do offset "
+                                   f"{retomar_de or 0} com blocos de {menor} B", AMARELO)
+                    bloco = menor
+                    mensagens.close()
+                    break
+                log("ARQUIVO", f"Transferência abortada em {lote[0]['type']}", VERMELHO)
+                return False
+            if blocos:
+                enviados = min(tamanho, blocos[-1]["offset"] + bloco)
+                log("ARQUIVO", f"{enviados}/{tamanho} bytes confirmados", VERDE)
+        else:
+            break
+
+    log("ARQUIVO", f"'{caminho}' enviado com sucesso", VERDE)
+    return True
+
+
+# ══════════════════════════════════════════════════════════════════
+# RECEPTOR
+# ══════════════════════════════════════════════════════════════════
+class _Recepcao:
+    """Estado de um arquivo em recepção."""
+
+    def __init__(self, caminho_final: str, tamanho: int, sha256: str):
+        self.caminho_final   = caminho_final
+        self.caminho_parcial = caminho_final + ".parcial"
+        self.tamanho         = tamanho
+        self.sha256          = sha256
+
+        self.arquivo = open(self.caminho_parcial, "wb+")
+        self.arquivo.truncate(tamanho)
+        if tamanho and hasattr(os, "posix_fallocate"):
+            os.posix_fallocate(self.arquivo.fileno(), 0, tamanho)
+
+    def gravar(self, offset: int, dados: bytes):
+        self.arquivo.seek(offset)
+        self.arquivo.write(dados)
+
+    def concluir(self) -> bool:
+        """Confere o SHA-256 do arquivo inteiro e o renomeia se íntegro."""
+        self.arquivo.flush()
+        if self.tamanho:
+            with mmap.mmap(self.arquivo.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+                calculado = sha256_de(mapa)
+        else:
+            calculado = hashlib.sha256().hexdigest()
+        self.arquivo.close()
+
+        if calculado != self.sha256:
+            return False
+        os.replace(self.caminho_parcial, self.caminho_final)
+        return True
+
+
+class ReceptorArquivos:
+    """
+    Aplicação receptora: trata os payloads ARQUIVO_* entregues pelo
+    transporte do servidor. Blocos retransmitidos apenas regravam o mesmo
+    offset, então duplicatas são inofensivas.
+    """
+
+    def __init__(self, diretorio: str = "recebidos"):
+        self.diretorio  = diretorio
+        self._recepcoes: dict[tuple[str, str], _Recepcao] = {}
+
+    def processar(self, payload: dict, src_vip: str) -> bool:
+        """Retorna False se o payload não pertence a esta aplicação."""
+        tipo = payload.get("type", "")
+        if not tipo.startswith("ARQUIVO_"):
+            return False
+
+        chave = (src_vip, payload.get("id"))
+        try:
+            if tipo == "ARQUIVO_INICIO":
+                self._iniciar(chave, payload, src_vip)
+            elif tipo == "ARQUIVO_BLOCO":
+                self._bloco(chave, payload)
+            elif tipo == "ARQUIVO_FIM":
+                self._finalizar(chave)
+        except (KeyError, TypeError, ValueError, binascii.Error, OSError) as e:
+            log("ARQUIVO", f"{tipo} inválido de {src_vip}: {e} → descartado", VERMELHO)
+        return True
+
+    def _iniciar(self, chave, payload: dict, src_vip: str):
+        antiga = self._recepcoes.pop(chave, None)
+        if antiga is not None:
+            antiga.arquivo.close()
+
+        os.makedirs(self.diretorio, exist_ok=True)
+        nome    = os.path.basename(payload["nome"]) or chave[1]
+        caminho = os.path.join(self.diretorio, f"{src_vip}_{nome}")
+        self._recepcoes[chave] = _Recepcao(caminho, int(payload["tamanho"]), payload["sha256"])
+        log("ARQUIVO", f"Recebendo '{nome}' de {src_vip} ({payload['tamanho']} bytes)", VERDE)
+
+    def _bloco(self, chave, payload: dict):
+        recepcao = self._recepcoes.get(chave)
+        if recepcao is None:
+            log("ARQUIVO", f"Bloco de transferência desconhecida {chave} → descartado", AMARELO)
+            return
+        dados  = base64.b64decode(payload["dados"], validate=True)
+        offset = int(payload["offset"])
+        if offset < 0 or offset + len(dados) > recepcao.tamanho:
+            raise ValueError(f"bloco fora do arquivo (offset={offset})")
+        recepcao.gravar(offset, dados)
+
+    def _finalizar(self, chave):
+        recepcao = self._recepcoes.pop(chave, None)
+        if recepcao is None:
+            return
+        if recepcao.concluir():
+            log("ARQUIVO", f"✓ '{recepcao.caminho_final}' recebido, SHA-256 confere", VERDE)
+        else:
+            log("ARQUIVO",
+                f"✗ SHA-256 divergente em '{recepcao.caminho_parcial}' → arquivo mantido como parcial",
+                VERMELHO)